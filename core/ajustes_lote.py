@@ -0,0 +1,141 @@
+"""
+Ajuste de preço e estoque em lote (ex.: +8% no preço de venda de um
+fornecedor, remarcação de uma categoria, zerar o estoque de uma lista de IDs).
+
+Cada operação vira um par (fator, soma) aplicado no próprio SQL
+(db_manager.SQL_AJUSTE_CALCULO), então a prévia é uma consulta só e a
+aplicação é uma transação só, sem ler e regravar produto por produto.
+O que muda de estoque entra no razão como movimento 'ajuste'. Cada aplicação
+guarda o antes/depois dos produtos e pode ser desfeita (desfazer()).
+"""
+import logging
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from database import db_manager as db
+from core import dinheiro
+
+CAMPOS = {'preco_venda': "Preço de venda", 'preco_custo': "Preço de custo", 'quantidade': "Estoque"}
+MODOS = {'percentual': "Percentual (%)", 'somar': "Somar (+/-)", 'definir': "Definir valor"}
+MODOS_QUANTIDADE = ('somar', 'definir') # percentual de estoque não faz sentido
+
+FATOR_NEUTRO = 10000 # centésimos de %: 10000 = 100%
+
+
+def _ids(texto):
+    """'1, 2 7-9' -> [1, 2, 7, 8, 9] (sem repetir)."""
+    ids = []
+    for parte in (texto or '').replace(',', ' ').replace(';', ' ').split():
+        try:
+            if '-' in parte:
+                inicio, fim = (int(x) for x in parte.split('-', 1))
+                if fim < inicio:
+                    raise ValueError
+                ids.extend(range(inicio, fim + 1))
+            else:
+                ids.append(int(parte))
+        except ValueError:
+            raise ValueError(f"Lista de IDs inválida perto de '{parte}' (use ex.: 1, 2, 10-20).")
+    return list(dict.fromkeys(ids))
+
+def _fator_soma(campo, modo, valor_texto):
+    """(fator, soma) de uma operação; (None, None) se o campo não muda."""
+    if not modo:
+        return None, None
+    if modo not in MODOS or (campo == 'quantidade' and modo not in MODOS_QUANTIDADE):
+        raise ValueError(f"Operação inválida para {CAMPOS[campo]}: {modo}")
+    texto = (valor_texto or '').strip()
+    if not texto:
+        raise ValueError(f"Informe o valor para {CAMPOS[campo]}.")
+
+    if modo == 'percentual':
+        try:
+            percentual = Decimal(texto.replace('%', '').replace(',', '.').strip())
+        except InvalidOperation:
+            raise ValueError(f"Percentual inválido para {CAMPOS[campo]}: '{texto}'")
+        centesimos = int((percentual * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+        if centesimos < -FATOR_NEUTRO:
+            raise ValueError("O percentual não pode reduzir mais que 100%.")
+        return FATOR_NEUTRO + centesimos, 0
+
+    if campo == 'quantidade':
+        try:
+            valor = int(texto)
+        except ValueError:
+            raise ValueError("O estoque deve ser um número inteiro.")
+    else:
+        valor = dinheiro.para_centavos(texto)
+    if modo == 'definir':
+        if valor < 0:
+            raise ValueError(f"{CAMPOS[campo]} não pode ser negativo.")
+        return 0, valor
+    return FATOR_NEUTRO, valor
+
+def _descrever(campo, modo, valor_texto):
+    valor = valor_texto.strip()
+    if modo == 'percentual':
+        return f"{CAMPOS[campo]} {'' if valor.startswith(('-', '+')) else '+'}{valor.rstrip('%')}%"
+    if modo == 'somar':
+        return f"{CAMPOS[campo]} {'' if valor.startswith(('-', '+')) else '+'}{valor}"
+    return f"{CAMPOS[campo]} = {valor}"
+
+def preparar(categoria, fornecedor, ids_texto, operacoes):
+    """
+    Valida a tela. operacoes = {campo: (modo ou '' para não alterar, valor digitado)}.
+    Exige pelo menos um filtro (nunca ajusta o catálogo inteiro sem querer).
+    Retorna (filtros, operacao, descricao) para previa() e aplicar().
+    """
+    filtros = {'categoria': (categoria or '').strip() or None,
+               'fornecedor': (fornecedor or '').strip() or None,
+               'ids': _ids(ids_texto)}
+    if not (filtros['categoria'] or filtros['fornecedor'] or filtros['ids']):
+        raise ValueError("Escolha uma categoria, um fornecedor ou informe os IDs dos produtos.")
+
+    operacao, partes = [], []
+    for campo in CAMPOS:
+        modo, valor = operacoes.get(campo, ('', ''))
+        operacao.extend(_fator_soma(campo, modo, valor))
+        if modo:
+            partes.append(_descrever(campo, modo, valor))
+    if not partes:
+        raise ValueError("Escolha pelo menos uma alteração (preço de venda, custo ou estoque).")
+
+    alvo = [f"{nome} = {filtros[chave]}" for chave, nome in (('categoria', "categoria"), ('fornecedor', "fornecedor"))
+            if filtros[chave]]
+    if filtros['ids']:
+        alvo.append(f"{len(filtros['ids'])} ID(s)")
+    return filtros, tuple(operacao), f"{'; '.join(partes)} | {', '.join(alvo)}"
+
+def previa(filtros, operacao):
+    """
+    Simula o ajuste sem gravar. Retorna {'linhas': [(id, nome, venda, nova_venda,
+    custo, novo_custo, qtd, nova_qtd), ...], 'produtos', 'valor_antes', 'valor_depois'},
+    valor = soma de preço de venda x estoque dos produtos afetados (centavos).
+    """
+    linhas = db.previa_ajuste_lote(filtros, operacao)
+    return {'linhas': linhas, 'produtos': len(linhas),
+            'valor_antes': sum((l[2] or 0) * l[6] for l in linhas),
+            'valor_depois': sum((l[3] or 0) * l[7] for l in linhas)}
+
+def aplicar(filtros, operacao, descricao, usuario_id=None):
+    """Grava o ajuste (uma transação). Retorna (ajuste_id, produtos alterados)."""
+    ajuste_id, itens = db.aplicar_ajuste_lote(filtros, operacao, descricao, usuario_id)
+    logging.info(f"Ajuste em lote nº {ajuste_id}: {itens} produto(s) - {descricao}")
+    return ajuste_id, itens
+
+def desfazer(ajuste_id, usuario_id=None):
+    """
+    Desfaz o ajuste. Retorna {'restaurados', 'mantidos', 'estoques'}: 'mantidos'
+    são preços alterados de novo depois do ajuste, que ficam como estão.
+    """
+    restaurados, mantidos, estoques = db.desfazer_ajuste_lote(ajuste_id, usuario_id)
+    logging.info(f"Ajuste em lote nº {ajuste_id} desfeito: {restaurados} preço(s) restaurado(s), "
+                 f"{mantidos} mantido(s), {estoques} estoque(s) revertido(s)")
+    return {'restaurados': restaurados, 'mantidos': mantidos, 'estoques': estoques}
+
+def listar(limite=50):
+    """Últimos ajustes: (id, data_hora, usuario, descricao, itens, desfeito_em ou None)."""
+    return db.listar_ajustes_lote(limite)
+
+def opcoes_filtro():
+    """(categorias, fornecedores) cadastrados, para as listas da tela."""
+    return db.listar_categorias_fornecedores()
@@ -0,0 +1,99 @@
+"""
+Cache em memória dos produtos consultados pelo PDV.
+
+Cada ID bipado é lido do banco uma vez e reaproveitado nas próximas buscas.
+Antes de responder, o cache confere db_manager.versao_dados() (PRAGMA
+data_version + gravações deste processo): se qualquer terminal gravou algo
+no banco desde a última conferência, o cache é esvaziado, então preço e
+estoque nunca ficam velhos. A baixa definitiva do estoque continua sendo
+validada dentro da transação da venda.
+Códigos de barras seguem a mesma regra; os que não existem também ficam
+guardados (_codigos_ausentes), para um código desconhecido bipado várias
+vezes não ir ao banco toda vez.
+"""
+import threading
+
+from database import db_manager as db
+
+MAX_PRODUTOS = 5000 # acima disso o cache recomeça vazio
+
+_lock = threading.Lock()
+_por_id = {}
+_por_codigo = {}          # codigo_barras -> produto_id
+_codigos_ausentes = set()
+_versao = None
+_estatisticas = {'acertos': 0, 'faltas': 0, 'invalidacoes': 0}
+
+
+def _conferir_versao():
+    # Chamar com _lock
+    global _versao
+    versao = db.versao_dados()
+    if versao != _versao:
+        if _por_id or _codigos_ausentes:
+            _estatisticas['invalidacoes'] += 1
+            _esvaziar()
+        _versao = versao
+
+def _esvaziar():
+    # Chamar com _lock
+    _por_id.clear()
+    _por_codigo.clear()
+    _codigos_ausentes.clear()
+
+def _guardar(produto):
+    # Chamar com _lock
+    if len(_por_id) >= MAX_PRODUTOS:
+        _esvaziar()
+    _por_id[produto[0]] = produto
+    if produto[8]:
+        _por_codigo[produto[8]] = produto[0]
+
+def obter(produto_id):
+    """Produto (tupla de 'SELECT * FROM produtos') pelo ID, ou None se não existir."""
+    with _lock:
+        _conferir_versao()
+        produto = _por_id.get(produto_id)
+        if produto is not None:
+            _estatisticas['acertos'] += 1
+            return produto
+        _estatisticas['faltas'] += 1
+
+    produto = db.buscar_produto_por_id(produto_id)
+    if produto is not None:
+        with _lock:
+            _guardar(produto)
+    return produto
+
+def obter_por_codigo(codigo_barras):
+    """Produto pelo código de barras / SKU (busca pelo índice único), ou None."""
+    with _lock:
+        _conferir_versao()
+        produto_id = _por_codigo.get(codigo_barras)
+        produto = _por_id.get(produto_id) if produto_id is not None else None
+        if produto is not None or codigo_barras in _codigos_ausentes:
+            _estatisticas['acertos'] += 1
+            return produto
+        _estatisticas['faltas'] += 1
+
+    produto = db.buscar_produto_por_codigo(codigo_barras)
+    with _lock:
+        if produto is not None:
+            _guardar(produto)
+        elif len(_codigos_ausentes) < MAX_PRODUTOS:
+            _codigos_ausentes.add(codigo_barras)
+    return produto
+
+def invalidar():
+    """Esvazia o cache (ex.: depois de importar produtos por fora do sistema)."""
+    with _lock:
+        _esvaziar()
+
+def estatisticas():
+    """{'acertos', 'faltas', 'invalidacoes', 'itens', 'taxa_acerto' (0 a 1)}"""
+    with _lock:
+        resultado = dict(_estatisticas)
+        resultado['itens'] = len(_por_id)
+    consultas = resultado['acertos'] + resultado['faltas']
+    resultado['taxa_acerto'] = resultado['acertos'] / consultas if consultas else 0.0
+    return resultado
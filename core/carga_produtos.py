@@ -0,0 +1,177 @@
+"""
+Importação e exportação de produtos em lote (CSV ou JSON Lines).
+
+A importação lê o arquivo linha a linha, valida cada uma com as mesmas
+regras do cadastro (logic_produtos.validar_e_processar_produto) e grava em
+lotes de TAMANHO_LOTE, cada um em uma transação (db_manager.gravar_lote_produtos).
+Linhas rejeitadas vão para '<arquivo>.rejeitados.csv' com o número da linha
+e o motivo. A exportação percorre a tabela em lotes por id; nenhum dos dois
+carrega o catálogo inteiro na memória.
+
+Colunas: nome, quantidade, preco_venda, preco_custo, categoria, fornecedor,
+codigo_barras e, opcionalmente, id. Produto com id ou código de barras já
+cadastrado é atualizado (a quantidade vira ajuste até o valor do arquivo);
+os demais são incluídos.
+"""
+import csv
+import json
+import logging
+import os
+import sqlite3
+import time
+
+from database import db_manager as db
+from core import logic_produtos, dinheiro
+
+TAMANHO_LOTE = 1000
+COLUNAS = ('id', 'nome', 'quantidade', 'preco_venda', 'preco_custo', 'categoria', 'fornecedor', 'codigo_barras')
+FORMATOS = {'.csv': 'csv', '.txt': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+
+
+def _formato(caminho, formato):
+    formato = formato or FORMATOS.get(os.path.splitext(caminho)[1].lower())
+    if formato not in ('csv', 'jsonl'):
+        raise ValueError("Formato não reconhecido: use um arquivo .csv ou .jsonl.")
+    return formato
+
+def _registros(caminho, formato):
+    """Gera (nº da linha, dict da linha ou None se ilegível, texto original)."""
+    with open(caminho, newline='', encoding='utf-8-sig') as f:
+        if formato == 'jsonl':
+            for numero, texto in enumerate(f, start=1):
+                if not texto.strip():
+                    continue
+                try:
+                    registro = json.loads(texto)
+                except ValueError:
+                    registro = None
+                yield numero, registro if isinstance(registro, dict) else None, texto.strip()
+            return
+
+        amostra = f.read(4096)
+        f.seek(0)
+        try:
+            delimitador = csv.Sniffer().sniff(amostra, delimiters=';,\t').delimiter
+        except csv.Error:
+            delimitador = ';' if ';' in amostra else ','
+        leitor = csv.reader(f, delimiter=delimitador)
+        cabecalho = [c.strip().lower() for c in next(leitor, [])]
+        faltando = {'nome', 'quantidade', 'preco_venda'} - set(cabecalho)
+        if faltando:
+            raise ValueError(f"Cabeçalho do CSV sem a(s) coluna(s): {', '.join(sorted(faltando))}.")
+        for numero, linha in enumerate(leitor, start=2):
+            if not any(c.strip() for c in linha):
+                continue
+            yield numero, dict(zip(cabecalho, linha)), delimitador.join(linha)
+
+def _validar(registro):
+    """Registro -> tupla de gravar_lote_produtos. Lança ValueError com o motivo."""
+    def campo(nome):
+        valor = registro.get(nome)
+        return '' if valor is None else str(valor).strip()
+
+    produto_id = campo('id')
+    if produto_id:
+        try:
+            produto_id = int(produto_id)
+        except ValueError:
+            raise ValueError(f"ID inválido: '{produto_id}'")
+    dados = logic_produtos.validar_e_processar_produto(
+        campo('nome'), campo('quantidade'), campo('preco_venda'), campo('preco_custo') or '0',
+        campo('categoria'), campo('fornecedor'), campo('codigo_barras'))
+    return (produto_id or None,) + tuple(dados)
+
+def importar_produtos(caminho, formato=None, usuario_id=None, tamanho_lote=TAMANHO_LOTE):
+    """
+    Importa o arquivo em lotes. Retorna {'lidas', 'inseridos', 'atualizados',
+    'rejeitados', 'arquivo_rejeitados' (None se nenhuma), 'segundos'}.
+    """
+    formato = _formato(caminho, formato)
+    observacao = f"Importação de {os.path.basename(caminho)}"
+    caminho_rejeitados = f"{caminho}.rejeitados.csv"
+    resultado = {'lidas': 0, 'inseridos': 0, 'atualizados': 0, 'rejeitados': 0}
+    inicio = time.perf_counter()
+
+    with open(caminho_rejeitados, 'w', newline='', encoding='utf-8') as arq_rejeitados:
+        rejeitados = csv.writer(arq_rejeitados, delimiter=';')
+        rejeitados.writerow(('linha', 'motivo', 'conteudo'))
+
+        def rejeitar(numero, motivo, texto):
+            rejeitados.writerow((numero, motivo, texto))
+            resultado['rejeitados'] += 1
+
+        def gravar(lote):
+            linhas = [l for _, l, _ in lote]
+            try:
+                inseridos, atualizados, recusadas = db.gravar_lote_produtos(linhas, usuario_id, observacao)
+            except sqlite3.IntegrityError:
+                if len(lote) == 1:
+                    numero, _, texto = lote[0]
+                    rejeitar(numero, "conflito com produto já cadastrado", texto)
+                    return
+                # Algo no lote violou uma restrição: grava uma a uma para isolar a linha
+                for item in lote:
+                    gravar([item])
+                return
+            resultado['inseridos'] += inseridos
+            resultado['atualizados'] += atualizados
+            for indice, motivo in recusadas:
+                numero, _, texto = lote[indice]
+                rejeitar(numero, motivo, texto)
+
+        lote, codigos_no_lote = [], {}
+        for numero, registro, texto in _registros(caminho, formato):
+            resultado['lidas'] += 1
+            if registro is None:
+                rejeitar(numero, "linha ilegível (esperado um objeto JSON)", texto)
+                continue
+            try:
+                linha = _validar(registro)
+            except ValueError as e:
+                rejeitar(numero, str(e), texto)
+                continue
+            codigo = linha[7]
+            if codigo and codigo in codigos_no_lote:
+                # O mesmo código duas vezes no lote viraria dois produtos novos
+                gravar(lote)
+                lote, codigos_no_lote = [], {}
+            lote.append((numero, linha, texto))
+            if codigo:
+                codigos_no_lote[codigo] = numero
+            if len(lote) >= tamanho_lote:
+                gravar(lote)
+                lote, codigos_no_lote = [], {}
+                logging.info(f"Importação de produtos: {resultado['lidas']} linha(s) processada(s)...")
+        if lote:
+            gravar(lote)
+
+    if not resultado['rejeitados']:
+        os.remove(caminho_rejeitados)
+    resultado['arquivo_rejeitados'] = caminho_rejeitados if resultado['rejeitados'] else None
+    resultado['segundos'] = time.perf_counter() - inicio
+    logging.info(f"Importação de produtos '{caminho}': {resultado}")
+    return resultado
+
+def _como_registro(p):
+    # p = (id, nome, qtd, preco(legacy), venda, custo, cat, forn, codigo_barras)
+    return {'id': p[0], 'nome': p[1], 'quantidade': p[2], 'preco_venda': dinheiro.formatar_valor(p[4]),
+            'preco_custo': dinheiro.formatar_valor(p[5]), 'categoria': p[6] or '', 'fornecedor': p[7] or '',
+            'codigo_barras': p[8] or ''}
+
+def exportar_produtos(caminho, formato=None, tamanho_lote=TAMANHO_LOTE):
+    """Grava todos os produtos em CSV (';') ou JSON Lines, no formato aceito por importar_produtos. Retorna a quantidade."""
+    formato = _formato(caminho, formato)
+    total = 0
+    with open(caminho, 'w', newline='', encoding='utf-8') as f:
+        if formato == 'csv':
+            escritor = csv.DictWriter(f, fieldnames=COLUNAS, delimiter=';')
+            escritor.writeheader()
+        for lote in db.lotes_produtos(tamanho_lote):
+            registros = [_como_registro(p) for p in lote]
+            if formato == 'csv':
+                escritor.writerows(registros)
+            else:
+                f.writelines(json.dumps(r, ensure_ascii=False) + '\n' for r in registros)
+            total += len(lote)
+    logging.info(f"Exportação de produtos: {total} produto(s) em '{caminho}'")
+    return total
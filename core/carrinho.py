@@ -0,0 +1,108 @@
+"""
+Carrinho do PDV indexado pelo ID do produto.
+
+Bipar o mesmo produto de novo soma na linha existente (busca O(1) no dict),
+o total é atualizado a cada mudança em vez de somar todas as linhas, e a
+quantidade acumulada é conferida contra o estoque lido do banco.
+Cada linha tem um iid fixo para a Treeview (ItemCarrinho.iid).
+"""
+
+
+class ItemCarrinho:
+    """Uma linha do carrinho (valores em centavos)."""
+    __slots__ = ('produto_id', 'nome', 'quantidade', 'preco_unitario', 'estoque')
+
+    def __init__(self, produto_id, nome, quantidade, preco_unitario, estoque):
+        self.produto_id = produto_id
+        self.nome = nome
+        self.quantidade = quantidade
+        self.preco_unitario = preco_unitario
+        self.estoque = estoque
+
+    @property
+    def subtotal(self):
+        return self.quantidade * self.preco_unitario
+
+    @property
+    def iid(self):
+        return f"item{self.produto_id}"
+
+    def como_tupla(self):
+        """(id, nome, qtd, preco_unitario, subtotal): formato de processar_venda_completa."""
+        return (self.produto_id, self.nome, self.quantidade, self.preco_unitario, self.subtotal)
+
+
+class Carrinho:
+    def __init__(self):
+        self._itens = {} # produto_id -> ItemCarrinho (mantém a ordem de inclusão)
+        self.total = 0   # soma dos subtotais, em centavos
+        self.quantidade_total = 0
+
+    def __len__(self):
+        return len(self._itens)
+
+    def __iter__(self):
+        return iter(self._itens.values())
+
+    def item(self, produto_id):
+        return self._itens.get(produto_id)
+
+    def por_iid(self, iid):
+        """Linha ligada ao iid da Treeview (None se não existir)."""
+        if not iid.startswith("item"):
+            return None
+        try:
+            return self._itens.get(int(iid[4:]))
+        except ValueError:
+            return None
+
+    def adicionar(self, produto, quantidade):
+        """
+        Inclui 'quantidade' do produto (tupla do banco: id, nome, qtd, preco, ...).
+        Se já estiver no carrinho, soma na mesma linha (o preço é o da primeira inclusão).
+        Retorna (item, nova_linha). Lança ValueError se passar do estoque.
+        """
+        produto_id, nome, estoque, preco = produto[0], produto[1], produto[2], produto[3]
+        item = self._itens.get(produto_id)
+        no_carrinho = item.quantidade if item else 0
+        if no_carrinho + quantidade > estoque:
+            raise ValueError(f"Estoque insuficiente! Disp: {estoque}, no carrinho: {no_carrinho}")
+
+        nova_linha = item is None
+        if nova_linha:
+            item = ItemCarrinho(produto_id, nome, 0, preco, estoque)
+            self._itens[produto_id] = item
+        item.estoque = estoque
+        self._somar(item, quantidade)
+        return item, nova_linha
+
+    def alterar_quantidade(self, produto_id, quantidade):
+        """Define a quantidade da linha (0 remove). Retorna o item, ou None se foi removido."""
+        item = self._itens[produto_id]
+        if quantidade <= 0:
+            self.remover(produto_id)
+            return None
+        if quantidade > item.estoque:
+            raise ValueError(f"Estoque insuficiente! Disp: {item.estoque}")
+        self._somar(item, quantidade - item.quantidade)
+        return item
+
+    def remover(self, produto_id):
+        item = self._itens.pop(produto_id)
+        self.total -= item.subtotal
+        self.quantidade_total -= item.quantidade
+        return item
+
+    def limpar(self):
+        self._itens.clear()
+        self.total = 0
+        self.quantidade_total = 0
+
+    def como_lista(self):
+        """Linhas como tuplas (id, nome, qtd, preco_unitario, subtotal), na ordem de inclusão."""
+        return [item.como_tupla() for item in self._itens.values()]
+
+    def _somar(self, item, quantidade):
+        item.quantidade += quantidade
+        self.total += quantidade * item.preco_unitario
+        self.quantidade_total += quantidade
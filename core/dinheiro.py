@@ -0,0 +1,48 @@
+"""
+Valores em dinheiro como centavos (int).
+
+O banco guarda preços, totais, frete, troco e lançamentos do caixa em
+INTEGER (centavos) desde a migração 6. Dentro do sistema as contas são feitas
+em centavos, que somam sem erro de arredondamento; a conversão para reais só
+acontece na entrada (texto digitado) e na saída (tela, PDF, gráficos).
+"""
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+_CEM = Decimal(100)
+
+
+def para_centavos(valor):
+    """
+    Converte um valor em reais para centavos.
+    Aceita texto digitado ('12,50', '1.234,56', 'R$ 3.10'), int, float ou Decimal.
+    Lança ValueError se não for um número.
+    """
+    if isinstance(valor, str):
+        texto = valor.replace('R$', '').strip()
+        if ',' in texto:
+            texto = texto.replace('.', '').replace(',', '.') # Formato brasileiro
+        valor = texto
+    elif isinstance(valor, float):
+        valor = repr(valor) # Evita levar o erro binário do float (0.1 -> 0.1000000000000000055...)
+    try:
+        reais = Decimal(valor)
+    except (InvalidOperation, TypeError):
+        raise ValueError(f"Valor inválido: {valor!r}")
+    if not reais.is_finite():
+        raise ValueError(f"Valor inválido: {valor!r}")
+    return int((reais * _CEM).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+def em_reais(centavos):
+    """Centavos -> float em reais. Só para exibição (ex.: gráficos), nunca para contas."""
+    return (centavos or 0) / 100
+
+def formatar_valor(centavos):
+    """Centavos -> '1234.56' (sem símbolo; também serve para preencher campos)."""
+    centavos = centavos or 0
+    sinal = '-' if centavos < 0 else ''
+    inteiro, resto = divmod(abs(centavos), 100)
+    return f"{sinal}{inteiro}.{resto:02d}"
+
+def formatar(centavos):
+    """Centavos -> 'R$ 1234.56'."""
+    return f"R$ {formatar_valor(centavos)}"
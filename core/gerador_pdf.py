@@ -1,74 +1,245 @@
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+import logging
 import os
+import time
+from core import dinheiro
 
-def gerar_cupom_pdf(venda_id, itens, total, cliente_nome, valor_frete, vendedor_nome, metodo_pagto, valor_pago, troco):
-    if not os.path.exists('comprovantes'):
-        os.makedirs('comprovantes')
-    
-    filename = f'comprovantes/venda_{venda_id}.pdf'
-    c = canvas.Canvas(filename, pagesize=A4)
-    y = 800
+PASTA_COMPROVANTES = 'comprovantes'
+
+# Layout (pontos; A4 = 595 x 842)
+TOPO = 800
+LIMITE_INFERIOR = 80        # abaixo disso quebra a página (rodapé fica em 50)
+ALTURA_LINHA_ITEM = 20
+ALTURA_TOTAIS = 150         # frete + total + pagamento: não separa do fim do cupom
+
+# Lotes grandes são divididos em partes geradas em paralelo (uma por processo).
+# Abaixo disso abrir os processos custa mais do que gerar tudo em um só.
+LIMIAR_PROCESSOS = 1000     # vendas
+VENDAS_POR_PARTE = 500
+
+
+class _Documento:
+    """
+    Canvas com cursor vertical que quebra a página sozinho.
+    'continuacao' (opcional) redesenha um cabeçalho curto no topo da página nova.
+    """
+
+    def __init__(self, caminho, titulo):
+        self.caminho = caminho
+        self.c = canvas.Canvas(caminho, pagesize=A4)
+        self.c.setTitle(titulo)
+        self.y = TOPO
+        self.paginas = 1
+        self.continuacao = None
+
+    def reservar(self, altura):
+        """Garante 'altura' livre na página atual; senão passa para a próxima."""
+        if self.y - altura < LIMITE_INFERIOR:
+            self.nova_pagina()
+            if self.continuacao:
+                self.continuacao(self)
+
+    def nova_pagina(self):
+        self._rodape()
+        self.c.showPage()
+        self.paginas += 1
+        self.y = TOPO
+
+    def _rodape(self):
+        self.c.setFont("Helvetica-Oblique", 10)
+        self.c.drawString(50, 50, "Obrigado pela preferência | Sys360 ERP")
+        self.c.drawRightString(550, 50, f"Página {self.paginas}")
+
+    def salvar(self):
+        self._rodape()
+        self.c.save()
+        return self.paginas
+
+
+# --- CUPOM ---
+def _cabecalho_itens(doc):
+    c = doc.c
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(50, doc.y, "Item")
+    c.drawString(250, doc.y, "Qtd")
+    c.drawString(350, doc.y, "Unit")
+    c.drawString(450, doc.y, "Total")
+    c.line(50, doc.y-5, 550, doc.y-5)
+    doc.y -= 25
+    c.setFont("Helvetica", 10)
+
+def _titulo_continuacao(doc, venda_id):
+    doc.c.setFont("Helvetica-Bold", 12)
+    doc.c.drawString(50, doc.y, f"Venda Nº: {venda_id} (continuação)")
+    doc.y -= 30
+
+def _desenhar_cupom(doc, venda, itens):
+    """
+    Desenha um cupom a partir da posição atual, quebrando páginas se preciso.
+    venda = (id, data_hora, cliente, vendedor, total, frete, metodo_pagto, valor_pago, troco)
+    itens = [(id, nome, qtd, preco, subtotal), ...]  (valores em centavos)
+    """
+    venda_id, data_hora, cliente_nome, vendedor_nome, total, valor_frete, metodo_pagto, valor_pago, troco = venda
+    c = doc.c
 
     # Cabeçalho
     c.setFont("Helvetica-Bold", 16)
-    c.drawString(50, y, "Sys360 - Comprovante de Venda")
-    y -= 30
+    c.drawString(50, doc.y, "Sys360 - Comprovante de Venda")
+    doc.y -= 30
 
     c.setFont("Helvetica", 12)
-    c.drawString(50, y, f"Venda Nº: {venda_id}")
-    c.drawString(300, y, f"Data: {datetime.now().strftime('%d/%m/%Y %H:%M')}")
-    y -= 20
-    c.drawString(50, y, f"Cliente: {cliente_nome if cliente_nome else 'Consumidor Final'}")
-    c.drawString(300, y, f"Vendedor: {vendedor_nome}")
-    y -= 40
-
-    # Itens
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(50, y, "Item")
-    c.drawString(250, y, "Qtd")
-    c.drawString(350, y, "Unit")
-    c.drawString(450, y, "Total")
-    c.line(50, y-5, 550, y-5)
-    y -= 25
+    c.drawString(50, doc.y, f"Venda Nº: {venda_id}")
+    c.drawString(300, doc.y, f"Data: {data_hora or datetime.now().strftime('%d/%m/%Y %H:%M')}")
+    doc.y -= 20
+    c.drawString(50, doc.y, f"Cliente: {cliente_nome if cliente_nome else 'Consumidor Final'}")
+    c.drawString(300, doc.y, f"Vendedor: {vendedor_nome}")
+    doc.y -= 40
 
-    c.setFont("Helvetica", 10)
+    # Itens (páginas seguintes repetem o número da venda e os títulos das colunas)
+    def _continuacao_itens(doc):
+        _titulo_continuacao(doc, venda_id)
+        _cabecalho_itens(doc)
+
+    _cabecalho_itens(doc)
+    doc.continuacao = _continuacao_itens
     for item in itens:
-        # item: (id, nome, qtd, preco, subtotal)
+        doc.reservar(ALTURA_LINHA_ITEM)
         nome = str(item[1])
-        c.drawString(50, y, f"{nome[:35]}")
-        c.drawString(250, y, str(item[2]))
-        c.drawString(350, y, f"{float(item[3]):.2f}")
-        c.drawString(450, y, f"{float(item[4]):.2f}")
-        y -= 20
+        c.drawString(50, doc.y, f"{nome[:35]}")
+        c.drawString(250, doc.y, str(item[2]))
+        c.drawString(350, doc.y, dinheiro.formatar_valor(item[3]))
+        c.drawString(450, doc.y, dinheiro.formatar_valor(item[4]))
+        doc.y -= ALTURA_LINHA_ITEM
 
-    c.line(50, y+10, 550, y+10)
-    y -= 30
+    c.line(50, doc.y+10, 550, doc.y+10)
+    doc.y -= 30
 
-    # Totais e Pagamento
+    # Totais e Pagamento (bloco inteiro na mesma página)
+    doc.continuacao = lambda doc: _titulo_continuacao(doc, venda_id)
+    doc.reservar(ALTURA_TOTAIS)
     c.setFont("Helvetica-Bold", 12)
-    
+
     if valor_frete > 0:
-        c.drawString(350, y, "Frete:")
-        c.drawString(450, y, f"R$ {valor_frete:.2f}")
-        y -= 20
-        
-    c.drawString(350, y, "TOTAL A PAGAR:")
+        c.drawString(350, doc.y, "Frete:")
+        c.drawString(450, doc.y, dinheiro.formatar(valor_frete))
+        doc.y -= 20
+
+    c.drawString(350, doc.y, "TOTAL A PAGAR:")
     c.setFont("Helvetica-Bold", 14)
-    c.drawString(450, y, f"R$ {total:.2f}")
-    y -= 30
-    
+    c.drawString(450, doc.y, dinheiro.formatar(total))
+    doc.y -= 30
+
     # Detalhes do Pagamento
     c.setFont("Helvetica", 11)
-    c.drawString(50, y, f"Forma de Pagamento: {metodo_pagto}")
-    y -= 15
-    c.drawString(50, y, f"Valor Pago: R$ {valor_pago:.2f}")
-    y -= 15
-    c.drawString(50, y, f"Troco: R$ {troco:.2f}")
-
-    # Rodapé
-    c.setFont("Helvetica-Oblique", 10)
-    c.drawString(50, 50, "Obrigado pela preferência | Sys360 ERP")
-    c.save()
-    return filename
\ No newline at end of file
+    c.drawString(50, doc.y, f"Forma de Pagamento: {metodo_pagto}")
+    doc.y -= 15
+    c.drawString(50, doc.y, f"Valor Pago: {dinheiro.formatar(valor_pago)}")
+    doc.y -= 15
+    c.drawString(50, doc.y, f"Troco: {dinheiro.formatar(troco)}")
+    doc.y -= 15
+    doc.continuacao = None
+
+def _pasta():
+    if not os.path.exists(PASTA_COMPROVANTES):
+        os.makedirs(PASTA_COMPROVANTES)
+    return PASTA_COMPROVANTES
+
+def gerar_cupom_pdf(venda_id, itens, total, cliente_nome, valor_frete, vendedor_nome, metodo_pagto, valor_pago, troco, data_hora=None):
+    # Valores em centavos; data_hora já formatada (padrão: agora)
+    filename = f'{_pasta()}/venda_{venda_id}.pdf'
+    doc = _Documento(filename, f"Comprovante da venda {venda_id}")
+    venda = (venda_id, data_hora, cliente_nome, vendedor_nome, total, valor_frete, metodo_pagto, valor_pago, troco)
+    _desenhar_cupom(doc, venda, itens)
+    doc.salvar()
+    return filename
+
+
+# --- LOTES (vários cupons em um documento) ---
+def gerar_lote_pdf(vendas, caminho, titulo="Comprovantes"):
+    """
+    Gera um único PDF com os cupons de 'vendas' (lista de (venda, itens), como
+    em db_manager.dados_comprovantes), um por página. Retorna o nº de páginas.
+    """
+    doc = _Documento(caminho, titulo)
+    for i, (venda, itens) in enumerate(vendas):
+        if i:
+            doc.nova_pagina()
+        _desenhar_cupom(doc, venda, itens)
+    return doc.salvar()
+
+def _gerar_parte(args):
+    # Roda em outro processo: precisa ser função de módulo (picklable)
+    vendas, caminho, titulo = args
+    return caminho, gerar_lote_pdf(vendas, caminho, titulo)
+
+def renderizar_lote(vendas, nome, titulo="Comprovantes", processos=None):
+    """
+    Gera os cupons de 'vendas' em comprovantes/<nome>.pdf.
+    Acima de LIMIAR_PROCESSOS vendas (e com mais de um núcleo), divide em partes
+    de VENDAS_POR_PARTE geradas em paralelo (<nome>_parte1.pdf, ...);
+    processos=1 força um arquivo só.
+    Retorna (lista de caminhos, total de páginas, páginas por segundo).
+    """
+    pasta = _pasta()
+    inicio = time.perf_counter()
+    processos = processos or os.cpu_count() or 1
+    if len(vendas) < LIMIAR_PROCESSOS or processos == 1:
+        caminho = f'{pasta}/{nome}.pdf'
+        resultados = [(caminho, gerar_lote_pdf(vendas, caminho, titulo))]
+    else:
+        partes = [(vendas[i:i + VENDAS_POR_PARTE], f'{pasta}/{nome}_parte{n}.pdf', f"{titulo} (parte {n})")
+                  for n, i in enumerate(range(0, len(vendas), VENDAS_POR_PARTE), start=1)]
+        with ProcessPoolExecutor(max_workers=processos) as pool:
+            resultados = list(pool.map(_gerar_parte, partes))
+
+    decorrido = time.perf_counter() - inicio
+    paginas = sum(p for _, p in resultados)
+    por_segundo = paginas / decorrido if decorrido > 0 else 0.0
+    logging.info(f"PDF '{nome}': {len(vendas)} venda(s), {paginas} página(s) em {decorrido:.2f} s "
+                 f"({por_segundo:.0f} páginas/s, {len(resultados)} arquivo(s))")
+    return [c for c, _ in resultados], paginas, por_segundo
+
+
+# --- ROMANEIO DE ENTREGA ---
+def gerar_romaneio_pdf(entregas, vendas, nome="romaneio"):
+    """
+    Romaneio: lista das entregas (id, cliente, endereço, data) seguida do
+    cupom de cada venda, tudo em um documento. Retorna (caminho, páginas).
+    """
+    caminho = f'{_pasta()}/{nome}.pdf'
+    doc = _Documento(caminho, "Romaneio de Entrega")
+    c = doc.c
+
+    def _titulos(doc):
+        doc.c.setFont("Helvetica-Bold", 11)
+        doc.c.drawString(50, doc.y, "Venda")
+        doc.c.drawString(100, doc.y, "Cliente")
+        doc.c.drawString(260, doc.y, "Endereço")
+        doc.c.line(50, doc.y-5, 550, doc.y-5)
+        doc.y -= 25
+        doc.c.setFont("Helvetica", 10)
+
+    c.setFont("Helvetica-Bold", 16)
+    c.drawString(50, doc.y, "Sys360 - Romaneio de Entrega")
+    doc.y -= 20
+    c.setFont("Helvetica", 11)
+    c.drawString(50, doc.y, f"Emitido em {datetime.now().strftime('%d/%m/%Y %H:%M')} | {len(entregas)} entrega(s)")
+    doc.y -= 30
+
+    _titulos(doc)
+    doc.continuacao = _titulos
+    for e in entregas:
+        doc.reservar(ALTURA_LINHA_ITEM)
+        c.drawString(50, doc.y, str(e[0]))
+        c.drawString(100, doc.y, str(e[1] or 'Consumidor Final')[:25])
+        c.drawString(260, doc.y, str(e[2] or '---')[:50])
+        doc.y -= ALTURA_LINHA_ITEM
+    doc.continuacao = None
+
+    for venda, itens in vendas:
+        doc.nova_pagina()
+        _desenhar_cupom(doc, venda, itens)
+    return caminho, doc.salvar()
\ No newline at end of file
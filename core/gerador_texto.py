@@ -0,0 +1,108 @@
+"""
+Comprovante em texto de largura fixa ou ESC/POS (impressora térmica 80 mm).
+
+Alternativa ao gerador_pdf para o caixa: a partir dos mesmos dados da venda
+monta as linhas do cupom, sem reportlab. Cada linha leva um estilo
+(None, 'titulo' ou 'destaque'); o modo texto ignora os estilos e o ESC/POS os
+traduz em comandos da impressora.
+"""
+import os
+from datetime import datetime
+from core import dinheiro
+
+COLUNAS_PADRAO = 48         # 80 mm, fonte A
+COLUNAS_MINIMO = 32         # 58 mm; abaixo disso não sobra espaço para o nome do item
+LARGURA_FIXA_ITEM = 25      # qtd (5) + unit (10) + total (10)
+CODIFICACAO_ESCPOS = 'cp850'
+
+# Comandos ESC/POS (padrão Epson, aceito pela maioria das térmicas)
+ESC_INICIAR = b'\x1b@'
+ESC_TABELA_CP850 = b'\x1bt\x02'
+ESC_CENTRO = b'\x1ba\x01'
+ESC_ESQUERDA = b'\x1ba\x00'
+ESC_NEGRITO = b'\x1bE\x01'
+ESC_NORMAL = b'\x1bE\x00'
+GS_DUPLO = b'\x1d!\x11'
+GS_TAMANHO_NORMAL = b'\x1d!\x00'
+ESC_AVANCAR_4 = b'\x1bd\x04'
+GS_CORTE_PARCIAL = b'\x1dV\x42\x00'
+
+
+def _dois_lados(esquerda, direita, colunas):
+    espaco = max(1, colunas - len(esquerda) - len(direita))
+    return f"{esquerda}{' ' * espaco}{direita}"[:colunas]
+
+def linhas_cupom(venda, itens, colunas=COLUNAS_PADRAO):
+    """
+    Linhas (estilo, texto) do cupom, cada texto com no máximo 'colunas' caracteres.
+    venda = (id, data_hora, cliente, vendedor, total, frete, metodo_pagto, valor_pago, troco)
+    itens = [(id, nome, qtd, preco, subtotal), ...]  (valores em centavos)
+    """
+    venda_id, data_hora, cliente_nome, vendedor_nome, total, valor_frete, metodo_pagto, valor_pago, troco = venda
+    separador = '-' * colunas
+    largura_nome = max(1, colunas - LARGURA_FIXA_ITEM)
+
+    linhas = [('titulo', "Sys360"), (None, "Comprovante de Venda".center(colunas).rstrip()), (None, separador)]
+    linhas.append((None, _dois_lados(f"Venda Nº: {venda_id}", data_hora or datetime.now().strftime('%d/%m/%Y %H:%M'), colunas)))
+    linhas.append((None, f"Cliente: {cliente_nome if cliente_nome else 'Consumidor Final'}"[:colunas]))
+    linhas.append((None, f"Vendedor: {vendedor_nome}"[:colunas]))
+    linhas.append((None, separador))
+
+    linhas.append(('destaque', f"{'Item':<{largura_nome}}{'Qtd':>5}{'Unit':>10}{'Total':>10}"))
+    for item in itens:
+        nome = str(item[1])[:largura_nome]
+        linhas.append((None, f"{nome:<{largura_nome}}{item[2]:>5}"
+                             f"{dinheiro.formatar_valor(item[3]):>10}{dinheiro.formatar_valor(item[4]):>10}"))
+    linhas.append((None, separador))
+
+    if valor_frete > 0:
+        linhas.append((None, _dois_lados("Frete:", dinheiro.formatar(valor_frete), colunas)))
+    linhas.append(('destaque', _dois_lados("TOTAL A PAGAR:", dinheiro.formatar(total), colunas)))
+    linhas.append((None, f"Forma de Pagamento: {metodo_pagto}"[:colunas]))
+    linhas.append((None, _dois_lados("Valor Pago:", dinheiro.formatar(valor_pago), colunas)))
+    linhas.append((None, _dois_lados("Troco:", dinheiro.formatar(troco), colunas)))
+    linhas.append((None, separador))
+    rodape = "Obrigado pela preferência | Sys360 ERP"
+    if len(rodape) > colunas:
+        rodape = "Obrigado pela preferência!"
+    linhas.append((None, rodape.center(colunas).rstrip()))
+    return linhas
+
+def cupom_texto(venda, itens, colunas=COLUNAS_PADRAO):
+    """Cupom como texto simples (uma linha por linha do cupom)."""
+    linhas = []
+    for estilo, texto in linhas_cupom(venda, itens, colunas):
+        linhas.append(texto.center(colunas).rstrip() if estilo == 'titulo' else texto)
+    return "\n".join(linhas) + "\n"
+
+def cupom_escpos(venda, itens, colunas=COLUNAS_PADRAO):
+    """Cupom como bytes ESC/POS: título em tamanho duplo, destaques em negrito, corte no final."""
+    saida = [ESC_INICIAR, ESC_TABELA_CP850]
+    for estilo, texto in linhas_cupom(venda, itens, colunas):
+        dados = texto.encode(CODIFICACAO_ESCPOS, errors='replace') + b'\n'
+        if estilo == 'titulo':
+            saida += [ESC_CENTRO, GS_DUPLO, ESC_NEGRITO, dados, ESC_NORMAL, GS_TAMANHO_NORMAL, ESC_ESQUERDA]
+        elif estilo == 'destaque':
+            saida += [ESC_NEGRITO, dados, ESC_NORMAL]
+        else:
+            saida.append(dados)
+    saida += [ESC_AVANCAR_4, GS_CORTE_PARCIAL]
+    return b''.join(saida)
+
+def gravar_cupom(venda, itens, modo='texto', destino=None, colunas=COLUNAS_PADRAO):
+    """
+    Gera o cupom em 'texto' ou 'escpos' e grava em 'destino' (arquivo ou
+    dispositivo da impressora, ex.: /dev/usb/lp0, LPT1, \\\\PC\\Termica).
+    Sem destino, grava em comprovantes/venda_<id>.txt (ou .bin). Retorna o caminho.
+    """
+    if modo == 'escpos':
+        dados = cupom_escpos(venda, itens, colunas)
+    else:
+        dados = cupom_texto(venda, itens, colunas).encode('utf-8')
+    if not destino:
+        if not os.path.exists('comprovantes'):
+            os.makedirs('comprovantes')
+        destino = f"comprovantes/venda_{venda[0]}.{'bin' if modo == 'escpos' else 'txt'}"
+    with open(destino, 'wb') as f:
+        f.write(dados)
+    return destino
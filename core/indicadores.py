@@ -0,0 +1,99 @@
+"""
+Indicadores (KPIs) do Dashboard, cada um em uma consulta agregada.
+
+Contagem de produtos com COUNT(*), estoque baixo pelo índice de quantidade
+(migração 10), vendas de hoje pela faixa de data_hora do dia local (índice da
+migração 11) e saldo na linha de financeiro_saldo (migração 5): nada carrega
+o catálogo inteiro.
+O resultado fica em cache por até TTL_S segundos e é descartado antes disso
+se o banco mudou (db_manager.versao_dados, como em cache_produtos).
+"""
+import threading
+import time
+
+from database import db_manager as db
+from core import logic_financeiro
+
+TTL_S = 30                  # "hoje" e vendas de outros terminais aparecem em no máximo 30 s
+LIMITE_ESTOQUE_PADRAO = 5   # config.json: estoque_minimo
+MAX_ALERTAS = 50            # linhas da lista; o total vem no contador
+
+# COUNT(*) percorre o menor índice (só inteiros), não as linhas do catálogo
+SQL_TOTAL_PRODUTOS = db.registrar_consulta("indicadores.total_produtos", "SELECT COUNT(*) FROM produtos",
+                                           varredura_esperada=True)
+SQL_ESTOQUE_BAIXO = db.registrar_consulta("indicadores.estoque_baixo", """
+    SELECT id, nome, quantidade FROM produtos
+    WHERE quantidade < ?
+    ORDER BY quantidade, id
+    LIMIT ?
+""")
+SQL_QTD_ESTOQUE_BAIXO = db.registrar_consulta("indicadores.qtd_estoque_baixo",
+                                              "SELECT COUNT(*) FROM produtos WHERE quantidade < ?")
+# "Hoje" é o dia local (como no histórico e no estoque na data); o resumo diário
+# agrupa por dia UTC e à noite já estaria no dia seguinte, por isso lê a faixa em vendas
+SQL_VENDAS_HOJE = db.registrar_consulta("indicadores.vendas_hoje", """
+    SELECT COUNT(*), COALESCE(SUM(total_venda), 0) FROM vendas
+    WHERE data_hora >= datetime(date('now', 'localtime'), 'utc')
+      AND data_hora < datetime(date('now', 'localtime'), '+1 day', 'utc')
+""")
+
+_lock = threading.Lock()
+_cache = {} # limite -> (instante, versao, resumo)
+
+
+def obter_limite_estoque():
+    """Quantidade abaixo da qual o produto entra no alerta de estoque baixo."""
+    try:
+        return max(0, int(db.obter_config().get('estoque_minimo', LIMITE_ESTOQUE_PADRAO)))
+    except (TypeError, ValueError):
+        return LIMITE_ESTOQUE_PADRAO
+
+def salvar_limite_estoque(valor):
+    try:
+        limite = int(str(valor).strip())
+    except ValueError:
+        raise ValueError("O estoque mínimo deve ser um número inteiro.")
+    if limite < 0:
+        raise ValueError("O estoque mínimo não pode ser negativo.")
+    db.atualizar_config(estoque_minimo=limite)
+    invalidar()
+
+def _calcular(limite):
+    with db.conexao() as conn:
+        total_produtos = conn.execute(SQL_TOTAL_PRODUTOS).fetchone()[0]
+        alertas = conn.execute(SQL_ESTOQUE_BAIXO, (limite, MAX_ALERTAS)).fetchall()
+        # Lista incompleta: só então conta o total
+        qtd_alertas = len(alertas) if len(alertas) < MAX_ALERTAS else conn.execute(SQL_QTD_ESTOQUE_BAIXO, (limite,)).fetchone()[0]
+        vendas = conn.execute(SQL_VENDAS_HOJE).fetchone() or (0, 0)
+    return {
+        'qtd_produtos': total_produtos,
+        'limite_estoque': limite,
+        'alertas': alertas, # (id, nome, qtd), menor estoque primeiro
+        'qtd_alertas': qtd_alertas,
+        'vendas_hoje': vendas[0],
+        'total_hoje': vendas[1], # centavos
+        'saldo': logic_financeiro.obter_saldo_atual(),
+    }
+
+def resumo(limite=None):
+    """
+    {'qtd_produtos', 'limite_estoque', 'alertas', 'qtd_alertas', 'vendas_hoje',
+    'total_hoje', 'saldo'} (valores em centavos). Usa o cache se ainda valer.
+    """
+    limite = obter_limite_estoque() if limite is None else limite
+    versao = db.versao_dados()
+    agora = time.monotonic()
+    with _lock:
+        guardado = _cache.get(limite)
+        if guardado and guardado[1] == versao and agora - guardado[0] < TTL_S:
+            return guardado[2]
+
+    valores = _calcular(limite)
+    with _lock:
+        _cache[limite] = (agora, versao, valores)
+    return valores
+
+def invalidar():
+    """Descarta o cache (a próxima chamada de resumo() relê o banco)."""
+    with _lock:
+        _cache.clear()
@@ -1,73 +1,81 @@
 import sqlite3
-from database import db_manager
+from database import db_manager, migracoes
+from core import logic_financeiro
 from datetime import datetime, timedelta
 
-def obter_vendas_ultimos_7_dias():
-    conn = db_manager.conectar()
+# As consultas de vendas leem os resumos mantidos por triggers (migração 4):
+# o custo depende do período pedido, não do tamanho do histórico.
+SQL_VENDAS_7_DIAS = db_manager.registrar_consulta("analytics.vendas_7_dias", """
+    SELECT strftime('%d/%m', dia), total
+    FROM vendas_resumo_dia
+    WHERE dia >= date('now', '-6 days') AND qtd_vendas > 0
+    ORDER BY dia ASC
+""")
 
-    if not conn: return []
+SQL_TOP_5_PRODUTOS = db_manager.registrar_consulta("analytics.top_5_produtos", """
+    SELECT p.nome, r.quantidade
+    FROM vendas_resumo_produto r
+    JOIN produtos p ON r.produto_id = p.id
+    WHERE r.quantidade > 0
+    ORDER BY r.quantidade DESC
+    LIMIT 5
+""")
 
-    try:
-        cursor = conn.cursor()
-        # SQLite query para agrupar vendas por dia
+SQL_TOP_5_PRODUTOS_PERIODO = db_manager.registrar_consulta("analytics.top_5_produtos_periodo", """
+    SELECT p.nome, SUM(r.quantidade) as total
+    FROM vendas_resumo_produto_dia r
+    JOIN produtos p ON r.produto_id = p.id
+    WHERE r.dia >= date('now', ?)
+    GROUP BY r.produto_id
+    HAVING total > 0
+    ORDER BY total DESC
+    LIMIT 5
+""")
 
-        sql = """
-            SELECT strftime('%d/%m', data_hora) as dia, SUM(total_venda) 
-            FROM vendas 
-            WHERE data_hora >= date('now', '-6 days')
-            GROUP BY dia
-            ORDER BY data_hora ASC
-        """
-        cursor.execute(sql)
-        dados = cursor.fetchall()
+SQL_VENDAS_POR_PAGAMENTO = db_manager.registrar_consulta("analytics.vendas_por_pagamento", """
+    SELECT metodo_pagamento, SUM(qtd_vendas), SUM(total)
+    FROM vendas_resumo_pagamento_dia
+    WHERE dia >= date('now', ?)
+    GROUP BY metodo_pagamento
+    ORDER BY 3 DESC
+""")
 
-        # Garante que dias sem vendas não quebrem o gráfico (opcional, aqui retornamos o que tem)
-        return dados
+
+def obter_vendas_ultimos_7_dias():
+    try:
+        with db_manager.conexao() as conn:
+            # SQLite query para agrupar vendas por dia
+            dados = conn.execute(SQL_VENDAS_7_DIAS).fetchall()
+
+            # Garante que dias sem vendas não quebrem o gráfico (opcional, aqui retornamos o que tem)
+            return dados
     except Exception as e:
         print(f'Erro Analiticos Vendas: {e}')
         return []
-    finally:
-        conn.close()
-
-def obter_top_5_produtos():
-    """Retorna os 5 produtos mais vendidos (nome, qtd_total)"""
-    conn = db_manager.conectar()
-    if not conn: return []
 
-    try:
-        cursor = conn.cursor()
-        sql = """
-            SELECT p.nome, SUM(vi.quantidade) as total
-            FROM venda_itens vi
-            JOIN produtos p ON vi.produto_id = p.id
-            GROUP BY p.id
-            ORDER BY total DESC
-            LIMIT 5
-        """
-        cursor.execute(sql)
-        return cursor.fetchall()
-    finally:
-        conn.close()
+def _desde(dias):
+    """Modificador do date() do SQLite para os últimos 'dias' dias (inclui hoje)."""
+    return f"-{int(dias) - 1} days"
 
-def obter_balanco_financeiro():
-    """Retorna (total_entradas, total_saidas)"""
-    conn = db_manager.conectar()
-    
-    if not conn: return (0,0)
+def obter_top_5_produtos(dias=None):
+    """Retorna os 5 produtos mais vendidos (nome, qtd_total), no geral ou nos últimos 'dias'"""
+    with db_manager.conexao() as conn:
+        if dias is None:
+            return conn.execute(SQL_TOP_5_PRODUTOS).fetchall()
+        return conn.execute(SQL_TOP_5_PRODUTOS_PERIODO, (_desde(dias),)).fetchall()
 
-    try:
-        cursor = conn.cursor()
-        cursor.execute('SELECT tipo, SUM(valor) FROM financeiro_movimentacoes GROUP BY tipo')
-        rows = cursor.fetchall()
+def obter_vendas_por_pagamento(dias=7):
+    """Retorna (metodo_pagamento, qtd_vendas, total) dos últimos 'dias'"""
+    with db_manager.conexao() as conn:
+        return conn.execute(SQL_VENDAS_POR_PAGAMENTO, (_desde(dias),)).fetchall()
 
-        entradas = 0.0
-        saidas = 0.0
+def reconstruir_resumos():
+    """Recalcula do zero os resumos de vendas (use se suspeitar de divergência)."""
+    with db_manager.transacao() as conn:
+        migracoes.reconstruir_resumos_vendas(conn)
 
-        for tipo, valor in rows:
-            if tipo == 'entrada': entradas = valor
-            elif tipo == 'saida': saidas = valor
-
-        return (entradas, saidas)
-    finally:
-        conn.close()
+def obter_balanco_financeiro():
+    """Retorna (total_entradas, total_saidas)"""
+    entradas, saidas, _ = logic_financeiro.obter_totais()
+    return (entradas, saidas)
         
\ No newline at end of file
@@ -17,6 +17,15 @@ def listar_todos_clientes():
     """Retorna a lista de clientes do banco."""
     return db.listar_clientes()
 
+def buscar_clientes(termo, limite=10):
+    """
+    Sugestões para o autocompletar: (id, nome, cpf_cnpj) dos primeiros 'limite'
+    clientes cujo nome ou CPF/CNPJ começa com o que foi digitado.
+    """
+    if not termo or not str(termo).strip():
+        return []
+    return db.buscar_clientes(str(termo), limite)
+
 def buscar_cliente_por_cpf(cpf_cnpj):
     """Busca cliente para preencher a tela de edição."""
     if not cpf_cnpj:
@@ -0,0 +1,75 @@
+"""
+Razão de estoque: entradas, devoluções e ajustes manuais, saldo em uma data
+e fotos periódicas do saldo.
+
+Todo movimento é acrescentado em estoque_movimentos (somente inclusão) e o
+trigger da migração 12 mantém produtos.quantidade como projeção. O saldo em
+uma data parte da foto mais próxima e soma só os movimentos depois dela, por
+isso fotografar_se_necessario() roda na abertura do sistema.
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+
+from database import db_manager as db
+
+# Tipos que o operador lança à mão ('venda' vem do PDV e 'inicial' do cadastro)
+TIPOS_MANUAIS = {'entrada': "Entrada (recebimento)", 'devolucao': "Devolução de cliente", 'ajuste': "Ajuste (+/-)"}
+NOMES_TIPOS = dict(TIPOS_MANUAIS, venda="Venda", inicial="Saldo inicial")
+
+MOVIMENTOS_POR_FOTO = 1000  # nova foto depois de tantos movimentos...
+HORAS_POR_FOTO = 24         # ...ou se a última tiver mais que isso (e houver movimento)
+
+
+def _dia(texto):
+    """'DD/MM/AAAA' ou 'AAAA-MM-DD' -> 'AAAA-MM-DD' (vazio = hoje)."""
+    texto = (texto or '').strip()
+    if not texto:
+        return datetime.now().date().isoformat()
+    for formato in ('%d/%m/%Y', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(texto, formato).date().isoformat()
+        except ValueError:
+            pass
+    raise ValueError("A data deve estar no formato DD/MM/AAAA.")
+
+def registrar_movimento(produto_id, tipo, quantidade_str, usuario_id=None, observacao=''):
+    """
+    Lança um movimento manual. Entrada e devolução recebem quantidade positiva;
+    ajuste aceita sinal (ex.: -3 para perda). Retorna o id do movimento.
+    """
+    if not produto_id:
+        raise ValueError("Nenhum produto selecionado.")
+    if tipo not in TIPOS_MANUAIS:
+        raise ValueError(f"Tipo de movimento inválido: {tipo}")
+    try:
+        quantidade = int(str(quantidade_str).strip())
+    except ValueError:
+        raise ValueError("A quantidade deve ser um número inteiro.")
+    if quantidade == 0:
+        raise ValueError("A quantidade não pode ser zero.")
+    if tipo != 'ajuste' and quantidade < 0:
+        raise ValueError("Para entrada ou devolução informe a quantidade positiva (use Ajuste para retirar).")
+    return db.registrar_movimento_estoque(produto_id, tipo, quantidade, usuario_id,
+                                          observacao=(observacao or '').strip() or None)
+
+def listar_movimentos(produto_id, limite=200):
+    """Últimos movimentos do produto: (id, data_hora, tipo, qtd, venda_id, usuario, observacao)."""
+    return db.listar_movimentos_produto(produto_id, limite)
+
+def estoque_na_data(dia_texto, produto_id=None):
+    """Saldo no fim do dia (DD/MM/AAAA) de um produto, ou {produto_id: saldo} de todos."""
+    return db.estoque_na_data(_dia(dia_texto), produto_id)
+
+def fotografar_se_necessario():
+    """Tira uma foto do saldo se passou de MOVIMENTOS_POR_FOTO ou HORAS_POR_FOTO. Retorna o id da foto ou None."""
+    ultima, movimentos = db.situacao_fotos_estoque()
+    if not movimentos:
+        return None
+    # data_hora da foto é gravada em UTC (CURRENT_TIMESTAMP)
+    antiga = ultima is None or (datetime.strptime(ultima, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+                                < datetime.now(timezone.utc) - timedelta(hours=HORAS_POR_FOTO))
+    if movimentos < MOVIMENTOS_POR_FOTO and not antiga:
+        return None
+    foto_id = db.tirar_foto_estoque()
+    logging.info(f"Estoque: foto {foto_id} gravada ({movimentos} movimento(s) desde a anterior).")
+    return foto_id
@@ -1,103 +1,128 @@
 from database import db_manager as db
+from database import migracoes
+from core import dinheiro
 import logging
 from datetime import datetime
 
+# Totais mantidos por triggers (migração 5): leitura de uma linha, sem SUM
+SQL_TOTAIS = db.registrar_consulta(
+    "financeiro.totais",
+    "SELECT entradas, saidas FROM financeiro_saldo WHERE id = 1"
+)
+
+SQL_TOTAIS_POR_DIA = db.registrar_consulta(
+    "financeiro.totais_por_dia",
+    "SELECT dia, entradas, saidas FROM financeiro_saldo_dia WHERE dia >= date('now', ?) ORDER BY dia"
+)
+
+SQL_LISTAR_MOVIMENTACOES = db.registrar_consulta("financeiro.listar_com_usuario", """
+    SELECT m.id, m.data_lancamento, m.descricao, m.tipo, m.valor, u.nome_completo
+    FROM financeiro_movimentacoes m
+    LEFT JOIN usuarios u ON m.usuario_id = u.id
+    ORDER BY m.data_lancamento DESC
+""", varredura_esperada=True)
+
 def adicionar_categoria_padrao():
     """Cria categorias básicas se não existirem."""
-    conn = db.conectar()
-    if not conn: return
-
     try:
-        cursor = conn.cursor()
-        categorias = [
-            ('Venda de Produtos', 'receita'),
-            ('Pagamento de Fornecedor', 'despesa'),
-            ('Conta de Energia', 'despesa'),
-            ('Salário', 'despesa'),
-            ('Frete/Transporte', 'despesa')
-        ]
-
-        for nome, tipo in categorias:
-            # Tenta inserir, se já existir o nome (precisaria ser unique no banco, mas aqui validamos simples)
-            cursor.execute("SELECT id FROM financeiro_categorias WHERE nome = ?", (nome,))
-            if not cursor.fetchone():
-                cursor.execute("INSERT INTO financeiro_categorias (nome, tipo) VALUES (?, ?)", (nome, tipo))
-        conn.commit()
+        with db.transacao() as conn:
+            cursor = conn.cursor()
+            categorias = [
+                ('Venda de Produtos', 'receita'),
+                ('Pagamento de Fornecedor', 'despesa'),
+                ('Conta de Energia', 'despesa'),
+                ('Salário', 'despesa'),
+                ('Frete/Transporte', 'despesa')
+            ]
+
+            for nome, tipo in categorias:
+                # Tenta inserir, se já existir o nome (precisaria ser unique no banco, mas aqui validamos simples)
+                cursor.execute("SELECT id FROM financeiro_categorias WHERE nome = ?", (nome,))
+                if not cursor.fetchone():
+                    cursor.execute("INSERT INTO financeiro_categorias (nome, tipo) VALUES (?, ?)", (nome, tipo))
         logging.info("Categorias financeiras padrão verificadas.")
     except Exception as e:
         logging.error(f'Erro ao criar categorias padrão: {e}')
-    finally:
-        conn.close()
 
 def registrar_movimentacao(descricao, valor, tipo, usuario_id, categoria_id=None, venda_id=None):
     """
-    Registra uma entrada ou saída no caixa.
+    Registra uma entrada ou saída no caixa (valor em centavos).
     """
-    conn = db.conectar()
-    if not conn: return
-
     try:
         if valor < 0:
             raise ValueError("O valor deve ser positivo. O tipo define se é entrada ou saída.")
         
-        cursor = conn.cursor()
-        cursor.execute("""
+        with db.transacao() as conn:
+            conn.execute("""
                        INSERT INTO financeiro_movimentacoes
                        (descricao, valor, tipo, usuario_id, categoria_id, venda_id)
                        VALUES (?, ?, ?, ?, ?, ?)""",(descricao, valor, tipo, usuario_id, categoria_id, venda_id))
-        conn.commit()
-        logging.info(f'Financeiro: {tipo.upper()} de R$ {valor} registrada. ({descricao})')
+        logging.info(f'Financeiro: {tipo.upper()} de {dinheiro.formatar(valor)} registrada. ({descricao})')
     except Exception as e:
         logging.error(f'Erro ao registrar movimentação financeira: {e}')
         raise e  # Repassa o erro para a tela exibir
-    finally:
-        conn.close()
+
+def obter_totais():
+    """Retorna (total_entradas, total_saidas, saldo), em centavos."""
+    try:
+        with db.conexao() as conn:
+            linha = conn.execute(SQL_TOTAIS).fetchone()
+        entradas, saidas = linha if linha else (0, 0)
+        return entradas, saidas, entradas - saidas
+    except Exception as e:
+        logging.error(f'Erro ao ler totais do caixa: {e}')
+        return 0, 0, 0
 
 def obter_saldo_atual():
     """Calcula Receitas - Despesas."""
-    conn = db.conectar()
-    if not conn: return 0.0
+    return obter_totais()[2]
 
-    try:
-        cursor = conn.cursor()
-        
-        # Soma entradas
-        cursor.execute("select sum(valor) from financeiro_movimentacoes where tipo = 'entrada'")
-        entradas = cursor.fetchone()[0] or 0.0
+def obter_totais_por_dia(dias=30):
+    """Retorna [(dia, entradas, saidas), ...] dos últimos 'dias' dias."""
+    with db.conexao() as conn:
+        return conn.execute(SQL_TOTAIS_POR_DIA, (f"-{int(dias) - 1} days",)).fetchall()
 
-        # Soma saídas
-        cursor.execute("SELECT SUM(valor) FROM financeiro_movimentacoes WHERE tipo = 'saida'")
-        saidas = cursor.fetchone()[0] or 0.0
-        
-        return entradas - saidas
-    
-    except Exception as e:
-        logging.error(f'Erro ao calcular saldo: {e}')
-        return 0.0
-    finally:
-        conn.close()
+def verificar_saldos(corrigir=False):
+    """
+    Recalcula os totais a partir das movimentações e compara com os gravados.
+    Retorna a lista de divergências [(dia ou 'geral', campo, gravado, recalculado)];
+    com corrigir=True reconstrói as tabelas de saldo quando houver alguma.
+    """
+    with db.conexao() as conn:
+        recalculado = {d: (e, s, q) for d, e, s, q in conn.execute(migracoes.SQL_SALDOS_RECALCULADOS_DIA)}
+        gravado = {d: (e, s, q) for d, e, s, q in conn.execute(
+            "SELECT dia, entradas, saidas, qtd_movimentacoes FROM financeiro_saldo_dia WHERE qtd_movimentacoes <> 0")}
+        geral = conn.execute("SELECT entradas, saidas, qtd_movimentacoes FROM financeiro_saldo WHERE id = 1").fetchone()
+
+    divergencias = []
+    def comparar(escopo, valores_gravados, valores_recalculados):
+        for campo, g, r in zip(('entradas', 'saidas', 'qtd_movimentacoes'), valores_gravados, valores_recalculados):
+            if (g or 0) != (r or 0): # Centavos: comparação exata
+                divergencias.append((escopo, campo, g, r))
+
+    for dia in sorted(set(recalculado) | set(gravado)):
+        comparar(dia, gravado.get(dia, (0, 0, 0)), recalculado.get(dia, (0, 0, 0)))
+    total = tuple(sum(v[i] for v in recalculado.values()) for i in range(3))
+    comparar('geral', geral or (0, 0, 0), total)
+
+    if divergencias:
+        logging.warning(f'Saldos do caixa divergentes em {len(divergencias)} ponto(s): {divergencias[:5]}')
+        if corrigir:
+            with db.transacao() as conn:
+                migracoes.reconstruir_saldos_financeiro(conn)
+            logging.info('Saldos do caixa reconstruídos a partir das movimentações.')
+    return divergencias
 
 def listar_movimentacoes():
     """Lista todas as movimentações para exibir na tabela."""
-    conn = db.conectar()
-    if not conn: return[]
-
     try:
-        cursor = conn.cursor()
-        sql = """
-            SELECT m.id, m.data_lancamento, m.descricao, m.tipo, m.valor, u.nome_completo
-            FROM financeiro_movimentacoes m
-            LEFT JOIN usuarios u ON m.usuario_id = u.id
-            ORDER BY m.data_lancamento DESC
-        """
-        cursor.execute(sql)
-        return cursor.fetchall()
+        with db.conexao() as conn:
+            return conn.execute(SQL_LISTAR_MOVIMENTACOES).fetchall()
     except Exception as e:
         logging.error(f'Erro ao listar movimentações: {e}')
         return []
-    finally:
-        conn.close()
 
+@db.com_retentativa
 def registrar_movimento(descricao, valor_str, tipo):
     """
     Registra uma movimentação financeira manual.
@@ -105,7 +130,7 @@ def registrar_movimento(descricao, valor_str, tipo):
     """
     # 1. Tratamento de Dados
     try:
-        valor = float(valor_str.replace(',', '.'))
+        valor = dinheiro.para_centavos(valor_str)
     except ValueError:
         raise ValueError("Valor inválido.")
     
@@ -1,13 +1,34 @@
 from database import db_manager as db
-import bcrypt
+from core import dinheiro
+import csv
 import re
 from sqlite3 import Error
 
-def validar_e_processar_produto(nome, quantidade_str, preco_venda_str, preco_custo_str, categoria, fornecedor):
+# EAN/GTIN ou SKU interno: letras, números, '-', '_' e '.', sem espaços
+RE_CODIGO_BARRAS = re.compile(r'^[0-9A-Za-z._-]{1,50}$')
+
+def normalizar_codigo_barras(codigo):
+    """Código sem espaços nas pontas; vazio vira None. Lança ValueError se tiver caracteres inválidos."""
+    codigo = (codigo or '').strip()
+    if not codigo:
+        return None
+    if not RE_CODIGO_BARRAS.match(codigo):
+        raise ValueError(f"Código de barras/SKU inválido: '{codigo}' (use letras, números, '-', '_' ou '.').")
+    return codigo
+
+def _conferir_codigo_livre(codigo, produto_id=None):
+    # O índice é único, mas o db_manager só imprime o erro: avisamos antes de gravar
+    if codigo is None:
+        return
+    dono = db.buscar_produto_por_codigo(codigo)
+    if dono is not None and dono[0] != produto_id:
+        raise ValueError(f"O código '{codigo}' já pertence ao produto '{dono[1]}' (ID {dono[0]}).")
+
+def validar_e_processar_produto(nome, quantidade_str, preco_venda_str, preco_custo_str, categoria, fornecedor, codigo_barras=None):
     """
     Valida os dados de entrada para um produto.
     Lança um 'ValueError' se houver um erro de validação.
-    Retorna os dados convertidos (int, float) se for válido.
+    Retorna os dados convertidos (quantidade e preços em centavos, int) se for válido.
     """
 
     # 1. Validação de campos obrigatórios
@@ -33,51 +54,61 @@ def validar_e_processar_produto(nome, quantidade_str, preco_venda_str, preco_cus
         raise ValueError("O campo 'Quantidade' deve ser um número inteiro.")
     
     try:
-        preco_venda_float = float(preco_venda_str.replace(',', '.'))
+        preco_venda_centavos = dinheiro.para_centavos(preco_venda_str)
     except ValueError:
         raise ValueError("O 'Preço de Venda' deve ser um número válido (ex: 120.50).")
         
     # Preço de custo é opcional, mas se digitado, deve ser um número
-    preco_custo_float = 0.0
+    preco_custo_centavos = 0
     if preco_custo_str: # Se o campo não estiver vazio
         try:
-            preco_custo_float = float(preco_custo_str.replace(',', '.'))
+            preco_custo_centavos = dinheiro.para_centavos(preco_custo_str)
         except ValueError:
             raise ValueError("O 'Preço de Custo' deve ser um número válido (ex: 80.20).")
     
     # 3. Validação de Regra de Negócio
     if qtd_int < 0:
         raise ValueError('A quantidade não pode ser negativa!')
-    if preco_venda_float < 0:
+    if preco_venda_centavos < 0:
         raise ValueError('O preço de venda não pode ser negativo!')
-    if preco_custo_float < 0:
+    if preco_custo_centavos < 0:
         raise ValueError('O preço de custo não pode ser negativo!')
     
     # Campos de texto (podem ficar vazios, então só limpamos)
     categoria_limpa = categoria.strip()
     fornecedor_limpo = fornecedor.strip()
 
+    codigo_limpo = normalizar_codigo_barras(codigo_barras)
+
     # Se tudo deu certo, retorna os dados limpos
-    return nome, qtd_int, preco_venda_float, preco_custo_float, categoria_limpa, fornecedor_limpo
+    return nome, qtd_int, preco_venda_centavos, preco_custo_centavos, categoria_limpa, fornecedor_limpo, codigo_limpo
 
-def adicionar_produto(nome, quantidade_str, preco_venda_str, preco_custo_str, categoria, fornecedor):
-    """Processa e adiciona um novo produto (v2)."""
+def adicionar_produto(nome, quantidade_str, preco_venda_str, preco_custo_str, categoria, fornecedor, codigo_barras=None,
+                      usuario_id=None):
+    """Processa e adiciona um novo produto (v2). A quantidade entra como movimento 'inicial'."""
     # 1. Valida os dados
     dados_validos = validar_e_processar_produto(
-        nome, quantidade_str, preco_venda_str, preco_custo_str, categoria, fornecedor
+        nome, quantidade_str, preco_venda_str, preco_custo_str, categoria, fornecedor, codigo_barras
     )
+    _conferir_codigo_livre(dados_validos[-1])
     # 2. Envia para o banco de dados
     # O '*' desempacota a tupla na ordem correta
-    db.adicionar_produto(*dados_validos)
+    # Retorna o ID gerado (a tela usa para inserir só a linha nova)
+    return db.adicionar_produto(*dados_validos, usuario_id=usuario_id)
 
-def atualizar_produto(id, nome, quantidade_str, preco_venda_str, preco_custo_str, categoria, fornecedor):
-    """Processa e atualiza um produto existente (v2)."""
+def atualizar_produto(id, nome, quantidade_str, preco_venda_str, preco_custo_str, categoria, fornecedor, codigo_barras=None,
+                      quantidade_anterior=None, usuario_id=None):
+    """
+    Processa e atualiza um produto existente (v2). Mudança de quantidade vira
+    ajuste em relação a 'quantidade_anterior' (o que a tela exibia).
+    """
     # 1. Valida os dados
     dados_validos = validar_e_processar_produto(
-        nome, quantidade_str, preco_venda_str, preco_custo_str, categoria, fornecedor
+        nome, quantidade_str, preco_venda_str, preco_custo_str, categoria, fornecedor, codigo_barras
     )
+    _conferir_codigo_livre(dados_validos[-1], int(id))
     # 2. Envia para o banco de dados (adicionando o ID no início)
-    db.atualizar_produto(id, *dados_validos)
+    db.atualizar_produto(id, *dados_validos, quantidade_anterior=quantidade_anterior, usuario_id=usuario_id)
 
 def remover_produto(id):
     """Remove um produto por ID."""
@@ -86,23 +117,109 @@ def remover_produto(id):
     db.remover_produto(id)
 
 def buscar_produtos(nome_busca):
-    """Busca produtos por nome"""
-    if not nome_busca:
+    """
+    Busca produtos por nome, categoria ou fornecedor (os mais relevantes primeiro).
+    Retorna lista vazia se nada for encontrado.
+    """
+    if not nome_busca or not nome_busca.strip():
         # Se a busca for vazia, retorna todos
         return db.listar_produtos()
     
-    resultados = db.buscar_produto(nome_busca)
-    if not resultados:
-        # lança um erro se a busca não retorna nada
-        raise ValueError(f"Nenhum produto encontrado com o nome '{nome_busca}'.")
-    
+    termo = nome_busca.strip()
+    resultados = db.buscar_produto(termo)
+    # Código bipado no campo de busca: o produto dele vem primeiro
+    if RE_CODIGO_BARRAS.match(termo):
+        por_codigo = db.buscar_produto_por_codigo(termo)
+        if por_codigo is not None:
+            resultados = [por_codigo] + [p for p in resultados if p[0] != por_codigo[0]]
     return resultados
 
 def listar_todos_produtos():
     """Apenas repassa a listagem do banco."""
     return db.listar_produtos()
 
+def listar_produtos_pagina(apos=None, limite=200):
+    """Página de produtos ordenada por nome (apos = (nome, id) da última linha exibida)."""
+    return db.listar_produtos_pagina(apos, limite)
+
 
 def obter_produto_por_id(id_produto):
     """Busca os dados completos de um produto pelo ID."""
-    return db.buscar_produto_por_id(id_produto)
\ No newline at end of file
+    return db.buscar_produto_por_id(id_produto)
+
+
+def obter_produto_por_codigo(codigo_barras):
+    """Busca um produto pelo código de barras / SKU (None se não existir)."""
+    return db.buscar_produto_por_codigo(codigo_barras.strip())
+
+def _linhas_csv(caminho):
+    # Aceita ';' (Excel em português), ',' ou TAB; o cabeçalho é opcional
+    with open(caminho, newline='', encoding='utf-8-sig') as f:
+        amostra = f.read(4096)
+        f.seek(0)
+        try:
+            delimitador = csv.Sniffer().sniff(amostra, delimiters=';,\t').delimiter
+        except csv.Error:
+            delimitador = ';' if ';' in amostra else ','
+        for numero, linha in enumerate(csv.reader(f, delimiter=delimitador), start=1):
+            yield numero, [c.strip() for c in linha]
+
+def importar_codigos_barras_csv(caminho):
+    """
+    Atribui códigos de barras em lote a partir de um CSV com as colunas
+    'id;codigo' (uma linha por produto; códigos vazios limpam o campo).
+    Linhas válidas são gravadas em uma única transação.
+    Retorna (atualizados, rejeitados), rejeitados = [(linha, motivo), ...].
+    """
+    pares = {}      # produto_id -> codigo
+    origem = {}     # produto_id -> nº da linha (para a mensagem de erro)
+    rejeitados = []
+    for numero, colunas in _linhas_csv(caminho):
+        if not any(colunas):
+            continue
+        if len(colunas) < 2:
+            rejeitados.append((numero, "esperado 'id;codigo'"))
+            continue
+        try:
+            produto_id = int(colunas[0])
+        except ValueError:
+            if numero != 1: # primeira linha não numérica = cabeçalho
+                rejeitados.append((numero, f"ID inválido: '{colunas[0]}'"))
+            continue
+        try:
+            codigo = normalizar_codigo_barras(colunas[1])
+        except ValueError as e:
+            rejeitados.append((numero, str(e)))
+            continue
+        if produto_id in pares:
+            rejeitados.append((numero, f"produto {produto_id} repetido (linha {origem[produto_id]})"))
+            continue
+        pares[produto_id] = codigo
+        origem[produto_id] = numero
+
+    # Produtos inexistentes e códigos repetidos no arquivo
+    existentes = db.produtos_existentes(pares)
+    vistos = {}
+    for produto_id, codigo in list(pares.items()):
+        if produto_id not in existentes:
+            motivo = f"produto {produto_id} não existe"
+        elif codigo is not None and codigo in vistos:
+            motivo = f"código '{codigo}' repetido (linha {origem[vistos[codigo]]})"
+        else:
+            if codigo is not None:
+                vistos[codigo] = produto_id
+            continue
+        rejeitados.append((origem[produto_id], motivo))
+        del pares[produto_id]
+
+    # Códigos que já são de produtos fora do arquivo (os do arquivo são regravados juntos)
+    for codigo, dono in db.codigos_em_uso(vistos).items():
+        produto_id = vistos[codigo]
+        if dono != produto_id and dono not in pares:
+            rejeitados.append((origem[produto_id], f"código '{codigo}' já pertence ao produto {dono}"))
+            del pares[produto_id]
+
+    if pares:
+        db.atribuir_codigos_barras(list(pares.items()))
+    rejeitados.sort()
+    return len(pares), rejeitados
\ No newline at end of file
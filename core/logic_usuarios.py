@@ -1,14 +1,60 @@
 from database import db_manager as db
 import bcrypt
+import logging
 import re
+import time
 from sqlite3 import Error
 
-def _hash_senha(senha):
+# Custo (log2 das rodadas) do bcrypt. Configurável em config.json ('bcrypt_custo');
+# calibrar_custo_bcrypt() mede a máquina e grava o maior custo dentro do alvo.
+CUSTO_PADRAO = 12
+CUSTO_MINIMO = 10
+CUSTO_MAXIMO = 16
+ALVO_HASH_MS = 250 # Tempo aceitável para uma verificação de senha
+
+def obter_custo_bcrypt():
+    """Custo configurado, limitado entre CUSTO_MINIMO e CUSTO_MAXIMO."""
+    try:
+        custo = int(db.obter_config().get('bcrypt_custo', CUSTO_PADRAO))
+    except (TypeError, ValueError):
+        custo = CUSTO_PADRAO
+    return max(CUSTO_MINIMO, min(CUSTO_MAXIMO, custo))
+
+def _custo_do_hash(hash_armazenado):
+    """Custo gravado no hash ('$2b$12$...'); None se não for um hash bcrypt."""
+    partes = hash_armazenado.split('$')
+    if len(partes) < 4 or not partes[2].isdigit():
+        return None
+    return int(partes[2])
+
+def _hash_senha(senha, custo=None):
     """Gera um hash seguro para a senha."""
-    sal = bcrypt.gensalt()
+    sal = bcrypt.gensalt(rounds=custo or obter_custo_bcrypt())
     hash_senha = bcrypt.hashpw(senha.encode('utf-8'), sal)
     return hash_senha.decode('utf-8')
 
+def calibrar_custo_bcrypt(alvo_ms=ALVO_HASH_MS, salvar=True):
+    """
+    Mede quanto um hash leva nesta máquina e escolhe o maior custo que fica
+    dentro de alvo_ms (nunca abaixo de CUSTO_MINIMO). Os hashes existentes são
+    atualizados aos poucos, no próximo login de cada usuário.
+    Retorna (custo, ms_medidos_no_custo_escolhido).
+    """
+    escolhido, tempo_escolhido = CUSTO_MINIMO, None
+    for custo in range(CUSTO_MINIMO, CUSTO_MAXIMO + 1):
+        inicio = time.perf_counter()
+        bcrypt.hashpw(b"calibracao", bcrypt.gensalt(rounds=custo))
+        decorrido = (time.perf_counter() - inicio) * 1000
+        if decorrido > alvo_ms and tempo_escolhido is not None:
+            break
+        escolhido, tempo_escolhido = custo, decorrido
+        if decorrido > alvo_ms:
+            break # Nem o mínimo cabe no alvo: fica no mínimo
+    logging.info(f"Calibração bcrypt: custo {escolhido} ({tempo_escolhido:.0f} ms por hash)")
+    if salvar:
+        db.atualizar_config(bcrypt_custo=escolhido)
+    return escolhido, tempo_escolhido
+
 def verificar_senha(senha_fornecida, hash_armazenado):
     """Verifica se a senha fornecida bate com o hash salvo."""
     if isinstance(hash_armazenado, str):
@@ -37,23 +83,40 @@ def verificar_login(login, senha):
     """
     Verifica as credenciais do usuário.
     Retorna a tupla do usuário se for válido, senão lança um erro.
+    Lento de propósito (bcrypt): chame fora da thread da interface.
     """
-    usuario_db = db.buscar_usuario_por_login(login)
+    inicio = time.perf_counter()
+    try:
+        usuario_db = db.buscar_usuario_por_login(login)
 
-    # Usuário não encontrado
-    if not usuario_db:
-        raise ValueError("Login ou senha invalidos")
-    
-    # usuário_db é uma tupla: (id, nome_completo, login, senha_hash, role)
-    hash_armazenado = usuario_db[3]
+        # Usuário não encontrado
+        if not usuario_db:
+            raise ValueError("Login ou senha invalidos")
 
-    # Senha não bateu
-    if not verificar_senha(senha, hash_armazenado):
-        raise ValueError("Login ou senha inválidos.")
-    
-    # Sucesso! Retorna os dados do usuario
-    print(f"Login bem-sucedido! -> User: {usuario_db[1]} | Função : {usuario_db[4]}")
-    return usuario_db
+        # usuário_db é uma tupla: (id, nome_completo, login, senha_hash, role)
+        hash_armazenado = usuario_db[3]
+        custo_atual = _custo_do_hash(hash_armazenado)
+
+        if custo_atual is None:
+            # Admin antigo com a senha gravada em texto plano
+            if not (hash_armazenado == "admin" and senha == "admin"):
+                raise ValueError("Login ou senha inválidos.")
+        # Senha não bateu
+        elif not verificar_senha(senha, hash_armazenado):
+            raise ValueError("Login ou senha inválidos.")
+
+        # Hash com custo diferente do configurado (ou texto plano): regrava agora,
+        # que é o único momento em que temos a senha em mãos
+        if custo_atual != obter_custo_bcrypt():
+            db.atualizar_senha_usuario(usuario_db[0], _hash_senha(senha))
+            logging.info(f"Senha de '{login}' regravada com custo {obter_custo_bcrypt()} (era {custo_atual}).")
+
+        # Sucesso! Retorna os dados do usuario
+        print(f"Login bem-sucedido! -> User: {usuario_db[1]} | Função : {usuario_db[4]}")
+        return usuario_db
+    finally:
+        decorrido = (time.perf_counter() - inicio) * 1000
+        logging.info(f"Verificação de login '{login}' levou {decorrido:.0f} ms")
 
 def listar_todos_usuarios():
     """Apenas repassa a listagem de usuários do banco."""
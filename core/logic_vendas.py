@@ -1,22 +1,33 @@
 from database import db_manager as db
 from core import logic_financeiro as lg_financeiro
+from core import cache_produtos, dinheiro
 import logging
+from datetime import datetime
+
+METODOS_PAGAMENTO = ("Dinheiro", "Cartão", "Pix")
 
 def validar_produto_para_venda(id_str, qtd_str):
-    if not id_str or not qtd_str: 
-        raise ValueError("Preencha ID e Quantidade")
+    """
+    'id_str' é o que foi digitado ou bipado: código de barras / SKU ou o ID do
+    produto. O código é procurado primeiro (índice único, via cache).
+    """
+    codigo = (id_str or '').strip()
+    if not codigo or not qtd_str: 
+        raise ValueError("Preencha Código/ID e Quantidade")
     try:
-        id_prod = int(id_str)
         qtd = int(qtd_str)
     except: 
-        raise ValueError("ID e Qtd devem ser números.")
+        raise ValueError("Quantidade deve ser um número.")
     
     if qtd <= 0: 
         raise ValueError("Quantidade deve ser maior que zero.")
     
-    prod = db.buscar_produto_por_id(id_prod) # (id, nome, qtd, preco...)
+    # (id, nome, qtd, preco...); relido só se o banco mudou
+    prod = cache_produtos.obter_por_codigo(codigo)
+    if prod is None and codigo.isdigit():
+        prod = cache_produtos.obter(int(codigo))
     if not prod: 
-        raise ValueError("Produto não encontrado.")
+        raise ValueError(f"Produto não encontrado: {codigo}")
     
     # prod[2] é a quantidade no banco
     if qtd > prod[2]: 
@@ -24,49 +35,98 @@ def validar_produto_para_venda(id_str, qtd_str):
         
     return prod, qtd
 
-def processar_venda_completa(usuario_id, carrinho, cliente_id=None, valor_frete=0.0, metodo_pagto="Dinheiro", valor_pago=0.0, troco=0.0):
+@db.com_retentativa
+def processar_venda_completa(usuario_id, carrinho, cliente_id=None, valor_frete=0, metodo_pagto="Dinheiro", valor_pago=0, troco=0):
     """
-    Processa venda recebendo dados de pagamento e troco.
+    Processa venda recebendo dados de pagamento e troco (valores em centavos).
+    Itens do carrinho: (id, nome, qtd, preco_unitario, subtotal).
+    Venda, itens, baixa de estoque e lançamento no caixa são gravados
+    em uma única transação.
     """
     if not carrinho: raise ValueError("Carrinho vazio.")
     if not usuario_id: raise ValueError("Erro de sessão.")
     
-    # 1. Validação de Estoque
-    total_produtos = 0.0
-    for item in carrinho:
-        p_id, _, qtd, _, sub = item
-        produto_db = db.buscar_produto_por_id(p_id)
-        if not produto_db:
-             raise ValueError(f"Produto ID {p_id} não encontrado.")
-        if qtd > produto_db[2]:
-            raise ValueError(f"Estoque de '{item[1]}' acabou!")
-        total_produtos += sub
-
-    # 2. Calcula Total
+    # 1. Calcula Total (centavos: soma exata)
+    total_produtos = sum(item[4] for item in carrinho)
     total_final = total_produtos + valor_frete
 
     try:
-        # 3. Persiste no Banco (Com dados de pagto)
-        venda_id = db.registrar_venda_transacao(
-            usuario_id, total_final, carrinho, cliente_id, valor_frete,
-            metodo_pagto, valor_pago, troco
-        )
-        
-        # 4. Financeiro
-        desc_fin = f"Venda #{venda_id} ({metodo_pagto})"
-        if cliente_id: desc_fin += f" - Cli ID:{cliente_id}"
-        if valor_frete > 0: desc_fin += " (+Frete)"
+        with db.transacao():
+            # 2. Valida estoque e persiste no Banco (Com dados de pagto)
+            venda_id = db.registrar_venda_transacao(
+                usuario_id, total_final, carrinho, cliente_id, valor_frete,
+                metodo_pagto, valor_pago, troco
+            )
             
-        lg_financeiro.registrar_movimentacao(
-            descricao=desc_fin,
-            valor=total_final,
-            tipo='entrada',
-            usuario_id=usuario_id,
-            venda_id=venda_id
-        )
+            # 3. Financeiro (mesma transação)
+            desc_fin = f"Venda #{venda_id} ({metodo_pagto})"
+            if cliente_id: desc_fin += f" - Cli ID:{cliente_id}"
+            if valor_frete > 0: desc_fin += " (+Frete)"
+                
+            lg_financeiro.registrar_movimentacao(
+                descricao=desc_fin,
+                valor=total_final,
+                tipo='entrada',
+                usuario_id=usuario_id,
+                venda_id=venda_id
+            )
         
         return venda_id
         
     except Exception as e:
         logging.error(f"Erro venda lógica: {e}")
-        raise e
\ No newline at end of file
+        raise e
+
+
+# --- HISTÓRICO ---
+def _data_filtro(texto, campo):
+    """'DD/MM/AAAA' ou 'AAAA-MM-DD' -> 'AAAA-MM-DD' (None se vazio)."""
+    texto = (texto or '').strip()
+    if not texto:
+        return None
+    for formato in ('%d/%m/%Y', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(texto, formato).date().isoformat()
+        except ValueError:
+            pass
+    raise ValueError(f"'{campo}' deve ser uma data no formato DD/MM/AAAA.")
+
+def _valor_filtro(texto, campo):
+    texto = (texto or '').strip()
+    if not texto:
+        return None
+    try:
+        return dinheiro.para_centavos(texto)
+    except ValueError:
+        raise ValueError(f"'{campo}' deve ser um valor válido (ex: 150.00).")
+
+def validar_filtros_historico(data_inicio='', data_fim='', usuario_id=None, cliente_id=None,
+                              metodo_pagamento=None, total_min='', total_max=''):
+    """
+    Converte os campos da tela de histórico nos filtros de db.listar_vendas_pagina
+    (datas ISO, valores em centavos). Lança ValueError se algum for inválido.
+    """
+    filtros = {
+        'data_inicio': _data_filtro(data_inicio, "De"),
+        'data_fim': _data_filtro(data_fim, "Até"),
+        'usuario_id': usuario_id,
+        'cliente_id': cliente_id,
+        'metodo_pagamento': metodo_pagamento or None,
+        'total_min': _valor_filtro(total_min, "Total mínimo"),
+        'total_max': _valor_filtro(total_max, "Total máximo"),
+    }
+    if filtros['data_inicio'] and filtros['data_fim'] and filtros['data_inicio'] > filtros['data_fim']:
+        raise ValueError("A data inicial é posterior à data final.")
+    if filtros['total_min'] is not None and filtros['total_max'] is not None and filtros['total_min'] > filtros['total_max']:
+        raise ValueError("O total mínimo é maior que o total máximo.")
+    return {chave: valor for chave, valor in filtros.items() if valor is not None}
+
+def historico_pagina(filtros=None, apos=None, limite=100):
+    """
+    Página do histórico com os itens de cada venda já carregados (uma consulta
+    para a página inteira, não uma por clique):
+    (id, data_hora, vendedor, cliente, total, metodo_pagamento, itens).
+    """
+    vendas = db.listar_vendas_pagina(filtros, apos, limite)
+    itens = db.itens_das_vendas([v[0] for v in vendas]) if vendas else {}
+    return [tuple(v) + (itens.get(v[0], []),) for v in vendas]
\ No newline at end of file
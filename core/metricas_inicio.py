@@ -0,0 +1,17 @@
+import logging
+import time
+
+# Importado primeiro pelo main.py: o relógio começa aqui
+_INICIO = time.perf_counter()
+_marcos = []
+
+def marcar(etapa):
+    """Registra quanto tempo se passou desde o início do programa até 'etapa'."""
+    decorrido = (time.perf_counter() - _INICIO) * 1000
+    _marcos.append((etapa, decorrido))
+    logging.info(f"[inicialização] {etapa}: {decorrido:.0f} ms")
+    return decorrido
+
+def linha_do_tempo():
+    """Lista de (etapa, ms desde o início), na ordem em que foram marcadas."""
+    return list(_marcos)
@@ -0,0 +1,234 @@
+"""
+Geração de comprovantes em segundo plano.
+
+A venda grava o pedido do comprovante na tabela fila_comprovantes dentro da
+mesma transação (db_manager.registrar_venda_transacao). Este serviço consome
+a fila numa thread própria e gera os PDFs, então o caixa fica livre logo após
+o COMMIT. Como a fila está no banco, o que ficou pendente ao fechar o
+programa é gerado na próxima abertura.
+Com vários terminais no mesmo banco, cada pedido leva o terminal de origem
+(db_manager.terminal_id()) e só o serviço daquele terminal o consome: o PDF
+fica no disco de quem vendeu e o cupom sai na impressora dele. Reimpressões
+saem no terminal que as pediu.
+
+Falhas voltam para a fila com espera crescente; depois de MAX_TENTATIVAS a
+venda fica com status 'erro' até ser reenfileirada com reimprimir().
+O formato sai do config.json (obter_modo): PDF A4 (gerador_pdf) ou cupom de
+80 mm em texto / ESC/POS (gerador_texto), este gravado direto na impressora
+se 'impressora_caminho' estiver configurado.
+Os ouvintes (adicionar_ouvinte) são chamados NA THREAD DO SERVIÇO com
+(evento, venda_id, detalhe), evento em 'concluido' | 'retentativa' | 'erro'.
+"""
+import logging
+import threading
+import time
+from datetime import date
+
+from database import db_manager as db
+
+MAX_TENTATIVAS = 3
+ESPERA_BASE_S = 5           # 5 s, 10 s, 20 s... entre as tentativas
+INTERVALO_OCIOSO_S = 10     # fila vazia: confere de novo (retentativas agendadas); só lê, sem lock de escrita
+MINUTOS_PROCESSANDO = 5     # 'processando' há mais que isso: o programa fechou no meio
+
+# config.json: comprovante_modo, impressora_caminho, impressora_colunas
+MODOS = {'pdf': "PDF (A4)", 'texto': "Texto (80 mm)", 'escpos': "ESC/POS (impressora térmica)"}
+MODO_PADRAO = 'pdf'
+
+_lock = threading.Lock()
+_trabalhador = None
+_ouvintes = []
+_estatisticas = {'gerados': 0, 'falhas': 0, 'tempo_total_ms': 0.0}
+
+
+class _Trabalhador(threading.Thread):
+    def __init__(self):
+        super().__init__(name="sys360-comprovantes", daemon=True)
+        self.parar = threading.Event()
+        self.acordar = threading.Event()
+
+    def run(self):
+        try:
+            liberados = db.liberar_comprovantes_presos(MINUTOS_PROCESSANDO)
+            if liberados:
+                logging.info(f"Comprovantes: {liberados} geração(ões) interrompida(s) voltaram para a fila.")
+        except Exception as e:
+            logging.error(f"Comprovantes: erro ao liberar itens presos: {e}")
+
+        while not self.parar.is_set():
+            try:
+                reservado = db.reservar_comprovante()
+            except Exception as e:
+                logging.error(f"Comprovantes: erro ao ler a fila: {e}")
+                reservado = None
+            if reservado is None:
+                self.acordar.wait(INTERVALO_OCIOSO_S)
+                self.acordar.clear()
+                continue
+            _processar(*reservado)
+
+
+def _gerar(venda_id):
+    dados = db.dados_comprovante(venda_id)
+    if dados is None:
+        raise LookupError(f"Venda {venda_id} não encontrada.")
+    venda, itens = dados
+    _, data_hora, cliente, vendedor, total, frete, metodo, pago, troco = venda
+    vendedor, frete, pago, troco = vendedor or "-", frete or 0, pago or 0, troco or 0
+
+    modo = obter_modo()
+    if modo != 'pdf':
+        # Cupom de 80 mm: milissegundos, sem reportlab
+        from core import gerador_texto
+        venda = (venda_id, data_hora, cliente, vendedor, total, frete, metodo, pago, troco)
+        return gerador_texto.gravar_cupom(venda, itens, modo, obter_caminho_impressora(), obter_colunas())
+
+    # reportlab é importado na primeira geração e fica carregado nesta thread
+    from core import gerador_pdf
+    return gerador_pdf.gerar_cupom_pdf(venda_id, itens, total, cliente, frete, vendedor,
+                                       metodo, pago, troco, data_hora=data_hora)
+
+def _processar(venda_id, tentativa):
+    inicio = time.perf_counter()
+    try:
+        caminho = _gerar(venda_id)
+    except Exception as e:
+        definitivo = tentativa >= MAX_TENTATIVAS or isinstance(e, LookupError)
+        espera = ESPERA_BASE_S * 2 ** (tentativa - 1)
+        try:
+            db.falhar_comprovante(venda_id, e, espera_s=espera, definitivo=definitivo)
+        except Exception as e_db:
+            logging.error(f"Comprovantes: erro ao registrar falha da venda {venda_id}: {e_db}")
+        with _lock:
+            _estatisticas['falhas'] += 1
+        if definitivo:
+            logging.error(f"Comprovante da venda {venda_id} falhou (tentativa {tentativa}), desistindo: {e}")
+        else:
+            logging.warning(f"Comprovante da venda {venda_id} falhou (tentativa {tentativa}), nova tentativa em {espera} s: {e}")
+        _notificar('erro' if definitivo else 'retentativa', venda_id, str(e))
+        return
+
+    decorrido = (time.perf_counter() - inicio) * 1000
+    try:
+        db.concluir_comprovante(venda_id, caminho)
+    except Exception as e:
+        # O PDF existe; se a marcação falhar ele é gerado de novo mais tarde
+        logging.error(f"Comprovantes: erro ao marcar venda {venda_id} como concluída: {e}")
+    with _lock:
+        _estatisticas['gerados'] += 1
+        _estatisticas['tempo_total_ms'] += decorrido
+    logging.info(f"Comprovante da venda {venda_id} gerado em {decorrido:.0f} ms: {caminho}")
+    _notificar('concluido', venda_id, caminho)
+
+def _notificar(evento, venda_id, detalhe):
+    with _lock:
+        ouvintes = list(_ouvintes)
+    for ouvinte in ouvintes:
+        try:
+            ouvinte(evento, venda_id, detalhe)
+        except Exception as e:
+            logging.error(f"Comprovantes: erro no ouvinte: {e}", exc_info=True)
+
+
+# --- API ---
+# Formato e impressora vêm do config.json local: como a fila só entrega a cada
+# terminal as próprias vendas, o cupom sai na impressora de quem vendeu.
+def obter_modo():
+    modo = db.obter_config().get('comprovante_modo', MODO_PADRAO)
+    return modo if modo in MODOS else MODO_PADRAO
+
+def obter_caminho_impressora():
+    """Arquivo/dispositivo da impressora térmica ('' = grava em comprovantes/)."""
+    return db.obter_config().get('impressora_caminho', '')
+
+def obter_colunas():
+    from core import gerador_texto
+    try:
+        return max(gerador_texto.COLUNAS_MINIMO, int(db.obter_config().get('impressora_colunas', gerador_texto.COLUNAS_PADRAO)))
+    except (TypeError, ValueError):
+        return gerador_texto.COLUNAS_PADRAO
+
+def salvar_configuracao(modo, caminho_impressora='', colunas=None):
+    from core import gerador_texto
+    if modo not in MODOS:
+        raise ValueError(f"Modo de comprovante inválido: {modo}")
+    valores = {'comprovante_modo': modo, 'impressora_caminho': caminho_impressora.strip()}
+    if colunas not in (None, ''):
+        try:
+            valores['impressora_colunas'] = int(colunas)
+        except ValueError:
+            raise ValueError("Colunas deve ser um número inteiro (ex.: 48 ou 42).")
+        if valores['impressora_colunas'] < gerador_texto.COLUNAS_MINIMO:
+            raise ValueError(f"Colunas deve ser pelo menos {gerador_texto.COLUNAS_MINIMO}.")
+    db.atualizar_config(**valores)
+
+def iniciar():
+    """Inicia a thread do serviço (se ainda não estiver rodando)."""
+    global _trabalhador
+    db.terminal_id() # gera o id desta instalação antes de a thread e o PDV o usarem
+    with _lock:
+        if _trabalhador is None or not _trabalhador.is_alive():
+            _trabalhador = _Trabalhador()
+            _trabalhador.start()
+
+def parar(timeout=5):
+    """Pede para a thread terminar e espera até 'timeout' segundos (o comprovante em andamento termina antes)."""
+    global _trabalhador
+    with _lock:
+        trabalhador, _trabalhador = _trabalhador, None
+    if trabalhador is not None:
+        trabalhador.parar.set()
+        trabalhador.acordar.set()
+        trabalhador.join(timeout)
+
+def acordar():
+    """Avisa que há comprovante novo na fila (sem esperar o intervalo ocioso)."""
+    trabalhador = _trabalhador
+    if trabalhador is not None:
+        trabalhador.acordar.set()
+
+def reimprimir(venda_id):
+    """Coloca a venda de novo na fila (ex.: comprovante com erro ou PDF apagado)."""
+    db.reenfileirar_comprovante(venda_id)
+    acordar()
+
+def adicionar_ouvinte(ouvinte):
+    with _lock:
+        _ouvintes.append(ouvinte)
+
+def remover_ouvinte(ouvinte):
+    with _lock:
+        if ouvinte in _ouvintes:
+            _ouvintes.remove(ouvinte)
+
+def gerar_comprovantes_do_dia(dia=None, processos=None):
+    """
+    Todos os cupons do dia (padrão: hoje) em um PDF, ou em partes paralelas
+    se o dia for grande. Retorna (caminhos, páginas, páginas por segundo).
+    """
+    from core import gerador_pdf
+    dia = dia or date.today().isoformat()
+    vendas = db.dados_comprovantes(db.ids_vendas_do_dia(dia))
+    if not vendas:
+        raise ValueError(f"Nenhuma venda em {dia}.")
+    return gerador_pdf.renderizar_lote(vendas, f"comprovantes_{dia}", f"Comprovantes de {dia}", processos)
+
+def gerar_romaneio(entregas):
+    """Romaneio das entregas (id, cliente, endereço, data) com o cupom de cada uma. Retorna o caminho."""
+    from core import gerador_pdf
+    vendas = db.dados_comprovantes([e[0] for e in entregas])
+    caminho, _ = gerador_pdf.gerar_romaneio_pdf(entregas, vendas, f"romaneio_{time.strftime('%Y%m%d_%H%M%S')}")
+    return caminho
+
+def progresso():
+    """
+    Retorna o andamento: itens na fila por status (pendente, processando, erro)
+    e, desta sessão, gerados, falhas e tempo médio de geração (ms).
+    """
+    resumo = db.resumo_fila_comprovantes()
+    with _lock:
+        gerados = _estatisticas['gerados']
+        resumo['gerados'] = gerados
+        resumo['falhas'] = _estatisticas['falhas']
+        resumo['tempo_medio_ms'] = _estatisticas['tempo_total_ms'] / gerados if gerados else 0.0
+    return resumo
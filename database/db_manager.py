@@ -1,347 +1,1009 @@
 import sqlite3
 from sqlite3 import Error
+from contextlib import contextmanager
+import functools
+import threading
+import logging
+import random
+import time
 import json
 import os
+import re
+import socket
+import uuid
+
+from database import migracoes
 
 # Nome do arquivo de configuração
 CONFIG_FILE = 'config.json'
 
-def carregar_caminho_db():
-    """Lê o caminho do banco do arquivo JSON ou retorna o padrão."""
-    default_path = 'estoque.db'
+# --- GERENCIADOR DE CONEXÕES ---
+# Cada thread mantém uma conexão persistente (o sqlite3 não deve compartilhar
+# conexões entre threads). O caminho do banco é lido do config.json uma única
+# vez e só é relido quando salvar_caminho_db() o altera.
+_config_cache = None
+_geracao_caminho = 0
+_local = threading.local()
+_lock_conexoes = threading.Lock()
+_conexoes_abertas = []
+
+# --- CONCORRÊNCIA (vários terminais no mesmo banco) ---
+BUSY_TIMEOUT_MS = 5000          # quanto o SQLite espera sozinho por um lock
+RETENTATIVAS_LOCK = 5           # tentativas extras quando o timeout estoura
+ESPERA_INICIAL_LOCK = 0.1       # segundos; dobra a cada tentativa
+ESPERA_RELEVANTE_LOCK = 0.05    # esperas acima disso entram nas estatísticas
+CACHE_KB = 32768                # cache de páginas por conexão (o padrão de 2 MB não segura o índice FTS em cargas grandes)
+_lock_estatisticas = threading.Lock()
+_estatisticas_lock = {'esperas': 0, 'tempo_espera_ms': 0.0, 'retentativas': 0, 'falhas': 0}
+
+# Sobe a cada COMMIT de transacao() que alterou linhas neste processo. O PRAGMA data_version só
+# enxerga gravações de OUTRAS conexões; as nossas são contadas aqui.
+_contador_escritas = 0
+
+def carregar_config():
+    """Lê o config.json inteiro (dicionário vazio se não existir ou for inválido)."""
     if os.path.exists(CONFIG_FILE):
         try:
             with open(CONFIG_FILE, 'r') as f:
-                data = json.load(f)
-                return data.get('db_path', default_path)
+                return json.load(f)
         except:
             pass
-    return default_path
+    return {}
 
-def salvar_caminho_db(novo_caminho):
-    """Salva o novo caminho no arquivo JSON."""
-    dados = {'db_path': novo_caminho}
+def obter_config():
+    """Configuração em cache (o config.json só é lido na primeira chamada)."""
+    global _config_cache
+    if _config_cache is None:
+        _config_cache = carregar_config()
+    return _config_cache
+
+def atualizar_config(**valores):
+    """Grava as chaves informadas no config.json preservando as demais."""
+    global _config_cache
+    dados = carregar_config()
+    dados.update(valores)
     with open(CONFIG_FILE, 'w') as f:
-        json.dump(dados, f)
+        json.dump(dados, f, indent=2)
+    _config_cache = dados
 
-def conectar():
-    """Conecta ao banco usando o caminho configurado."""
-    db_path = carregar_caminho_db()
+def terminal_id():
+    """
+    Identificador desta instalação (gerado uma vez e guardado no config.json).
+    Vai junto com cada comprovante na fila: cada terminal gera e imprime só
+    os comprovantes das próprias vendas, com a própria impressora.
+    """
+    if not obter_config().get('terminal_id'):
+        atualizar_config(terminal_id=f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}")
+    return obter_config()['terminal_id']
+
+def carregar_caminho_db():
+    """Lê o caminho do banco do arquivo JSON ou retorna o padrão."""
+    return carregar_config().get('db_path', 'estoque.db')
+
+def obter_caminho_db():
+    """Retorna o caminho do banco em cache (lê o config.json só na primeira vez)."""
+    return obter_config().get('db_path', 'estoque.db')
+
+def salvar_caminho_db(novo_caminho):
+    """Salva o novo caminho no arquivo JSON e invalida as conexões abertas."""
+    global _geracao_caminho
+    atualizar_config(db_path=novo_caminho)
+    with _lock_conexoes:
+        _geracao_caminho += 1
+
+def _caminho_em_rede(db_path):
+    """True para caminhos UNC (\\\\servidor\\pasta) ou unidades mapeadas de rede no Windows."""
+    caminho = os.path.abspath(db_path)
+    if caminho.startswith('\\\\') or caminho.startswith('//'):
+        return True
+    if os.name == 'nt':
+        try:
+            import ctypes
+            DRIVE_REMOTE = 4
+            raiz = os.path.splitdrive(caminho)[0] + '\\'
+            return ctypes.windll.kernel32.GetDriveTypeW(raiz) == DRIVE_REMOTE
+        except Exception:
+            return False
+    return False
+
+def _configurar_conexao(conn, db_path):
+    """
+    Aplica os PRAGMAs de concorrência. WAL deixa leitores (dashboard, histórico)
+    e o caixa trabalharem ao mesmo tempo, mas depende de memória compartilhada
+    e não funciona com o arquivo em pasta de rede: nesse caso (ou se o sistema
+    de arquivos recusar) fica o journal tradicional, com busy_timeout + retentativas.
+    """
+    config = obter_config()
+    conn.execute(f"PRAGMA busy_timeout = {int(config.get('busy_timeout_ms', BUSY_TIMEOUT_MS))}")
+    conn.execute(f"PRAGMA cache_size = -{int(config.get('cache_kb', CACHE_KB))}")
+
+    modo = config.get('journal_mode')
+    if not modo:
+        modo = 'delete' if _caminho_em_rede(db_path) else 'wal'
+    try:
+        modo_ativo = conn.execute(f"PRAGMA journal_mode = {modo}").fetchone()[0]
+    except Error as e:
+        logging.warning(f"Não foi possível definir journal_mode={modo}: {e}")
+        modo_ativo = conn.execute("PRAGMA journal_mode").fetchone()[0]
+
+    if modo_ativo.lower() == 'wal':
+        conn.execute("PRAGMA synchronous = NORMAL")
+    elif modo == 'wal':
+        logging.warning(f"WAL indisponível em {db_path}; usando journal '{modo_ativo}'.")
+    _local.journal_mode = modo_ativo.lower()
+
+def _abrir_conexao(db_path):
+    # isolation_level=None: as transações são controladas explicitamente por transacao()
+    conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+    _configurar_conexao(conn, db_path)
+    with _lock_conexoes:
+        _conexoes_abertas.append(conn)
+    return conn
+
+def modo_journal():
+    """Modo de journal em uso pela conexão desta thread ('wal', 'delete'...)."""
+    conectar()
+    return getattr(_local, 'journal_mode', None)
+
+def _descartar_conexao(conn):
+    with _lock_conexoes:
+        if conn in _conexoes_abertas:
+            _conexoes_abertas.remove(conn)
     try:
-        conn = sqlite3.connect(db_path)
+        conn.close()
+    except Error:
+        pass
+
+def conectar():
+    """
+    Retorna a conexão persistente da thread atual, abrindo-a se necessário.
+    A conexão pertence ao gerenciador: não chame close() nela.
+    """
+    conn = getattr(_local, 'conn', None)
+    if conn is not None and getattr(_local, 'geracao', None) == _geracao_caminho:
         return conn
+
+    # Caminho mudou (ou primeira chamada nesta thread): reabre
+    if conn is not None:
+        _descartar_conexao(conn)
+        _local.conn = None
+
+    db_path = obter_caminho_db()
+    try:
+        conn = _abrir_conexao(db_path)
     except Error as e:
         print(f"Erro ao conectar em {db_path}: {e}")
         return None
+    _local.conn = conn
+    _local.geracao = _geracao_caminho
+    _local.profundidade = 0
+    return conn
 
-def inicializar_db():
+@contextmanager
+def conexao():
+    """Empresta a conexão da thread atual (uso em leituras)."""
+    conn = conectar()
+    if conn is None: raise Error("Sem conexão")
+    yield conn
+
+def _erro_de_lock(e):
+    msg = str(e).lower()
+    return isinstance(e, sqlite3.OperationalError) and ('locked' in msg or 'busy' in msg)
+
+def _contar_lock(chave, tempo_ms=0.0):
+    with _lock_estatisticas:
+        _estatisticas_lock[chave] += 1
+        _estatisticas_lock['tempo_espera_ms'] += tempo_ms
+
+def estatisticas_lock():
+    """Contadores de disputa pelo banco desde que o programa abriu."""
+    with _lock_estatisticas:
+        return dict(_estatisticas_lock)
+
+def _iniciar_escrita(conn):
     """
-    Inicializa o banco de dados garantindo que as tabelas existam.
+    BEGIN IMMEDIATE reserva o lock de escrita logo no início (evita o impasse
+    de duas transações que leram e tentam escrever). Se o busy_timeout estourar,
+    tenta de novo com backoff exponencial: nada do bloco rodou ainda.
     """
-    conn = conectar()
-    if conn is not None:
-        criar_tabela(conn)
-        conn.close()
-    else:
-        print("Não foi possível estabelecer conexão com o banco de dados.")
+    espera = ESPERA_INICIAL_LOCK
+    for tentativa in range(RETENTATIVAS_LOCK + 1):
+        inicio = time.perf_counter()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError as e:
+            decorrido = (time.perf_counter() - inicio) * 1000
+            if not _erro_de_lock(e) or tentativa == RETENTATIVAS_LOCK:
+                _contar_lock('falhas', decorrido)
+                logging.error(f"Banco ocupado: transação desistiu após {tentativa + 1} tentativas.")
+                raise
+            _contar_lock('retentativas', decorrido)
+            time.sleep(espera + random.uniform(0, espera))
+            espera *= 2
+            continue
+        decorrido = (time.perf_counter() - inicio) * 1000
+        if decorrido >= ESPERA_RELEVANTE_LOCK * 1000:
+            _contar_lock('esperas', decorrido)
+            logging.info(f"Transação esperou {decorrido:.0f} ms pelo lock do banco.")
+        return
+
+def com_retentativa(func):
+    """
+    Decorator para operações de escrita completas (ex.: finalizar venda): se a
+    operação falhar com 'database is locked', roda tudo de novo com backoff.
+    Dentro de uma transação externa não retenta (quem retenta é o nível de fora).
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if getattr(_local, 'profundidade', 0) > 0:
+            return func(*args, **kwargs)
+        espera = ESPERA_INICIAL_LOCK
+        for tentativa in range(RETENTATIVAS_LOCK + 1):
+            try:
+                return func(*args, **kwargs)
+            except sqlite3.OperationalError as e:
+                if not _erro_de_lock(e) or tentativa == RETENTATIVAS_LOCK:
+                    raise
+                _contar_lock('retentativas')
+                logging.warning(f"{func.__name__}: banco ocupado, tentativa {tentativa + 2}...")
+                time.sleep(espera + random.uniform(0, espera))
+                espera *= 2
+    return wrapper
 
-def criar_tabela(conn):
+@contextmanager
+def transacao():
+    """
+    Executa o bloco dentro de uma transação de escrita: COMMIT ao sair,
+    ROLLBACK em erro. Transações aninhadas reaproveitam a transação externa.
+    """
+    global _contador_escritas
+    conn = conectar()
+    if conn is None: raise Error("Sem conexão")
+    profundidade = _local.profundidade
+    if profundidade == 0:
+        _iniciar_escrita(conn)
+        mudancas_antes = conn.total_changes
+    _local.profundidade = profundidade + 1
     try:
-        cursor = conn.cursor()
+        yield conn
+    except BaseException:
+        _local.profundidade = profundidade
+        if profundidade == 0 and conn.in_transaction:
+            conn.rollback()
+        raise
+    _local.profundidade = profundidade
+    if profundidade == 0:
+        try:
+            conn.commit()
+        except Error:
+            conn.rollback()
+            raise
+        if conn.total_changes != mudancas_antes: # Transação sem alteração não invalida caches
+            with _lock_estatisticas:
+                _contador_escritas += 1
 
-        # Tabelas Base
-        cursor.execute("""CREATE TABLE IF NOT EXISTS produtos (
-                     id INTEGER PRIMARY KEY AUTOINCREMENT,
-                     nome TEXT NOT NULL,
-                     quantidade INTEGER NOT NULL,
-                     preco REAL NOT NULL,
-                     preco_venda REAL,
-                     preco_custo REAL DEFAULT 0.0,
-                     categoria TEXT,
-                     fornecedor TEXT
-                     );""")
-
-        cursor.execute("""CREATE TABLE IF NOT EXISTS usuarios (
-                     id INTEGER PRIMARY KEY AUTOINCREMENT,
-                     nome_completo TEXT NOT NULL,
-                     login TEXT UNIQUE NOT NULL,
-                     senha_hash TEXT NOT NULL,
-                     role TEXT NOT NULL DEFAULT 'funcionario' 
-                     );""")
-        
-        cursor.execute("""CREATE TABLE IF NOT EXISTS vendas (
-                     id INTEGER PRIMARY KEY AUTOINCREMENT,
-                     data_hora TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                     usuario_id INTEGER NOT NULL,
-                     total_venda REAL NOT NULL,
-                     cliente_id INTEGER,
-                     valor_frete REAL DEFAULT 0.0,
-                     status_entrega TEXT DEFAULT 'n/a',
-                     veiculo_id INTEGER,
-                     endereco_entrega TEXT,
-                     metodo_pagamento TEXT DEFAULT 'Dinheiro',
-                     valor_pago REAL DEFAULT 0.0,
-                     troco REAL DEFAULT 0.0,
-                     FOREIGN KEY (usuario_id) REFERENCES usuarios(id)
-                     );""")
-        
-        cursor.execute("""CREATE TABLE IF NOT EXISTS venda_itens (
-                     id INTEGER PRIMARY KEY AUTOINCREMENT,
-                     venda_id INTEGER NOT NULL,
-                     produto_id INTEGER NOT NULL,
-                     quantidade INTEGER NOT NULL,
-                     preco_unitario REAL NOT NULL,
-                     FOREIGN KEY (venda_id) REFERENCES vendas(id),
-                     FOREIGN KEY (produto_id) REFERENCES produtos(id)
-                     );""")
-        
-        cursor.execute("""CREATE TABLE IF NOT EXISTS clientes (
-                     id INTEGER PRIMARY KEY AUTOINCREMENT,
-                     nome_completo TEXT NOT NULL,
-                     telefone TEXT,
-                     email TEXT,
-                     cpf_cnpj TEXT UNIQUE,
-                     endereco TEXT
-                     );""")
-
-        cursor.execute("""CREATE TABLE IF NOT EXISTS financeiro_categorias (
-                     id INTEGER PRIMARY KEY AUTOINCREMENT,
-                     nome TEXT NOT NULL,
-                     tipo TEXT NOT NULL CHECK(tipo IN ('receita', 'despesa'))
-                     );""")
-
-        cursor.execute("""CREATE TABLE IF NOT EXISTS financeiro_movimentacoes (
-                     id INTEGER PRIMARY KEY AUTOINCREMENT,
-                     data_lancamento TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                     descricao TEXT NOT NULL,
-                     valor REAL NOT NULL,
-                     tipo TEXT NOT NULL CHECK(tipo IN ('entrada', 'saida')),
-                     categoria_id INTEGER,
-                     venda_id INTEGER,
-                     usuario_id INTEGER,
-                     FOREIGN KEY (categoria_id) REFERENCES financeiro_categorias(id),
-                     FOREIGN KEY (venda_id) REFERENCES vendas(id),
-                     FOREIGN KEY (usuario_id) REFERENCES usuarios(id)
-                     );""")
-
-        cursor.execute("""CREATE TABLE IF NOT EXISTS veiculos (
-                     id INTEGER PRIMARY KEY AUTOINCREMENT,
-                     placa TEXT UNIQUE NOT NULL,
-                     modelo TEXT NOT NULL,
-                     marca TEXT,
-                     ano INTEGER,
-                     capacidade_kg REAL,
-                     status TEXT DEFAULT 'disponivel' CHECK(status IN ('disponivel', 'em_rota', 'manutencao'))
-                     );""")
-
-        cursor.execute("""CREATE TABLE IF NOT EXISTS manutencoes (
-                     id INTEGER PRIMARY KEY AUTOINCREMENT,
-                     veiculo_id INTEGER NOT NULL,
-                     data_manutencao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                     descricao TEXT NOT NULL,
-                     custo REAL,
-                     km_atual INTEGER,
-                     FOREIGN KEY (veiculo_id) REFERENCES veiculos(id)
-                     );""")
-        
-        # --- TABELA DE CONFIGURAÇÃO DA EMPRESA ---
-        cursor.execute("""CREATE TABLE IF NOT EXISTS empresa_config (
-                     id INTEGER PRIMARY KEY CHECK (id = 1),
-                     nome_fantasia TEXT,
-                     endereco_base TEXT,
-                     telefone TEXT
-                     );""")
-        
-        # Cria a linha padrão se não existir
-        cursor.execute("INSERT OR IGNORE INTO empresa_config (id, nome_fantasia, endereco_base) VALUES (1, 'Minha Empresa', '')")
-
-        # Migrações
-        migracoes = [
-            "ALTER TABLE produtos ADD COLUMN preco_custo REAL DEFAULT 0.0",
-            "ALTER TABLE produtos ADD COLUMN categoria TEXT",
-            "ALTER TABLE produtos ADD COLUMN fornecedor TEXT",
-            "ALTER TABLE vendas ADD COLUMN cliente_id INTEGER",
-            "ALTER TABLE vendas ADD COLUMN valor_frete REAL DEFAULT 0.0",
-            "ALTER TABLE vendas ADD COLUMN status_entrega TEXT DEFAULT 'n/a'",
-            "ALTER TABLE vendas ADD COLUMN veiculo_id INTEGER",
-            "ALTER TABLE vendas ADD COLUMN metodo_pagamento TEXT DEFAULT 'Dinheiro'",
-            "ALTER TABLE vendas ADD COLUMN valor_pago REAL DEFAULT 0.0",
-            "ALTER TABLE vendas ADD COLUMN troco REAL DEFAULT 0.0"
-        ]
-
-        for sql in migracoes:
-            try:
-                cursor.execute(sql)
-            except Error:
-                pass 
+def versao_dados():
+    """
+    Valor que muda sempre que o banco é alterado, por este ou por outro terminal
+    (PRAGMA data_version da conexão desta thread + gravações deste processo).
+    Serve para validar caches sem reler as tabelas.
+    """
+    conn = conectar()
+    if conn is None: raise Error("Sem conexão")
+    return (id(conn), conn.execute("PRAGMA data_version").fetchone()[0], _contador_escritas)
 
-        cursor.execute("UPDATE vendas SET status_entrega = 'pendente' WHERE valor_frete > 0 AND status_entrega = 'n/a'")
+def fechar_conexoes():
+    """Fecha todas as conexões abertas pelo gerenciador (usar no encerramento)."""
+    global _geracao_caminho
+    with _lock_conexoes:
+        conexoes = list(_conexoes_abertas)
+        _conexoes_abertas.clear()
+        _geracao_caminho += 1
+    for conn in conexoes:
+        try:
+            conn.close()
+        except Error:
+            pass
+
+# --- REGISTRO DE CONSULTAS ---
+# Consultas dos caminhos quentes ficam registradas aqui para que
+# database/diagnostico.py rode EXPLAIN QUERY PLAN em todas elas.
+CONSULTAS_MONITORADAS = {}
 
+def registrar_consulta(nome, sql, varredura_esperada=False):
+    """
+    Registra a consulta no diagnóstico de planos e devolve o próprio SQL.
+    varredura_esperada=True marca listagens que leem a tabela inteira de propósito.
+    """
+    CONSULTAS_MONITORADAS[nome] = (sql, varredura_esperada)
+    return sql
+
+def inicializar_db():
+    """
+    Inicializa o banco de dados aplicando as migrações pendentes.
+    Se o schema já estiver na versão atual, nenhuma tabela é tocada.
+    """
+    conn = conectar()
+    if conn is None:
+        print("Não foi possível estabelecer conexão com o banco de dados.")
+        return
+    try:
+        migracoes.aplicar_migracoes(conn)
     except Error as e:
         print(f"Erro ao criar/atualizar tabelas: {e}")
 
+SQL_LISTAR_PRODUTOS = registrar_consulta("produtos.listar", "SELECT * FROM produtos ORDER BY nome", varredura_esperada=True)
+SQL_BUSCAR_PRODUTO_FTS = registrar_consulta("produtos.buscar_texto", """SELECT p.*
+    FROM produtos_fts f
+    JOIN produtos p ON p.id = f.rowid
+    WHERE produtos_fts MATCH ?
+    ORDER BY bm25(produtos_fts, 10.0, 3.0, 1.0), p.nome
+    LIMIT ?""")
+# Usada só se o SQLite não tiver FTS5
+SQL_BUSCAR_PRODUTO_LIKE = "SELECT * FROM produtos WHERE nome LIKE ? ORDER BY nome LIMIT ?"
+LIMITE_BUSCA_PRODUTOS = 100
+SQL_PRODUTOS_PRIMEIRA_PAGINA = registrar_consulta("produtos.primeira_pagina", "SELECT * FROM produtos ORDER BY nome, id LIMIT ?")
+SQL_PRODUTOS_PAGINA = registrar_consulta("produtos.pagina", "SELECT * FROM produtos WHERE (nome, id) > (?, ?) ORDER BY nome, id LIMIT ?")
+SQL_PRODUTO_POR_ID = registrar_consulta("produtos.por_id", "SELECT * FROM produtos where id = ?")
+SQL_PRODUTO_POR_CODIGO = registrar_consulta("produtos.por_codigo_barras", "SELECT * FROM produtos WHERE codigo_barras = ?")
+SQL_CODIGOS_EM_USO = "SELECT codigo_barras, id FROM produtos WHERE codigo_barras IN ({marcadores})"
+registrar_consulta("produtos.codigos_em_uso", SQL_CODIGOS_EM_USO.format(marcadores='?,?,?'))
+SQL_PRODUTOS_EXISTENTES = "SELECT id FROM produtos WHERE id IN ({marcadores})"
+registrar_consulta("produtos.existentes", SQL_PRODUTOS_EXISTENTES.format(marcadores='?,?,?'))
+SQL_ESTOQUE_CARRINHO = "SELECT id, quantidade FROM produtos WHERE id IN ({marcadores})"
+registrar_consulta("vendas.validar_estoque", SQL_ESTOQUE_CARRINHO.format(marcadores='?,?,?'))
+# Razão de estoque (migração 12): produtos.quantidade só muda por movimento
+SQL_INSERIR_MOVIMENTO = """INSERT INTO estoque_movimentos (produto_id, tipo, quantidade, venda_id, usuario_id, observacao)
+    VALUES (?, ?, ?, ?, ?, ?)"""
+# Baixa da venda condicionada ao saldo: sem linha inserida = estoque insuficiente
+SQL_BAIXA_VENDA = """INSERT INTO estoque_movimentos (produto_id, tipo, quantidade, venda_id, usuario_id)
+    SELECT id, 'venda', -?, ?, ? FROM produtos WHERE id = ? AND quantidade >= ?"""
+SQL_MOVIMENTOS_PRODUTO = registrar_consulta("estoque.movimentos_produto", """SELECT m.id, m.data_hora, m.tipo, m.quantidade,
+        m.venda_id, u.nome_completo, m.observacao
+    FROM estoque_movimentos m
+    LEFT JOIN usuarios u ON m.usuario_id = u.id
+    WHERE m.produto_id = ?
+    ORDER BY m.id DESC
+    LIMIT ?""")
+SQL_ULTIMA_FOTO = registrar_consulta("estoque.ultima_foto",
+    "SELECT id, data_hora, ultimo_movimento_id FROM estoque_fotos ORDER BY data_hora DESC, id DESC LIMIT 1")
+# Fotos e movimentos até o fim do dia local 'AAAA-MM-DD' (data_hora em UTC)
+# O razão começa no primeiro movimento (na migração 12, o saldo de abertura): antes disso não há histórico
+SQL_INICIO_RAZAO = registrar_consulta("estoque.inicio_razao", """SELECT strftime('%d/%m/%Y', data_hora, 'localtime'),
+        datetime(?, '+1 day', 'utc') <= data_hora
+    FROM estoque_movimentos WHERE id = (SELECT MIN(id) FROM estoque_movimentos)""")
+SQL_FOTO_ATE_DIA = registrar_consulta("estoque.foto_ate_dia", """SELECT id, ultimo_movimento_id FROM estoque_fotos
+    WHERE data_hora < datetime(?, '+1 day', 'utc')
+    ORDER BY data_hora DESC, id DESC LIMIT 1""")
+SQL_SALDO_FOTO_PRODUTO = registrar_consulta("estoque.saldo_foto_produto",
+    "SELECT quantidade FROM estoque_fotos_itens WHERE foto_id = ? AND produto_id = ?")
+SQL_DELTA_PRODUTO = registrar_consulta("estoque.delta_produto", """SELECT COALESCE(SUM(quantidade), 0) FROM estoque_movimentos
+    WHERE produto_id = ? AND id > ? AND data_hora < datetime(?, '+1 day', 'utc')""")
+SQL_SALDOS_FOTO = registrar_consulta("estoque.saldos_foto", "SELECT produto_id, quantidade FROM estoque_fotos_itens WHERE foto_id = ?")
+# '+produto_id': agrupa em memória e lê só os movimentos depois da foto (faixa de id),
+# em vez de percorrer o índice por produto inteiro
+SQL_DELTAS = registrar_consulta("estoque.deltas", """SELECT produto_id, SUM(quantidade) FROM estoque_movimentos
+    WHERE id > ? AND data_hora < datetime(?, '+1 day', 'utc')
+    GROUP BY +produto_id""")
+SQL_MOVIMENTOS_DESDE = registrar_consulta("estoque.movimentos_desde", "SELECT COUNT(*) FROM estoque_movimentos WHERE id > ?")
+# Carga em lote (importação/exportação de produtos)
+SQL_AJUSTAR_PARA = """INSERT INTO estoque_movimentos (produto_id, tipo, quantidade, usuario_id, observacao)
+    SELECT id, 'ajuste', ? - quantidade, ?, ? FROM produtos WHERE id = ? AND quantidade != ?"""
+SQL_ATUALIZAR_PRECOS = """UPDATE produtos SET preco = ?, preco_venda = ?, preco_custo = ?,
+    codigo_barras = COALESCE(?, codigo_barras) WHERE id = ?"""
+# Só toca nome/categoria/fornecedor se mudaram: o trigger do FTS dispara por coluna atribuída, mesmo sem mudança
+SQL_ATUALIZAR_TEXTOS = """UPDATE produtos SET nome = ?, categoria = ?, fornecedor = ?
+    WHERE id = ? AND (nome IS NOT ? OR categoria IS NOT ? OR fornecedor IS NOT ?)"""
+SQL_INSERIR_PRODUTO_ZERADO = """INSERT INTO produtos (nome, quantidade, preco, preco_venda, preco_custo, categoria, fornecedor, codigo_barras)
+    VALUES (?, 0, ?, ?, ?, ?, ?, ?)"""
+SQL_PRODUTOS_POR_ID_APOS = registrar_consulta("produtos.lote_por_id", "SELECT * FROM produtos WHERE id > ? ORDER BY id LIMIT ?")
+# Ajuste em lote: novo = MAX(0, (atual * fator + 5000) / 10000 + soma), fator em centésimos de %
+# (10000 mantém, 10800 = +8%, 0 = passa a valer 'soma'); fator NULL = campo não muda.
+# A prévia e a aplicação usam a mesma conta, então mostram exatamente o que será gravado.
+SQL_AJUSTE_CALCULO = """SELECT id, nome,
+        preco_venda, COALESCE(MAX(0, (preco_venda * ? + 5000) / 10000 + ?), preco_venda) AS novo_venda,
+        preco_custo, COALESCE(MAX(0, (preco_custo * ? + 5000) / 10000 + ?), preco_custo) AS novo_custo,
+        quantidade, COALESCE(MAX(0, (quantidade * ? + 5000) / 10000 + ?), quantidade) AS nova_qtd
+    FROM produtos WHERE {onde}"""
+_AJUSTE_ALTERA = "novo_venda IS NOT preco_venda OR novo_custo IS NOT preco_custo OR nova_qtd != quantidade"
+SQL_AJUSTE_PREVIA = f"SELECT * FROM ({SQL_AJUSTE_CALCULO}) WHERE {_AJUSTE_ALTERA} ORDER BY nome, id"
+SQL_AJUSTE_REGISTRAR = f"""INSERT INTO ajustes_lote_itens (ajuste_id, produto_id, preco_venda_antes, preco_venda_depois,
+        preco_custo_antes, preco_custo_depois, quantidade_delta)
+    SELECT ?, id, preco_venda, novo_venda, preco_custo, novo_custo, nova_qtd - quantidade
+    FROM ({SQL_AJUSTE_CALCULO}) WHERE {_AJUSTE_ALTERA}"""
+FILTROS_AJUSTE = {
+    'categoria': "categoria = ? COLLATE NOCASE",
+    'fornecedor': "fornecedor = ? COLLATE NOCASE",
+}
+SQL_INSERIR_AJUSTE = "INSERT INTO ajustes_lote (usuario_id, descricao) VALUES (?, ?)"
+SQL_AJUSTE_APLICAR_PRECOS = registrar_consulta("ajustes.aplicar_precos", """UPDATE produtos SET (preco, preco_venda, preco_custo) =
+        (SELECT i.preco_venda_depois, i.preco_venda_depois, i.preco_custo_depois FROM ajustes_lote_itens i
+         WHERE i.ajuste_id = ? AND i.produto_id = produtos.id)
+    WHERE id IN (SELECT produto_id FROM ajustes_lote_itens WHERE ajuste_id = ?
+                 AND (preco_venda_depois IS NOT preco_venda_antes OR preco_custo_depois IS NOT preco_custo_antes))""")
+SQL_AJUSTE_MOVIMENTOS = registrar_consulta("ajustes.movimentos", """INSERT INTO estoque_movimentos (produto_id, tipo, quantidade, usuario_id, observacao)
+    SELECT produto_id, 'ajuste', quantidade_delta, ?, ? FROM ajustes_lote_itens WHERE ajuste_id = ? AND quantidade_delta != 0""")
+SQL_AJUSTE_CONTAR = registrar_consulta("ajustes.contar_itens", """SELECT COUNT(*),
+        COUNT(CASE WHEN preco_venda_depois IS NOT preco_venda_antes OR preco_custo_depois IS NOT preco_custo_antes THEN 1 END)
+    FROM ajustes_lote_itens WHERE ajuste_id = ?""")
+# Desfazer: preço só volta se ninguém o mudou depois; estoque volta por movimento inverso (sem ficar negativo)
+SQL_DESFAZER_MARCAR = "UPDATE ajustes_lote SET desfeito_em = CURRENT_TIMESTAMP, desfeito_por = ? WHERE id = ? AND desfeito_em IS NULL"
+SQL_DESFAZER_PRECOS = registrar_consulta("ajustes.desfazer_precos", """UPDATE produtos SET (preco, preco_venda, preco_custo) =
+        (SELECT i.preco_venda_antes, i.preco_venda_antes, i.preco_custo_antes FROM ajustes_lote_itens i
+         WHERE i.ajuste_id = ? AND i.produto_id = produtos.id)
+    WHERE id IN (SELECT i.produto_id FROM ajustes_lote_itens i JOIN produtos p ON p.id = i.produto_id
+                 WHERE i.ajuste_id = ?
+                   AND (i.preco_venda_depois IS NOT i.preco_venda_antes OR i.preco_custo_depois IS NOT i.preco_custo_antes)
+                   AND p.preco_venda IS i.preco_venda_depois AND p.preco_custo IS i.preco_custo_depois)""")
+SQL_DESFAZER_MOVIMENTOS = registrar_consulta("ajustes.desfazer_movimentos", """INSERT INTO estoque_movimentos (produto_id, tipo, quantidade, usuario_id, observacao)
+    SELECT i.produto_id, 'ajuste', MAX(-i.quantidade_delta, -p.quantidade), ?, ?
+    FROM ajustes_lote_itens i JOIN produtos p ON p.id = i.produto_id
+    WHERE i.ajuste_id = ? AND i.quantidade_delta != 0 AND MAX(-i.quantidade_delta, -p.quantidade) != 0""")
+# Ordem do rowid: o SCAN para no LIMIT (a tabela só cresce um registro por ajuste)
+SQL_AJUSTES_RECENTES = registrar_consulta("ajustes.recentes", """SELECT a.id, strftime('%d/%m/%Y %H:%M', a.data_hora, 'localtime'),
+        u.nome_completo, a.descricao, a.itens, strftime('%d/%m/%Y %H:%M', a.desfeito_em, 'localtime')
+    FROM ajustes_lote a
+    LEFT JOIN usuarios u ON u.id = a.usuario_id
+    ORDER BY a.id DESC LIMIT ?""", varredura_esperada=True)
+SQL_CATEGORIAS = registrar_consulta("produtos.categorias", """SELECT DISTINCT categoria COLLATE NOCASE FROM produtos
+    WHERE categoria != '' ORDER BY 1""", varredura_esperada=True)
+SQL_FORNECEDORES = registrar_consulta("produtos.fornecedores", """SELECT DISTINCT fornecedor COLLATE NOCASE FROM produtos
+    WHERE fornecedor != '' ORDER BY 1""", varredura_esperada=True)
+SQL_USUARIO_POR_LOGIN = registrar_consulta("usuarios.por_login", "SELECT * FROM usuarios WHERE login = ?")
+# Histórico: página por chave (data_hora, id), mais recentes primeiro, com filtros opcionais
+SQL_VENDAS_PAGINA = """SELECT v.id, v.data_hora, u.nome_completo, c.nome_completo, v.total_venda, v.metodo_pagamento
+    FROM vendas v
+    LEFT JOIN usuarios u ON v.usuario_id = u.id
+    LEFT JOIN clientes c ON v.cliente_id = c.id
+    {onde}
+    ORDER BY v.data_hora DESC, v.id DESC
+    LIMIT ?"""
+# data_hora é gravada em UTC; as datas dos filtros são dias locais 'AAAA-MM-DD'
+FILTROS_VENDAS = {
+    'data_inicio': "v.data_hora >= datetime(?, 'utc')",
+    'data_fim': "v.data_hora < datetime(?, '+1 day', 'utc')",
+    'usuario_id': "v.usuario_id = ?",
+    'cliente_id': "v.cliente_id = ?",
+    'metodo_pagamento': "v.metodo_pagamento = ?",
+    'total_min': "v.total_venda >= ?",
+    'total_max': "v.total_venda <= ?",
+}
+
+def _sql_vendas_pagina(filtros, apos):
+    """SQL e parâmetros da página: só entram no WHERE os filtros preenchidos."""
+    condicoes, parametros = [], []
+    for chave, condicao in FILTROS_VENDAS.items():
+        if filtros.get(chave) is not None:
+            condicoes.append(condicao)
+            parametros.append(filtros[chave])
+    if apos is not None:
+        condicoes.append("(v.data_hora, v.id) < (?, ?)")
+        parametros.extend(apos)
+    onde = "WHERE " + " AND ".join(condicoes) if condicoes else ""
+    return SQL_VENDAS_PAGINA.format(onde=onde), parametros
+
+registrar_consulta("historico.primeira_pagina", _sql_vendas_pagina({}, None)[0])
+registrar_consulta("historico.pagina", _sql_vendas_pagina({}, ('', 0))[0])
+registrar_consulta("historico.pagina_periodo", _sql_vendas_pagina({'data_inicio': '', 'data_fim': ''}, ('', 0))[0])
+registrar_consulta("historico.pagina_vendedor", _sql_vendas_pagina({'usuario_id': 0}, ('', 0))[0])
+registrar_consulta("historico.pagina_cliente", _sql_vendas_pagina({'cliente_id': 0, 'total_min': 0}, ('', 0))[0])
+registrar_consulta("historico.pagina_pagamento", _sql_vendas_pagina({'metodo_pagamento': ''}, ('', 0))[0])
+SQL_ITENS_DA_VENDA = registrar_consulta("historico.itens_da_venda", """SELECT p.nome, vi.quantidade, vi.preco_unitario, (vi.quantidade * vi.preco_unitario) as subtotal
+    FROM venda_itens vi
+    JOIN produtos p ON vi.produto_id = p.id
+    WHERE vi.venda_id = ?""")
+SQL_ITENS_DAS_VENDAS = """SELECT vi.venda_id, COALESCE(p.nome, 'Produto removido'), vi.quantidade, vi.preco_unitario,
+        (vi.quantidade * vi.preco_unitario)
+    FROM venda_itens vi
+    LEFT JOIN produtos p ON vi.produto_id = p.id
+    WHERE vi.venda_id IN ({marcadores})
+    ORDER BY vi.venda_id, vi.id"""
+registrar_consulta("historico.itens_das_vendas", SQL_ITENS_DAS_VENDAS.format(marcadores='?,?,?'))
+SQL_COMPROVANTE_VENDA = registrar_consulta("comprovantes.venda", """SELECT v.id, strftime('%d/%m/%Y %H:%M', v.data_hora, 'localtime'),
+        c.nome_completo, u.nome_completo, v.total_venda, v.valor_frete, v.metodo_pagamento, v.valor_pago, v.troco
+    FROM vendas v
+    LEFT JOIN usuarios u ON v.usuario_id = u.id
+    LEFT JOIN clientes c ON v.cliente_id = c.id
+    WHERE v.id = ?""")
+SQL_ITENS_COMPROVANTE = registrar_consulta("comprovantes.itens", """SELECT vi.produto_id, COALESCE(p.nome, 'Produto removido'), vi.quantidade,
+        vi.preco_unitario, (vi.quantidade * vi.preco_unitario)
+    FROM venda_itens vi
+    LEFT JOIN produtos p ON vi.produto_id = p.id
+    WHERE vi.venda_id = ?
+    ORDER BY vi.id""")
+# Lotes (comprovantes do dia, romaneio): uma consulta por tabela para N vendas
+SQL_COMPROVANTES_VENDAS = SQL_COMPROVANTE_VENDA.replace("WHERE v.id = ?", "WHERE v.id IN ({marcadores})")
+registrar_consulta("comprovantes.vendas_lote", SQL_COMPROVANTES_VENDAS.format(marcadores='?,?,?'))
+SQL_ITENS_COMPROVANTES = """SELECT vi.venda_id, vi.produto_id, COALESCE(p.nome, 'Produto removido'), vi.quantidade,
+        vi.preco_unitario, (vi.quantidade * vi.preco_unitario)
+    FROM venda_itens vi
+    LEFT JOIN produtos p ON vi.produto_id = p.id
+    WHERE vi.venda_id IN ({marcadores})
+    ORDER BY vi.venda_id, vi.id"""
+registrar_consulta("comprovantes.itens_lote", SQL_ITENS_COMPROVANTES.format(marcadores='?,?,?'))
+# data_hora é gravada em UTC; o dia pedido é local
+SQL_VENDAS_DO_DIA = registrar_consulta("comprovantes.vendas_do_dia", """SELECT id FROM vendas
+    WHERE data_hora >= datetime(?, 'utc') AND data_hora < datetime(?, '+1 day', 'utc')
+    ORDER BY data_hora, id""")
+TAMANHO_LOTE_IN = 500
+# Cada terminal só consome os comprovantes que ele mesmo enfileirou (terminal_id()).
+# A leitura vem antes: com a fila vazia o serviço não abre transação de escrita.
+SQL_HA_COMPROVANTE_PENDENTE = registrar_consulta("comprovantes.ha_pendente", """SELECT 1 FROM fila_comprovantes
+    WHERE terminal = ? AND status = 'pendente' AND proxima_tentativa <= CURRENT_TIMESTAMP LIMIT 1""")
+# Reserva o próximo comprovante numa única instrução (a venda nunca é pega duas vezes)
+SQL_RESERVAR_COMPROVANTE = registrar_consulta("comprovantes.reservar", """UPDATE fila_comprovantes
+    SET status = 'processando', tentativas = tentativas + 1, atualizado_em = CURRENT_TIMESTAMP
+    WHERE venda_id = (SELECT venda_id FROM fila_comprovantes
+                      WHERE terminal = ? AND status = 'pendente' AND proxima_tentativa <= CURRENT_TIMESTAMP
+                      ORDER BY proxima_tentativa LIMIT 1)
+    RETURNING venda_id, tentativas""")
+SQL_RESUMO_FILA_COMPROVANTES = registrar_consulta("comprovantes.resumo_fila", """SELECT status, COUNT(*) FROM fila_comprovantes
+    WHERE status IN ('pendente', 'processando', 'erro') GROUP BY status""")
+SQL_CLIENTE_POR_CPF = registrar_consulta("clientes.por_cpf", "SELECT * FROM clientes WHERE cpf_cnpj = ?")
+# Autocompletar do PDV: (id, nome, cpf_cnpj) dos primeiros N que casam com o que foi digitado
+SQL_BUSCAR_CLIENTE_CPF = registrar_consulta("clientes.buscar_cpf", """SELECT id, nome_completo, cpf_cnpj
+    FROM clientes WHERE cpf_cnpj_digitos GLOB ? ORDER BY cpf_cnpj_digitos LIMIT ?""")
+SQL_BUSCAR_CLIENTE_FTS = registrar_consulta("clientes.buscar_nome", """SELECT c.id, c.nome_completo, c.cpf_cnpj
+    FROM clientes_fts f
+    JOIN clientes c ON c.id = f.rowid
+    WHERE clientes_fts MATCH ?
+    ORDER BY f.rank, c.nome_completo
+    LIMIT ?""")
+# Usada só se o SQLite não tiver FTS5 (prefixo do nome completo, pelo índice NOCASE)
+SQL_BUSCAR_CLIENTE_PREFIXO = """SELECT id, nome_completo, cpf_cnpj FROM clientes
+    WHERE nome_completo COLLATE NOCASE >= ? AND nome_completo COLLATE NOCASE < ?
+    ORDER BY nome_completo COLLATE NOCASE LIMIT ?"""
+LIMITE_BUSCA_CLIENTES = 10
+SQL_LISTAR_MOVIMENTACOES = registrar_consulta("financeiro.listar", """
+    SELECT id, data_lancamento, descricao, valor, tipo 
+    FROM financeiro_movimentacoes 
+    ORDER BY data_lancamento DESC
+""", varredura_esperada=True)
+
 # --- FUNÇÕES GERAIS ---
 
 def obter_dados_empresa():
-    conn = conectar()
-    if conn is None: return None
     try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT nome_fantasia, endereco_base, telefone FROM empresa_config WHERE id = 1")
-        return cursor.fetchone()
+        with conexao() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT nome_fantasia, endereco_base, telefone FROM empresa_config WHERE id = 1")
+            return cursor.fetchone()
     except Error as e:
         print(f"Erro ao obter empresa: {e}")
         return None
-    finally:
-        if conn: conn.close()
 
 def salvar_dados_empresa(nome, endereco, telefone):
-    conn = conectar()
-    if conn is None: return
     try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            UPDATE empresa_config 
-            SET nome_fantasia = ?, endereco_base = ?, telefone = ?
-            WHERE id = 1
-        """, (nome, endereco, telefone))
-        conn.commit()
+        with transacao() as conn:
+            conn.execute("""
+                UPDATE empresa_config 
+                SET nome_fantasia = ?, endereco_base = ?, telefone = ?
+                WHERE id = 1
+            """, (nome, endereco, telefone))
     except Error as e:
         print(f"Erro ao salvar empresa: {e}")
         raise e
-    finally:
-        if conn: conn.close()
 
 # --- FUNÇÕES PRODUTOS ---
-def adicionar_produto(nome, quantidade, preco_venda, preco_custo, categoria, fornecedor):
-    conn = conectar()
-    if conn is None: return
+def adicionar_produto(nome, quantidade, preco_venda, preco_custo, categoria, fornecedor, codigo_barras=None, usuario_id=None):
     try:
-        cursor = conn.cursor()
-        cursor.execute("""INSERT INTO produtos (nome, quantidade, preco, preco_venda, preco_custo, categoria, fornecedor) 
-                          VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                       (nome, quantidade, preco_venda, preco_venda, preco_custo, categoria, fornecedor))
-        conn.commit()
+        with transacao() as conn:
+            # Nasce com 0 e o saldo inicial entra como movimento (a projeção soma)
+            cursor = conn.execute("""INSERT INTO produtos (nome, quantidade, preco, preco_venda, preco_custo, categoria, fornecedor, codigo_barras) 
+                              VALUES (?, 0, ?, ?, ?, ?, ?, ?)""",
+                           (nome, preco_venda, preco_venda, preco_custo, categoria, fornecedor, codigo_barras))
+            produto_id = cursor.lastrowid
+            if quantidade:
+                conn.execute(SQL_INSERIR_MOVIMENTO, (produto_id, 'inicial', quantidade, None, usuario_id, "Cadastro do produto"))
+            return produto_id
     except Error as e:
         print(f"Erro ao adicionar produto: {e}")
-    finally:
-        if conn: conn.close()
 
 def listar_produtos():
-    conn = conectar()
-    if conn is None: return []
     try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM produtos ORDER BY nome")
-        return cursor.fetchall()
+        with conexao() as conn:
+            return conn.execute(SQL_LISTAR_PRODUTOS).fetchall()
     except Error as e:
         print(f"Erro ao listar produtos: {e}")
         return []
-    finally:
-        if conn: conn.close()
 
-def atualizar_produto(id, nome, quantidade, preco_venda, preco_custo, categoria, fornecedor):
-    conn = conectar()
-    if conn is None: return
+def listar_produtos_pagina(apos=None, limite=200):
+    """
+    Página de produtos em ordem de nome (paginação por chave).
+    apos = (nome, id) do último produto da página anterior, ou None para a primeira.
+    """
     try:
-        cursor = conn.cursor()
-        cursor.execute("""UPDATE produtos SET 
-                       nome = ?, quantidade = ?, preco = ?, preco_venda = ?, preco_custo = ?, categoria = ?, fornecedor = ? 
-                       WHERE id = ?""",
-                       (nome, quantidade, preco_venda, preco_venda, preco_custo, categoria, fornecedor, id))
-        conn.commit()
+        with conexao() as conn:
+            if apos is None:
+                return conn.execute(SQL_PRODUTOS_PRIMEIRA_PAGINA, (limite,)).fetchall()
+            return conn.execute(SQL_PRODUTOS_PAGINA, (apos[0], apos[1], limite)).fetchall()
+    except Error as e:
+        print(f"Erro ao listar produtos: {e}")
+        return []
+
+def atualizar_produto(id, nome, quantidade, preco_venda, preco_custo, categoria, fornecedor, codigo_barras=None,
+                      quantidade_anterior=None, usuario_id=None):
+    """
+    A quantidade não é sobrescrita: a diferença para 'quantidade_anterior'
+    (o que a tela exibia) vira um movimento de ajuste, então vendas feitas
+    enquanto o formulário estava aberto não se perdem. Sem 'quantidade_anterior',
+    ajusta até 'quantidade' a partir do saldo atual. O saldo nunca fica negativo:
+    se o que foi vendido nesse meio tempo não couber na retirada, ela para no zero.
+    """
+    try:
+        with transacao() as conn:
+            linha = conn.execute("SELECT quantidade FROM produtos WHERE id = ?", (id,)).fetchone()
+            atual = linha[0] if linha else quantidade
+            if quantidade_anterior is None:
+                quantidade_anterior = atual
+            delta = max(quantidade - quantidade_anterior, -atual)
+            if delta:
+                conn.execute(SQL_INSERIR_MOVIMENTO, (id, 'ajuste', delta, None, usuario_id,
+                                                     f"Edição do cadastro: {quantidade_anterior} -> {quantidade}"))
+            conn.execute("""UPDATE produtos SET 
+                           nome = ?, preco = ?, preco_venda = ?, preco_custo = ?, categoria = ?, fornecedor = ?, codigo_barras = ? 
+                           WHERE id = ?""",
+                           (nome, preco_venda, preco_venda, preco_custo, categoria, fornecedor, codigo_barras, id))
     except Error as e:
         print(f"Erro ao atualizar produto: {e}")
-    finally:
-        if conn: conn.close()
 
 def remover_produto(id):
-    conn = conectar()
-    if conn is None: return
     try:
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM produtos WHERE id = ?", (id,))
-        conn.commit()
+        with transacao() as conn:
+            conn.execute("DELETE FROM produtos WHERE id = ?", (id,))
     except Error as e:
         print(f"Erro ao remover produto: {e}")
-    finally:
-        if conn: conn.close()
 
-def buscar_produto(nome):
-    conn = conectar()
-    if conn is None: return []
+def _consulta_fts(termo):
+    """Transforma o texto digitado em consulta FTS5: todas as palavras, por prefixo."""
+    palavras = re.findall(r'\w+', termo)
+    return ' '.join(f'"{p}"*' for p in palavras)
+
+def buscar_produto(nome, limite=LIMITE_BUSCA_PRODUTOS):
+    """
+    Busca por nome, categoria ou fornecedor no índice FTS5 (prefixo e sem
+    acentos: 'cafe' encontra 'Café Torrado'), ordenado por relevância.
+    """
+    consulta = _consulta_fts(nome)
+    if not consulta:
+        return []
     try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM produtos WHERE nome LIKE ? ORDER BY nome", ('%' + nome + '%',))
-        return cursor.fetchall()
+        with conexao() as conn:
+            try:
+                return conn.execute(SQL_BUSCAR_PRODUTO_FTS, (consulta, limite)).fetchall()
+            except sqlite3.OperationalError as e:
+                if 'produtos_fts' not in str(e):
+                    raise
+                return conn.execute(SQL_BUSCAR_PRODUTO_LIKE, ('%' + nome + '%', limite)).fetchall()
     except Error as e:
         print(f"Erro ao buscar produto: {e}")
         return []
-    finally:
-        if conn: conn.close()
 
 def buscar_produto_por_id(id_produto):
-    conn = conectar()
-    if conn is None: return None
     try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM produtos where id = ?", (id_produto,))
-        return cursor.fetchone()
+        with conexao() as conn:
+            return conn.execute(SQL_PRODUTO_POR_ID, (id_produto,)).fetchone()
     except Error as e:
         print(f'Erro ao buscar produto pro ID: {e}')
         return None
-    finally:
-        if conn: conn.close()
+
+def buscar_produto_por_codigo(codigo_barras):
+    try:
+        with conexao() as conn:
+            return conn.execute(SQL_PRODUTO_POR_CODIGO, (codigo_barras,)).fetchone()
+    except Error as e:
+        print(f'Erro ao buscar produto pelo código: {e}')
+        return None
+
+def codigos_em_uso(codigos):
+    """{codigo_barras: id do produto} dos códigos que já estão cadastrados."""
+    codigos = list(codigos)
+    em_uso = {}
+    with conexao() as conn:
+        for i in range(0, len(codigos), TAMANHO_LOTE_IN):
+            lote = codigos[i:i + TAMANHO_LOTE_IN]
+            em_uso.update(conn.execute(SQL_CODIGOS_EM_USO.format(marcadores=','.join('?' * len(lote))), lote).fetchall())
+    return em_uso
+
+def produtos_existentes(ids):
+    """Subconjunto de 'ids' que existe na tabela produtos."""
+    ids = list(ids)
+    existentes = set()
+    with conexao() as conn:
+        for i in range(0, len(ids), TAMANHO_LOTE_IN):
+            lote = ids[i:i + TAMANHO_LOTE_IN]
+            existentes.update(linha[0] for linha in
+                              conn.execute(SQL_PRODUTOS_EXISTENTES.format(marcadores=','.join('?' * len(lote))), lote))
+    return existentes
+
+@com_retentativa
+def atribuir_codigos_barras(pares):
+    """
+    Grava os códigos [(produto_id, codigo_barras), ...] em uma transação.
+    Os produtos do lote têm o código anterior limpo antes, então trocas de
+    código entre eles não esbarram no índice único.
+    """
+    with transacao() as conn:
+        conn.executemany("UPDATE produtos SET codigo_barras = NULL WHERE id = ?", [(p_id,) for p_id, _ in pares])
+        conn.executemany("UPDATE produtos SET codigo_barras = ? WHERE id = ?", [(codigo, p_id) for p_id, codigo in pares])
+
+@com_retentativa
+def gravar_lote_produtos(linhas, usuario_id=None, observacao=None):
+    """
+    Grava um lote já validado em uma transação (upsert com executemany).
+    linhas = [(id ou None, nome, qtd, preco_venda, preco_custo, categoria, fornecedor, codigo), ...]
+    Sem id, o código de barras identifica o produto; sem nenhum dos dois, é
+    produto novo. A quantidade é o saldo desejado: vira movimento 'inicial'
+    (novos) ou 'ajuste' pela diferença (existentes).
+    Retorna (inseridos, atualizados, rejeitados), rejeitados = [(índice no lote, motivo), ...].
+    """
+    with transacao() as conn:
+        codigos = [l[7] for l in linhas if l[7]]
+        dono = {}
+        for i in range(0, len(codigos), TAMANHO_LOTE_IN):
+            lote = codigos[i:i + TAMANHO_LOTE_IN]
+            dono.update(conn.execute(SQL_CODIGOS_EM_USO.format(marcadores=','.join('?' * len(lote))), lote).fetchall())
+        ids = [l[0] for l in linhas if l[0] is not None]
+        existentes = set()
+        for i in range(0, len(ids), TAMANHO_LOTE_IN):
+            lote = ids[i:i + TAMANHO_LOTE_IN]
+            existentes.update(r[0] for r in conn.execute(SQL_PRODUTOS_EXISTENTES.format(marcadores=','.join('?' * len(lote))), lote))
+
+        novos, atualizar, rejeitados = [], [], []
+        for indice, l in enumerate(linhas):
+            produto_id = l[0]
+            if produto_id is None:
+                produto_id = dono.get(l[7])
+            elif produto_id not in existentes:
+                rejeitados.append((indice, f"produto {produto_id} não existe"))
+                continue
+            elif l[7] and dono.get(l[7], produto_id) != produto_id:
+                rejeitados.append((indice, f"código '{l[7]}' já pertence ao produto {dono[l[7]]}"))
+                continue
+            (atualizar if produto_id is not None else novos).append((produto_id,) + tuple(l[1:]))
+
+        if atualizar:
+            conn.executemany(SQL_AJUSTAR_PARA, [(l[2], usuario_id, observacao, l[0], l[2]) for l in atualizar])
+            conn.executemany(SQL_ATUALIZAR_PRECOS, [(l[3], l[3], l[4], l[7], l[0]) for l in atualizar])
+            conn.executemany(SQL_ATUALIZAR_TEXTOS, [(l[1], l[5], l[6], l[0], l[1], l[5], l[6]) for l in atualizar])
+
+        if novos:
+            # Dentro da transação de escrita os ids novos são os maiores que o atual, na ordem de inserção
+            maior_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM produtos").fetchone()[0]
+            conn.executemany(SQL_INSERIR_PRODUTO_ZERADO, [(l[1], l[3], l[3], l[4], l[5], l[6], l[7]) for l in novos])
+            ids_novos = [r[0] for r in conn.execute("SELECT id FROM produtos WHERE id > ? ORDER BY id", (maior_id,))]
+            conn.executemany(SQL_INSERIR_MOVIMENTO, [(p_id, 'inicial', l[2], None, usuario_id, observacao)
+                                                     for p_id, l in zip(ids_novos, novos) if l[2]])
+    return len(novos), len(atualizar), rejeitados
+
+def lotes_produtos(tamanho=1000):
+    """Percorre a tabela produtos em lotes por id (uma consulta curta por lote, memória constante)."""
+    apos = 0
+    while True:
+        with conexao() as conn:
+            lote = conn.execute(SQL_PRODUTOS_POR_ID_APOS, (apos, tamanho)).fetchall()
+        if not lote:
+            return
+        yield lote
+        apos = lote[-1][0]
+
+# --- RAZÃO DE ESTOQUE ---
+def registrar_movimento_estoque(produto_id, tipo, quantidade, usuario_id=None, venda_id=None, observacao=None):
+    """
+    Acrescenta um movimento (quantidade com sinal: + entra, - sai); o trigger
+    atualiza produtos.quantidade na mesma transação. Saída maior que o saldo
+    atual (lido dentro da transação) é recusada. Retorna o id do movimento.
+    """
+    with transacao() as conn:
+        produto = conn.execute(SQL_PRODUTO_POR_ID, (produto_id,)).fetchone()
+        if produto is None:
+            raise ValueError(f"Produto ID {produto_id} não encontrado.")
+        if produto[2] + quantidade < 0:
+            raise ValueError(f"Estoque insuficiente: saldo atual de '{produto[1]}' é {produto[2]}, "
+                             f"não dá para retirar {-quantidade}.")
+        return conn.execute(SQL_INSERIR_MOVIMENTO,
+                            (produto_id, tipo, quantidade, venda_id, usuario_id, observacao)).lastrowid
+
+def listar_movimentos_produto(produto_id, limite=200):
+    """Últimos movimentos do produto: (id, data_hora, tipo, qtd, venda_id, usuario, observacao)."""
+    with conexao() as conn:
+        return conn.execute(SQL_MOVIMENTOS_PRODUTO, (produto_id, limite)).fetchall()
+
+def estoque_na_data(dia, produto_id=None):
+    """
+    Saldo no fim do dia local 'AAAA-MM-DD': foto mais próxima antes dele
+    mais os movimentos posteriores a ela. Com produto_id retorna um int;
+    sem, {produto_id: saldo} dos produtos com saldo diferente de zero.
+    Dia anterior ao início do razão lança ValueError (o saldo daquela época
+    não foi registrado, não é zero).
+    """
+    with conexao() as conn:
+        inicio = conn.execute(SQL_INICIO_RAZAO, (dia,)).fetchone()
+        if inicio and inicio[1]:
+            raise ValueError(f"O controle de estoque começa em {inicio[0]}; não há saldo registrado antes disso.")
+        foto = conn.execute(SQL_FOTO_ATE_DIA, (dia,)).fetchone()
+        foto_id, ultimo = foto if foto else (None, 0)
+        if produto_id is not None:
+            base = conn.execute(SQL_SALDO_FOTO_PRODUTO, (foto_id, produto_id)).fetchone() if foto_id else None
+            delta = conn.execute(SQL_DELTA_PRODUTO, (produto_id, ultimo, dia)).fetchone()[0]
+            return (base[0] if base else 0) + delta
+        saldos = dict(conn.execute(SQL_SALDOS_FOTO, (foto_id,)).fetchall()) if foto_id else {}
+        for p_id, delta in conn.execute(SQL_DELTAS, (ultimo, dia)):
+            saldos[p_id] = saldos.get(p_id, 0) + delta
+    return {p_id: qtd for p_id, qtd in saldos.items() if qtd}
+
+def situacao_fotos_estoque():
+    """(data_hora da última foto ou None, movimentos registrados depois dela)."""
+    with conexao() as conn:
+        foto = conn.execute(SQL_ULTIMA_FOTO).fetchone()
+        ultimo = foto[2] if foto else 0
+        qtd = conn.execute(SQL_MOVIMENTOS_DESDE, (ultimo,)).fetchone()[0]
+    return (foto[1] if foto else None), qtd
+
+@com_retentativa
+def tirar_foto_estoque():
+    """Grava o saldo atual de todos os produtos (projeção) com o último movimento incluído. Retorna o id da foto."""
+    with transacao() as conn:
+        ultimo = conn.execute("SELECT COALESCE(MAX(id), 0) FROM estoque_movimentos").fetchone()[0]
+        foto_id = conn.execute("INSERT INTO estoque_fotos (ultimo_movimento_id) VALUES (?)", (ultimo,)).lastrowid
+        conn.execute("""INSERT INTO estoque_fotos_itens (foto_id, produto_id, quantidade)
+                        SELECT ?, id, quantidade FROM produtos WHERE quantidade != 0""", (foto_id,))
+        return foto_id
+
+# --- AJUSTES EM LOTE ---
+def _consultas_ajuste(sql, filtros):
+    """
+    (SQL, parâmetros do WHERE) para cada lote de ids de 'filtros' (chaves de
+    FILTROS_AJUSTE e 'ids'); sem ids, uma consulta só.
+    """
+    condicoes, parametros = [], []
+    for chave, condicao in FILTROS_AJUSTE.items():
+        if filtros.get(chave) is not None:
+            condicoes.append(condicao)
+            parametros.append(filtros[chave])
+    ids = list(filtros.get('ids') or [])
+    if not ids:
+        yield sql.format(onde=" AND ".join(condicoes)), parametros
+        return
+    for i in range(0, len(ids), TAMANHO_LOTE_IN):
+        lote = ids[i:i + TAMANHO_LOTE_IN]
+        onde = " AND ".join(condicoes + [f"id IN ({','.join('?' * len(lote))})"])
+        yield sql.format(onde=onde), parametros + lote
+
+registrar_consulta("ajustes.previa_categoria", next(_consultas_ajuste(SQL_AJUSTE_PREVIA, {'categoria': ''}))[0])
+registrar_consulta("ajustes.previa_fornecedor", next(_consultas_ajuste(SQL_AJUSTE_PREVIA, {'fornecedor': ''}))[0])
+registrar_consulta("ajustes.previa_ids", next(_consultas_ajuste(SQL_AJUSTE_PREVIA, {'ids': [0, 0, 0]}))[0])
+registrar_consulta("ajustes.registrar_itens", next(_consultas_ajuste(SQL_AJUSTE_REGISTRAR, {'categoria': '', 'fornecedor': ''}))[0])
+
+def previa_ajuste_lote(filtros, operacao):
+    """
+    Produtos que o ajuste alteraria, sem gravar nada:
+    [(id, nome, venda, nova_venda, custo, novo_custo, qtd, nova_qtd), ...] por nome.
+    operacao = (fator_venda, soma_venda, fator_custo, soma_custo, fator_qtd, soma_qtd).
+    """
+    linhas = []
+    with conexao() as conn:
+        for sql, parametros in _consultas_ajuste(SQL_AJUSTE_PREVIA, filtros):
+            linhas.extend(conn.execute(sql, list(operacao) + parametros))
+    if filtros.get('ids') and len(filtros['ids']) > TAMANHO_LOTE_IN:
+        linhas.sort(key=lambda l: (l[1], l[0]))
+    return linhas
+
+@com_retentativa
+def aplicar_ajuste_lote(filtros, operacao, descricao, usuario_id=None):
+    """
+    Aplica o ajuste em uma transação: guarda antes/depois de cada produto em
+    ajustes_lote_itens, atualiza os preços e lança a diferença de estoque
+    como movimento 'ajuste'. Retorna (ajuste_id, produtos alterados).
+    """
+    with transacao() as conn:
+        ajuste_id = conn.execute(SQL_INSERIR_AJUSTE, (usuario_id, descricao)).lastrowid
+        for sql, parametros in _consultas_ajuste(SQL_AJUSTE_REGISTRAR, filtros):
+            conn.execute(sql, [ajuste_id] + list(operacao) + parametros)
+        itens, _ = conn.execute(SQL_AJUSTE_CONTAR, (ajuste_id,)).fetchone()
+        if not itens:
+            raise ValueError("Nenhum produto seria alterado por este ajuste.")
+        conn.execute(SQL_AJUSTE_APLICAR_PRECOS, (ajuste_id, ajuste_id))
+        conn.execute(SQL_AJUSTE_MOVIMENTOS, (usuario_id, f"Ajuste em lote nº {ajuste_id}", ajuste_id))
+        conn.execute("UPDATE ajustes_lote SET itens = ? WHERE id = ?", (itens, ajuste_id))
+    return ajuste_id, itens
+
+@com_retentativa
+def desfazer_ajuste_lote(ajuste_id, usuario_id=None):
+    """
+    Desfaz um ajuste em lote. Preços voltam ao valor anterior, exceto os que
+    foram alterados depois do ajuste; o estoque volta por movimento inverso.
+    Retorna (preços restaurados, preços mantidos por alteração posterior, estoques revertidos).
+    """
+    with transacao() as conn:
+        if conn.execute(SQL_DESFAZER_MARCAR, (usuario_id, ajuste_id)).rowcount == 0:
+            raise ValueError(f"Ajuste nº {ajuste_id} não encontrado ou já desfeito.")
+        _, com_preco = conn.execute(SQL_AJUSTE_CONTAR, (ajuste_id,)).fetchone()
+        restaurados = conn.execute(SQL_DESFAZER_PRECOS, (ajuste_id, ajuste_id)).rowcount
+        revertidos = conn.execute(SQL_DESFAZER_MOVIMENTOS,
+                                  (usuario_id, f"Desfaz ajuste em lote nº {ajuste_id}", ajuste_id)).rowcount
+    return restaurados, com_preco - restaurados, revertidos
+
+def listar_ajustes_lote(limite=50):
+    """Últimos ajustes: (id, data_hora, usuario, descricao, itens, desfeito_em ou None)."""
+    with conexao() as conn:
+        return conn.execute(SQL_AJUSTES_RECENTES, (limite,)).fetchall()
+
+def listar_categorias_fornecedores():
+    """(categorias, fornecedores) distintos do catálogo, para as listas de filtro."""
+    with conexao() as conn:
+        return ([r[0] for r in conn.execute(SQL_CATEGORIAS)], [r[0] for r in conn.execute(SQL_FORNECEDORES)])
 
 # --- FUNÇÕES USUÁRIOS ---
 def adicionar_usuario(nome_completo, login, senha_hash, role='funcionario'):
-    conn = conectar()
-    if conn is None: return
     try:
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO usuarios (nome_completo, login, senha_hash, role) VALUES (?, ?, ?, ?)",
-            (nome_completo, login, senha_hash, role)
-        )
-        conn.commit()
+        with transacao() as conn:
+            conn.execute(
+                "INSERT INTO usuarios (nome_completo, login, senha_hash, role) VALUES (?, ?, ?, ?)",
+                (nome_completo, login, senha_hash, role)
+            )
     except Error as e:
         print(f'Erro ao adicionar usuario: {e}')
-    finally:
-        if conn: conn.close()
 
 def buscar_usuario_por_login(login):
-    conn = conectar()
-    if conn is None: return None
     try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM usuarios WHERE login = ?", (login,))
-        return cursor.fetchone()
+        with conexao() as conn:
+            return conn.execute(SQL_USUARIO_POR_LOGIN, (login,)).fetchone()
     except Error as e:
         print(f'Erro ao buscar usuario: {e}')
         return None
-    finally:
-        if conn: conn.close()
+
+def atualizar_senha_usuario(id_usuario, senha_hash):
+    try:
+        with transacao() as conn:
+            conn.execute("UPDATE usuarios SET senha_hash = ? WHERE id = ?", (senha_hash, id_usuario))
+    except Error as e:
+        print(f'Erro ao atualizar senha do usuario: {e}')
 
 def listar_usuarios():
-    conn = conectar()
-    if conn is None: return []
     try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, nome_completo, login, role FROM usuarios ORDER BY nome_completo")
-        return cursor.fetchall()
+        with conexao() as conn:
+            return conn.execute("SELECT id, nome_completo, login, role FROM usuarios ORDER BY nome_completo").fetchall()
     except Error as e:
         print(f'Erro ao listar usuarios: {e}')
         return []
-    finally:
-        if conn: conn.close()
 
 # --- FUNÇÕES VENDAS ---
-def registrar_venda_transacao(usuario_id, total_venda, carrinho, cliente_id=None, valor_frete=0.0, metodo_pagto="Dinheiro", valor_pago=0.0, troco=0.0):
-    conn = conectar()
-    if conn is None: raise Error("Sem conexão")
-    try:
+def _agrupar_quantidades(carrinho):
+    """Soma as quantidades por produto (o mesmo ID pode aparecer em mais de uma linha)."""
+    qtd_por_produto = {}
+    nomes = {}
+    for item in carrinho:
+        qtd_por_produto[item[0]] = qtd_por_produto.get(item[0], 0) + item[2]
+        nomes.setdefault(item[0], item[1])
+    return qtd_por_produto, nomes
+
+def registrar_venda_transacao(usuario_id, total_venda, carrinho, cliente_id=None, valor_frete=0, metodo_pagto="Dinheiro", valor_pago=0, troco=0):
+    """
+    Grava a venda de forma set-based: valida o estoque de todas as linhas com
+    uma única consulta, insere os itens com executemany e baixa o estoque com
+    movimentos 'venda' condicionados ao saldo (quantidade >= ?), que impedem
+    vender além do disponível.
+    Pode ser chamada dentro de uma transacao() externa (ex.: junto do financeiro).
+    Lança ValueError se algum produto não existir ou não tiver estoque.
+    """
+    qtd_por_produto, nomes = _agrupar_quantidades(carrinho)
+    ids = list(qtd_por_produto)
+
+    with transacao() as conn:
         cursor = conn.cursor()
-        conn.execute("BEGIN TRANSACTION;")
+
+        # 1. Validação de todas as linhas em uma única consulta
+        marcadores = ','.join('?' * len(ids))
+        cursor.execute(SQL_ESTOQUE_CARRINHO.format(marcadores=marcadores), ids)
+        estoque = dict(cursor.fetchall())
+        for p_id, qtd in qtd_por_produto.items():
+            if p_id not in estoque:
+                raise ValueError(f"Produto ID {p_id} não encontrado.")
+            if qtd > estoque[p_id]:
+                raise ValueError(f"Estoque de '{nomes[p_id]}' acabou!")
+
+        # 2. Cabeçalho da venda
         status_inicial = 'pendente' if valor_frete > 0 else 'n/a'
         cursor.execute(
             """INSERT INTO vendas 
@@ -350,145 +1012,245 @@ def registrar_venda_transacao(usuario_id, total_venda, carrinho, cliente_id=None
             (usuario_id, total_venda, cliente_id, valor_frete, status_inicial, metodo_pagto, valor_pago, troco)
         )
         venda_id = cursor.lastrowid
-        for item in carrinho:
-            cursor.execute("""
-                INSERT INTO venda_itens (venda_id, produto_id, quantidade, preco_unitario)
-                VALUES (?,?,?,?)""", (venda_id, item[0], item[2], item[3]))
-            cursor.execute("UPDATE produtos SET quantidade = quantidade - ? WHERE id = ?", (item[2], item[0]))
-        conn.commit()
+
+        # 3. Itens e baixa de estoque em lote
+        cursor.executemany("""
+            INSERT INTO venda_itens (venda_id, produto_id, quantidade, preco_unitario)
+            VALUES (?,?,?,?)""", [(venda_id, item[0], item[2], item[3]) for item in carrinho])
+
+        cursor.executemany(
+            SQL_BAIXA_VENDA,
+            [(qtd, venda_id, usuario_id, p_id, qtd) for p_id, qtd in qtd_por_produto.items()]
+        )
+        # Outro terminal pode ter vendido entre a validação e a baixa
+        if cursor.rowcount != len(qtd_por_produto):
+            raise ValueError("Estoque insuficiente: o estoque foi alterado durante a venda.")
+
+        # 4. Comprovante entra na fila junto com a venda (gerado em segundo plano)
+        cursor.execute("INSERT INTO fila_comprovantes (venda_id, terminal) VALUES (?, ?)", (venda_id, terminal_id()))
         return venda_id
-    except Error as e:
-        if conn: conn.rollback()
-        raise e
-    finally:
-        if conn: conn.close()
 
-def listar_vendas_detalhadas():
-    conn = conectar()
-    if conn is None: return []
-    try:
-        cursor = conn.cursor()
-        sql = """SELECT v.id, v.data_hora, u.nome_completo, c.nome_completo, v.total_venda
-            FROM vendas v
-            LEFT JOIN usuarios u ON v.usuario_id = u.id
-            LEFT JOIN clientes c ON v.cliente_id = c.id
-            ORDER BY v.data_hora DESC"""
-        cursor.execute(sql)
-        return cursor.fetchall()
-    except Error as e:
-        print(f'Erro ao listar historico: {e}')
-        return []
-    finally:
-        if conn: conn.close()
+def listar_vendas_pagina(filtros=None, apos=None, limite=100):
+    """
+    Uma página do histórico: (id, data_hora, vendedor, cliente, total, metodo_pagamento),
+    mais recentes primeiro. 'apos' = (data_hora, id) da última linha exibida;
+    'filtros' usa as chaves de FILTROS_VENDAS (None = sem filtro).
+    """
+    sql, parametros = _sql_vendas_pagina(filtros or {}, apos)
+    with conexao() as conn:
+        return conn.execute(sql, parametros + [limite]).fetchall()
 
 def listar_itens_da_venda(venda_id):
-    conn = conectar()
-    if conn is None: return []
     try:
-        cursor = conn.cursor()
-        sql = """SELECT p.nome, vi.quantidade, vi.preco_unitario, (vi.quantidade * vi.preco_unitario) as subtotal
-            FROM venda_itens vi
-            JOIN produtos p ON vi.produto_id = p.id
-            WHERE vi.venda_id = ?"""
-        cursor.execute(sql, (venda_id,))
-        return cursor.fetchall()
+        with conexao() as conn:
+            return conn.execute(SQL_ITENS_DA_VENDA, (venda_id,)).fetchall()
     except Error as e:
         print(f"Erro ao listar itens: {e}")
         return []
-    finally:
-        if conn: conn.close()
+
+def itens_das_vendas(venda_ids):
+    """{venda_id: [(nome, qtd, unit, subtotal), ...]} de várias vendas, em lotes de TAMANHO_LOTE_IN."""
+    venda_ids = list(venda_ids)
+    itens = {}
+    with conexao() as conn:
+        for i in range(0, len(venda_ids), TAMANHO_LOTE_IN):
+            lote = venda_ids[i:i + TAMANHO_LOTE_IN]
+            for item in conn.execute(SQL_ITENS_DAS_VENDAS.format(marcadores=','.join('?' * len(lote))), lote):
+                itens.setdefault(item[0], []).append(item[1:])
+    return itens
+
+# --- FILA DE COMPROVANTES ---
+def dados_comprovante(venda_id):
+    """
+    Retorna (venda, itens) para gerar o comprovante, ou None se a venda não existir.
+    venda = (id, data_hora, cliente, vendedor, total, frete, metodo_pagto, valor_pago, troco)
+    itens = [(produto_id, nome, qtd, preco_unitario, subtotal), ...]
+    """
+    with conexao() as conn:
+        venda = conn.execute(SQL_COMPROVANTE_VENDA, (venda_id,)).fetchone()
+        if venda is None:
+            return None
+        return venda, conn.execute(SQL_ITENS_COMPROVANTE, (venda_id,)).fetchall()
+
+def dados_comprovantes(venda_ids):
+    """
+    Como dados_comprovante(), para várias vendas de uma vez (na ordem de
+    'venda_ids'; as que não existirem ficam de fora). Retorna [(venda, itens), ...].
+    """
+    vendas, itens = {}, {}
+    with conexao() as conn:
+        for i in range(0, len(venda_ids), TAMANHO_LOTE_IN):
+            lote = list(venda_ids[i:i + TAMANHO_LOTE_IN])
+            marcadores = ','.join('?' * len(lote))
+            for v in conn.execute(SQL_COMPROVANTES_VENDAS.format(marcadores=marcadores), lote):
+                vendas[v[0]] = v
+            for item in conn.execute(SQL_ITENS_COMPROVANTES.format(marcadores=marcadores), lote):
+                itens.setdefault(item[0], []).append(item[1:])
+    return [(vendas[v_id], itens.get(v_id, [])) for v_id in venda_ids if v_id in vendas]
+
+def ids_vendas_do_dia(dia):
+    """IDs das vendas do dia (local) 'AAAA-MM-DD', em ordem de horário."""
+    with conexao() as conn:
+        return [linha[0] for linha in conn.execute(SQL_VENDAS_DO_DIA, (dia, dia))]
+
+@com_retentativa
+def reservar_comprovante():
+    """
+    Marca o próximo comprovante pendente deste terminal como 'processando'.
+    Retorna (venda_id, tentativas) ou None.
+    """
+    terminal = terminal_id()
+    with conexao() as conn:
+        if conn.execute(SQL_HA_COMPROVANTE_PENDENTE, (terminal,)).fetchone() is None:
+            return None
+    with transacao() as conn:
+        reservado = conn.execute(SQL_RESERVAR_COMPROVANTE, (terminal,)).fetchall() # fetchall: RETURNING termina antes do COMMIT
+        return reservado[0] if reservado else None
+
+@com_retentativa
+def concluir_comprovante(venda_id, caminho):
+    with transacao() as conn:
+        conn.execute("""UPDATE fila_comprovantes
+                        SET status = 'concluido', caminho = ?, ultimo_erro = NULL, atualizado_em = CURRENT_TIMESTAMP
+                        WHERE venda_id = ?""", (caminho, venda_id))
+
+@com_retentativa
+def falhar_comprovante(venda_id, erro, espera_s=0, definitivo=False):
+    """Devolve o comprovante à fila para nova tentativa daqui a 'espera_s' segundos, ou marca 'erro'."""
+    with transacao() as conn:
+        conn.execute("""UPDATE fila_comprovantes
+                        SET status = ?, ultimo_erro = ?, atualizado_em = CURRENT_TIMESTAMP,
+                            proxima_tentativa = datetime('now', ?)
+                        WHERE venda_id = ?""",
+                     ('erro' if definitivo else 'pendente', str(erro), f'+{int(espera_s)} seconds', venda_id))
+
+@com_retentativa
+def reenfileirar_comprovante(venda_id):
+    """
+    Coloca (de novo) a venda na fila, zerando as tentativas. Usado para
+    reimprimir: o comprovante sai no terminal que pediu.
+    """
+    with transacao() as conn:
+        conn.execute("""INSERT INTO fila_comprovantes (venda_id, terminal) VALUES (?, ?)
+                        ON CONFLICT(venda_id) DO UPDATE SET
+                            status = 'pendente', tentativas = 0, ultimo_erro = NULL, terminal = excluded.terminal,
+                            proxima_tentativa = CURRENT_TIMESTAMP, atualizado_em = CURRENT_TIMESTAMP""",
+                     (venda_id, terminal_id()))
+
+@com_retentativa
+def liberar_comprovantes_presos(minutos):
+    """
+    Volta para 'pendente' o que este terminal deixou 'processando' há mais de
+    'minutos' (programa fechado no meio da geração). Pedidos sem terminal
+    (enfileirados antes da migração 14) passam para este. Retorna quantos foram liberados.
+    """
+    terminal = terminal_id()
+    with transacao() as conn:
+        conn.execute("UPDATE fila_comprovantes SET terminal = ? WHERE terminal IS NULL AND status != 'concluido'", (terminal,))
+        cursor = conn.execute("""UPDATE fila_comprovantes
+                                 SET status = 'pendente', proxima_tentativa = CURRENT_TIMESTAMP
+                                 WHERE terminal = ? AND status = 'processando' AND atualizado_em < datetime('now', ?)""",
+                              (terminal, f'-{int(minutos)} minutes'))
+        return cursor.rowcount
+
+def resumo_fila_comprovantes():
+    """Retorna {'pendente': n, 'processando': n, 'erro': n} (concluídos não entram)."""
+    resumo = {'pendente': 0, 'processando': 0, 'erro': 0}
+    try:
+        with conexao() as conn:
+            resumo.update(conn.execute(SQL_RESUMO_FILA_COMPROVANTES).fetchall())
+    except Error as e:
+        print(f"Erro ao ler fila de comprovantes: {e}")
+    return resumo
+
+def status_comprovante(venda_id):
+    """Retorna (status, caminho, tentativas, ultimo_erro) ou None se a venda não estiver na fila."""
+    with conexao() as conn:
+        return conn.execute("SELECT status, caminho, tentativas, ultimo_erro FROM fila_comprovantes WHERE venda_id = ?",
+                            (venda_id,)).fetchone()
 
 # --- FUNÇÕES CLIENTES ---
 def adicionar_cliente(nome, telefone, email, cpf_cnpj, endereco):
-    conn = conectar()
-    if conn is None: return
     try:
-        cursor = conn.cursor()
-        cursor.execute(
-        """INSERT INTO clientes (nome_completo, telefone, email, cpf_cnpj, endereco)
-           VALUES (?, ?, ?, ?, ?)""", (nome, telefone, email, cpf_cnpj, endereco))
-        conn.commit()
+        with transacao() as conn:
+            conn.execute(
+            """INSERT INTO clientes (nome_completo, telefone, email, cpf_cnpj, endereco)
+               VALUES (?, ?, ?, ?, ?)""", (nome, telefone, email, cpf_cnpj, endereco))
     except Error as e:
         print(f"Erro ao adicionar cliente: {e}")
         raise e
-    finally:
-        if conn: conn.close()
 
 def buscar_cliente_por_cpf(cpf_cnpj):
-    conn = conectar()
-    if conn is None: return None
     try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM clientes WHERE cpf_cnpj = ?", (cpf_cnpj,))
-        return cursor.fetchone()
+        with conexao() as conn:
+            return conn.execute(SQL_CLIENTE_POR_CPF, (cpf_cnpj,)).fetchone()
     except Error as e:
         print(f"Erro ao buscar cliente: {e}")
         return None
-    finally:
-        if conn: conn.close()
+
+def buscar_clientes(termo, limite=LIMITE_BUSCA_CLIENTES):
+    """
+    Primeiros 'limite' clientes para o texto digitado: só números (com ou sem
+    pontuação) = prefixo do CPF/CNPJ; senão, palavras do nome por prefixo e
+    sem acentos ('jo sil' encontra 'João da Silva').
+    """
+    termo = (termo or '').strip()
+    digitos = re.sub(r'[.\-/\s]', '', termo)
+    try:
+        with conexao() as conn:
+            if digitos.isdigit():
+                return conn.execute(SQL_BUSCAR_CLIENTE_CPF, (digitos + '*', limite)).fetchall()
+            consulta = _consulta_fts(termo)
+            if not consulta:
+                return []
+            try:
+                return conn.execute(SQL_BUSCAR_CLIENTE_FTS, (consulta, limite)).fetchall()
+            except sqlite3.OperationalError as e:
+                if 'clientes_fts' not in str(e):
+                    raise
+                return conn.execute(SQL_BUSCAR_CLIENTE_PREFIXO, (termo, termo + '\uffff', limite)).fetchall()
+    except Error as e:
+        print(f"Erro ao buscar clientes: {e}")
+        return []
 
 def listar_clientes():
-    conn = conectar()
-    if conn is None: return []
     try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, nome_completo, telefone, email, cpf_cnpj, endereco FROM clientes ORDER BY nome_completo")
-        return cursor.fetchall()
+        with conexao() as conn:
+            return conn.execute("SELECT id, nome_completo, telefone, email, cpf_cnpj, endereco FROM clientes ORDER BY nome_completo").fetchall()
     except Error as e:
         print(f'Erro ao listar clientes: {e}')
         return []
-    finally:
-        if conn: conn.close()
 
 def atualizar_cliente(id_cliente, nome, telefone, email, cpf_cnpj, endereco):
-    conn = conectar()
-    if conn is None: return
     try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            UPDATE clientes 
-            SET nome_completo = ?, telefone = ?, email = ?, cpf_cnpj = ?, endereco = ?
-            WHERE id = ?
-        """, (nome, telefone, email, cpf_cnpj, endereco, id_cliente))
-        conn.commit()
+        with transacao() as conn:
+            conn.execute("""
+                UPDATE clientes 
+                SET nome_completo = ?, telefone = ?, email = ?, cpf_cnpj = ?, endereco = ?
+                WHERE id = ?
+            """, (nome, telefone, email, cpf_cnpj, endereco, id_cliente))
     except Error as e:
         print(f"Erro ao atualizar cliente: {e}")
         raise e
-    finally:
-        if conn: conn.close()
 
 # --- FUNÇÕES FINANCEIRAS ---
 
 def adicionar_movimentacao_manual(descricao, valor, tipo):
-    conn = conectar()
-    if conn is None: return
     try:
-        cursor = conn.cursor()
-        # categoria_id 1 = Geral (Pode criar lógica de categorias depois)
-        cursor.execute("""
-            INSERT INTO financeiro_movimentacoes (descricao, valor, tipo, categoria_id)
-            VALUES (?, ?, ?, 1)
-        """, (descricao, valor, tipo))
-        conn.commit()
+        with transacao() as conn:
+            # categoria_id 1 = Geral (Pode criar lógica de categorias depois)
+            conn.execute("""
+                INSERT INTO financeiro_movimentacoes (descricao, valor, tipo, categoria_id)
+                VALUES (?, ?, ?, 1)
+            """, (descricao, valor, tipo))
     except Error as e:
         print(f"Erro financeiro: {e}")
         raise e
-    finally:
-        if conn: conn.close()
 
 def listar_movimentacoes():
-    conn = conectar()
-    if conn is None: return []
     try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id, data_lancamento, descricao, valor, tipo 
-            FROM financeiro_movimentacoes 
-            ORDER BY data_lancamento DESC
-        """)
-        return cursor.fetchall()
+        with conexao() as conn:
+            return conn.execute(SQL_LISTAR_MOVIMENTACOES).fetchall()
     except Error as e:
         print(f"Erro listar financeiro: {e}")
-        return []
-    finally:
-        if conn: conn.close()
\ No newline at end of file
+        return []
\ No newline at end of file
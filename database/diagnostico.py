@@ -0,0 +1,99 @@
+"""
+Diagnóstico dos planos de consulta.
+
+Uso:  python -m database.diagnostico
+      python -m database.diagnostico --reconstruir-resumos
+      python -m database.diagnostico --verificar-saldos
+
+Roda EXPLAIN QUERY PLAN em todas as consultas registradas com
+db_manager.registrar_consulta() e aponta as que leem a tabela inteira (passos
+SCAN, com ou sem índice; um SCAN em ordem de índice interrompido por LIMIT não
+conta). Listagens registradas com varredura_esperada=True
+são informadas mas não contam como problema. Sai com código 1 se encontrar
+alguma varredura inesperada, para poder ser usado antes de publicar uma versão.
+
+--reconstruir-resumos recalcula as tabelas de resumo de vendas (analytics) a
+partir do histórico, antes da análise. --verificar-saldos recalcula os totais
+do caixa a partir das movimentações, lista as divergências e corrige as tabelas.
+"""
+import importlib
+import re
+import sys
+
+from database import db_manager
+
+# Módulos que registram consultas ao serem importados
+MODULOS_COM_CONSULTAS = [
+    'core.logic_analytics',
+    'core.logic_financeiro',
+    'core.logic_frota',
+    'core.indicadores',
+]
+
+_RE_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)')
+
+
+def _carregar_consultas():
+    for modulo in MODULOS_COM_CONSULTAS:
+        importlib.import_module(modulo)
+    return dict(db_manager.CONSULTAS_MONITORADAS)
+
+def _varredura_de_tabela(detalhe):
+    """Retorna o nome da tabela se o passo do plano percorrer a tabela inteira."""
+    m = _RE_SCAN.match(detalhe)
+    if not m or 'CONSTANT ROW' in detalhe or 'VIRTUAL TABLE' in detalhe:
+        return None
+    return m.group(1)
+
+def analisar_consultas():
+    """
+    Retorna uma lista de (nome, passos_do_plano, tabelas_varridas, varredura_esperada),
+    uma entrada por consulta registrada.
+    """
+    resultado = []
+    with db_manager.conexao() as conn:
+        for nome, (sql, esperada) in sorted(_carregar_consultas().items()):
+            parametros = (None,) * sql.count('?')
+            plano = [linha[3] for linha in conn.execute(f"EXPLAIN QUERY PLAN {sql}", parametros)]
+            # SCAN em ordem de índice + LIMIT sem ordenação temporária para no LIMIT
+            limitada = 'LIMIT' in sql.upper() and not any('TEMP B-TREE' in p for p in plano)
+            varreduras = [_varredura_de_tabela(p) for p in plano
+                          if not (limitada and 'USING' in p and 'INDEX' in p)]
+            varreduras = [t for t in varreduras if t]
+            resultado.append((nome, plano, varreduras, esperada))
+    return resultado
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    db_manager.inicializar_db()
+    if '--reconstruir-resumos' in argv:
+        from core import logic_analytics
+        logic_analytics.reconstruir_resumos()
+        print("Resumos de vendas reconstruídos.\n")
+    if '--verificar-saldos' in argv:
+        from core import logic_financeiro
+        divergencias = logic_financeiro.verificar_saldos(corrigir=True)
+        for escopo, campo, gravado, recalculado in divergencias:
+            print(f"[saldo] {escopo} {campo}: gravado {gravado}, recalculado {recalculado}")
+        print(f"Saldos do caixa: {len(divergencias)} divergência(s)" + (" corrigida(s).\n" if divergencias else ".\n"))
+    relatorio = analisar_consultas()
+    problemas = 0
+    for nome, plano, varreduras, esperada in relatorio:
+        if not varreduras:
+            marca = "ok"
+        elif esperada:
+            marca = "listagem"
+        else:
+            marca = "ATENÇÃO"
+            problemas += 1
+        print(f"[{marca}] {nome}")
+        for passo in plano:
+            print(f"        {passo}")
+        if varreduras and not esperada:
+            print(f"        -> varredura completa em: {', '.join(varreduras)}")
+    print(f"\n{len(relatorio)} consultas analisadas, {problemas} com varredura completa de tabela.")
+    return 1 if problemas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,727 @@
+"""
+Migrações versionadas do schema.
+
+A versão aplicada fica gravada no próprio arquivo do banco (PRAGMA user_version).
+Cada migração roda uma única vez, em ordem, dentro de uma transação; num start
+com o schema em dia nada além do PRAGMA é lido.
+
+Para alterar o schema, crie uma nova função _mNNN_... e acrescente-a ao final de
+MIGRACOES. Nunca edite uma migração já publicada.
+"""
+import logging
+import sqlite3
+
+
+def _colunas(conn, tabela):
+    return {linha[1] for linha in conn.execute(f"PRAGMA table_info({tabela})")}
+
+def _adicionar_coluna_se_faltar(conn, tabela, coluna, definicao):
+    if coluna not in _colunas(conn, tabela):
+        conn.execute(f"ALTER TABLE {tabela} ADD COLUMN {coluna} {definicao}")
+
+
+# --- MIGRAÇÕES ---
+
+def _m001_schema_base(conn):
+    """Schema original (inclui as colunas que eram adicionadas com ALTER a cada start)."""
+    cursor = conn.cursor()
+
+    # Tabelas Base
+    cursor.execute("""CREATE TABLE IF NOT EXISTS produtos (
+                 id INTEGER PRIMARY KEY AUTOINCREMENT,
+                 nome TEXT NOT NULL,
+                 quantidade INTEGER NOT NULL,
+                 preco REAL NOT NULL,
+                 preco_venda REAL,
+                 preco_custo REAL DEFAULT 0.0,
+                 categoria TEXT,
+                 fornecedor TEXT
+                 );""")
+
+    cursor.execute("""CREATE TABLE IF NOT EXISTS usuarios (
+                 id INTEGER PRIMARY KEY AUTOINCREMENT,
+                 nome_completo TEXT NOT NULL,
+                 login TEXT UNIQUE NOT NULL,
+                 senha_hash TEXT NOT NULL,
+                 role TEXT NOT NULL DEFAULT 'funcionario'
+                 );""")
+
+    cursor.execute("""CREATE TABLE IF NOT EXISTS vendas (
+                 id INTEGER PRIMARY KEY AUTOINCREMENT,
+                 data_hora TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                 usuario_id INTEGER NOT NULL,
+                 total_venda REAL NOT NULL,
+                 cliente_id INTEGER,
+                 valor_frete REAL DEFAULT 0.0,
+                 status_entrega TEXT DEFAULT 'n/a',
+                 veiculo_id INTEGER,
+                 endereco_entrega TEXT,
+                 metodo_pagamento TEXT DEFAULT 'Dinheiro',
+                 valor_pago REAL DEFAULT 0.0,
+                 troco REAL DEFAULT 0.0,
+                 FOREIGN KEY (usuario_id) REFERENCES usuarios(id)
+                 );""")
+
+    cursor.execute("""CREATE TABLE IF NOT EXISTS venda_itens (
+                 id INTEGER PRIMARY KEY AUTOINCREMENT,
+                 venda_id INTEGER NOT NULL,
+                 produto_id INTEGER NOT NULL,
+                 quantidade INTEGER NOT NULL,
+                 preco_unitario REAL NOT NULL,
+                 FOREIGN KEY (venda_id) REFERENCES vendas(id),
+                 FOREIGN KEY (produto_id) REFERENCES produtos(id)
+                 );""")
+
+    cursor.execute("""CREATE TABLE IF NOT EXISTS clientes (
+                 id INTEGER PRIMARY KEY AUTOINCREMENT,
+                 nome_completo TEXT NOT NULL,
+                 telefone TEXT,
+                 email TEXT,
+                 cpf_cnpj TEXT UNIQUE,
+                 endereco TEXT
+                 );""")
+
+    cursor.execute("""CREATE TABLE IF NOT EXISTS financeiro_categorias (
+                 id INTEGER PRIMARY KEY AUTOINCREMENT,
+                 nome TEXT NOT NULL,
+                 tipo TEXT NOT NULL CHECK(tipo IN ('receita', 'despesa'))
+                 );""")
+
+    cursor.execute("""CREATE TABLE IF NOT EXISTS financeiro_movimentacoes (
+                 id INTEGER PRIMARY KEY AUTOINCREMENT,
+                 data_lancamento TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                 descricao TEXT NOT NULL,
+                 valor REAL NOT NULL,
+                 tipo TEXT NOT NULL CHECK(tipo IN ('entrada', 'saida')),
+                 categoria_id INTEGER,
+                 venda_id INTEGER,
+                 usuario_id INTEGER,
+                 FOREIGN KEY (categoria_id) REFERENCES financeiro_categorias(id),
+                 FOREIGN KEY (venda_id) REFERENCES vendas(id),
+                 FOREIGN KEY (usuario_id) REFERENCES usuarios(id)
+                 );""")
+
+    cursor.execute("""CREATE TABLE IF NOT EXISTS veiculos (
+                 id INTEGER PRIMARY KEY AUTOINCREMENT,
+                 placa TEXT UNIQUE NOT NULL,
+                 modelo TEXT NOT NULL,
+                 marca TEXT,
+                 ano INTEGER,
+                 capacidade_kg REAL,
+                 status TEXT DEFAULT 'disponivel' CHECK(status IN ('disponivel', 'em_rota', 'manutencao'))
+                 );""")
+
+    cursor.execute("""CREATE TABLE IF NOT EXISTS manutencoes (
+                 id INTEGER PRIMARY KEY AUTOINCREMENT,
+                 veiculo_id INTEGER NOT NULL,
+                 data_manutencao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                 descricao TEXT NOT NULL,
+                 custo REAL,
+                 km_atual INTEGER,
+                 FOREIGN KEY (veiculo_id) REFERENCES veiculos(id)
+                 );""")
+
+    # --- TABELA DE CONFIGURAÇÃO DA EMPRESA ---
+    cursor.execute("""CREATE TABLE IF NOT EXISTS empresa_config (
+                 id INTEGER PRIMARY KEY CHECK (id = 1),
+                 nome_fantasia TEXT,
+                 endereco_base TEXT,
+                 telefone TEXT
+                 );""")
+
+    # Cria a linha padrão se não existir
+    cursor.execute("INSERT OR IGNORE INTO empresa_config (id, nome_fantasia, endereco_base) VALUES (1, 'Minha Empresa', '')")
+
+    # Bancos antigos, criados antes destas colunas existirem
+    colunas_legadas = [
+        ("produtos", "preco_custo", "REAL DEFAULT 0.0"),
+        ("produtos", "categoria", "TEXT"),
+        ("produtos", "fornecedor", "TEXT"),
+        ("vendas", "cliente_id", "INTEGER"),
+        ("vendas", "valor_frete", "REAL DEFAULT 0.0"),
+        ("vendas", "status_entrega", "TEXT DEFAULT 'n/a'"),
+        ("vendas", "veiculo_id", "INTEGER"),
+        ("vendas", "metodo_pagamento", "TEXT DEFAULT 'Dinheiro'"),
+        ("vendas", "valor_pago", "REAL DEFAULT 0.0"),
+        ("vendas", "troco", "REAL DEFAULT 0.0"),
+    ]
+    for tabela, coluna, definicao in colunas_legadas:
+        _adicionar_coluna_se_faltar(conn, tabela, coluna, definicao)
+
+    # Vendas com frete gravadas antes do controle de entregas
+    cursor.execute("UPDATE vendas SET status_entrega = 'pendente' WHERE valor_frete > 0 AND status_entrega = 'n/a'")
+
+_INDICES_CONSULTAS = [
+    # Listagem do estoque (ORDER BY nome)
+    "CREATE INDEX IF NOT EXISTS idx_produtos_nome ON produtos(nome)",
+    # Analytics por período e histórico ordenado por data (cobre SUM(total_venda))
+    "CREATE INDEX IF NOT EXISTS idx_vendas_data_hora ON vendas(data_hora, total_venda)",
+    # Entregas pendentes (frota)
+    "CREATE INDEX IF NOT EXISTS idx_vendas_entrega ON vendas(status_entrega, valor_frete)",
+    # Itens de uma venda (histórico) e ranking de produtos (cobre SUM(quantidade))
+    "CREATE INDEX IF NOT EXISTS idx_venda_itens_venda ON venda_itens(venda_id)",
+    "CREATE INDEX IF NOT EXISTS idx_venda_itens_produto ON venda_itens(produto_id, quantidade)",
+    # Saldo por tipo (cobre SUM(valor)) e extrato ordenado por data
+    "CREATE INDEX IF NOT EXISTS idx_fin_mov_tipo ON financeiro_movimentacoes(tipo, valor)",
+    "CREATE INDEX IF NOT EXISTS idx_fin_mov_data ON financeiro_movimentacoes(data_lancamento)",
+]
+
+def _m002_indices_consultas(conn):
+    """Índices para os caminhos quentes (histórico, analytics, frota e caixa)."""
+    for sql in _INDICES_CONSULTAS:
+        conn.execute(sql)
+    conn.execute("ANALYZE")
+
+_TRIGGERS_BUSCA_PRODUTOS = [
+    """CREATE TRIGGER IF NOT EXISTS produtos_fts_ai AFTER INSERT ON produtos BEGIN
+       INSERT INTO produtos_fts(rowid, nome, categoria, fornecedor)
+       VALUES (new.id, new.nome, new.categoria, new.fornecedor);
+       END;""",
+    """CREATE TRIGGER IF NOT EXISTS produtos_fts_ad AFTER DELETE ON produtos BEGIN
+       INSERT INTO produtos_fts(produtos_fts, rowid, nome, categoria, fornecedor)
+       VALUES ('delete', old.id, old.nome, old.categoria, old.fornecedor);
+       END;""",
+    # Só reindexa quando muda texto (baixa de estoque não toca o índice)
+    """CREATE TRIGGER IF NOT EXISTS produtos_fts_au AFTER UPDATE OF nome, categoria, fornecedor ON produtos BEGIN
+       INSERT INTO produtos_fts(produtos_fts, rowid, nome, categoria, fornecedor)
+       VALUES ('delete', old.id, old.nome, old.categoria, old.fornecedor);
+       INSERT INTO produtos_fts(rowid, nome, categoria, fornecedor)
+       VALUES (new.id, new.nome, new.categoria, new.fornecedor);
+       END;""",
+]
+
+def _m003_busca_textual_produtos(conn):
+    """Índice FTS5 de produtos (nome, categoria, fornecedor) mantido por triggers."""
+    try:
+        conn.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS produtos_fts USING fts5(
+                     nome, categoria, fornecedor,
+                     content='produtos', content_rowid='id',
+                     tokenize='unicode61 remove_diacritics 2',
+                     prefix='2 3'
+                     );""")
+    except sqlite3.OperationalError as e:
+        # SQLite compilado sem FTS5: a busca continua funcionando com LIKE
+        logging.warning(f"FTS5 indisponível, busca de produtos ficará sem índice textual: {e}")
+        return
+
+    for sql in _TRIGGERS_BUSCA_PRODUTOS:
+        conn.execute(sql)
+    conn.execute("INSERT INTO produtos_fts(produtos_fts) VALUES ('rebuild')")
+
+def _m004_resumos_vendas(conn):
+    """Resumos de vendas por dia, produto/dia e pagamento/dia, mantidos por triggers."""
+    conn.execute("""CREATE TABLE IF NOT EXISTS vendas_resumo_dia (
+                 dia TEXT PRIMARY KEY,
+                 qtd_vendas INTEGER NOT NULL DEFAULT 0,
+                 total REAL NOT NULL DEFAULT 0
+                 ) WITHOUT ROWID;""")
+    conn.execute("""CREATE TABLE IF NOT EXISTS vendas_resumo_pagamento_dia (
+                 dia TEXT NOT NULL,
+                 metodo_pagamento TEXT NOT NULL,
+                 qtd_vendas INTEGER NOT NULL DEFAULT 0,
+                 total REAL NOT NULL DEFAULT 0,
+                 PRIMARY KEY (dia, metodo_pagamento)
+                 ) WITHOUT ROWID;""")
+    conn.execute("""CREATE TABLE IF NOT EXISTS vendas_resumo_produto_dia (
+                 dia TEXT NOT NULL,
+                 produto_id INTEGER NOT NULL,
+                 quantidade INTEGER NOT NULL DEFAULT 0,
+                 total REAL NOT NULL DEFAULT 0,
+                 PRIMARY KEY (dia, produto_id)
+                 ) WITHOUT ROWID;""")
+    # Acumulado do produto desde sempre (ranking sem somar todos os dias)
+    conn.execute("""CREATE TABLE IF NOT EXISTS vendas_resumo_produto (
+                 produto_id INTEGER PRIMARY KEY,
+                 quantidade INTEGER NOT NULL DEFAULT 0,
+                 total REAL NOT NULL DEFAULT 0
+                 );""")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_resumo_produto_qtd ON vendas_resumo_produto(quantidade)")
+
+    for sql in _TRIGGERS_RESUMOS_VENDAS:
+        conn.execute(sql)
+    reconstruir_resumos_vendas(conn)
+
+
+# --- RESUMOS DE VENDAS ---
+# Cada venda/item soma (sinal +1) ou subtrai (sinal -1) sua parte nos resumos.
+
+def _sql_resumo_venda(ref, sinal):
+    return f"""
+        INSERT INTO vendas_resumo_dia (dia, qtd_vendas, total)
+        VALUES (date({ref}.data_hora), {sinal}, {sinal} * {ref}.total_venda)
+        ON CONFLICT(dia) DO UPDATE SET qtd_vendas = qtd_vendas + excluded.qtd_vendas,
+                                       total = total + excluded.total;
+        INSERT INTO vendas_resumo_pagamento_dia (dia, metodo_pagamento, qtd_vendas, total)
+        VALUES (date({ref}.data_hora), COALESCE({ref}.metodo_pagamento, 'Dinheiro'), {sinal}, {sinal} * {ref}.total_venda)
+        ON CONFLICT(dia, metodo_pagamento) DO UPDATE SET qtd_vendas = qtd_vendas + excluded.qtd_vendas,
+                                                         total = total + excluded.total;"""
+
+def _sql_resumo_item(ref, sinal):
+    return f"""
+        INSERT INTO vendas_resumo_produto_dia (dia, produto_id, quantidade, total)
+        VALUES (COALESCE((SELECT date(data_hora) FROM vendas WHERE id = {ref}.venda_id), date('now')), {ref}.produto_id,
+                {sinal} * {ref}.quantidade, {sinal} * {ref}.quantidade * {ref}.preco_unitario)
+        ON CONFLICT(dia, produto_id) DO UPDATE SET quantidade = quantidade + excluded.quantidade,
+                                                   total = total + excluded.total;
+        INSERT INTO vendas_resumo_produto (produto_id, quantidade, total)
+        VALUES ({ref}.produto_id, {sinal} * {ref}.quantidade, {sinal} * {ref}.quantidade * {ref}.preco_unitario)
+        ON CONFLICT(produto_id) DO UPDATE SET quantidade = quantidade + excluded.quantidade,
+                                              total = total + excluded.total;"""
+
+_TRIGGERS_RESUMOS_VENDAS = [
+    f"CREATE TRIGGER IF NOT EXISTS vendas_resumo_ai AFTER INSERT ON vendas BEGIN {_sql_resumo_venda('new', 1)} END;",
+    f"CREATE TRIGGER IF NOT EXISTS vendas_resumo_ad AFTER DELETE ON vendas BEGIN {_sql_resumo_venda('old', -1)} END;",
+    f"""CREATE TRIGGER IF NOT EXISTS vendas_resumo_au AFTER UPDATE OF data_hora, total_venda, metodo_pagamento ON vendas
+        BEGIN {_sql_resumo_venda('old', -1)} {_sql_resumo_venda('new', 1)} END;""",
+    f"CREATE TRIGGER IF NOT EXISTS venda_itens_resumo_ai AFTER INSERT ON venda_itens BEGIN {_sql_resumo_item('new', 1)} END;",
+    f"CREATE TRIGGER IF NOT EXISTS venda_itens_resumo_ad AFTER DELETE ON venda_itens BEGIN {_sql_resumo_item('old', -1)} END;",
+    f"""CREATE TRIGGER IF NOT EXISTS venda_itens_resumo_au AFTER UPDATE OF venda_id, produto_id, quantidade, preco_unitario ON venda_itens
+        BEGIN {_sql_resumo_item('old', -1)} {_sql_resumo_item('new', 1)} END;""",
+]
+
+def reconstruir_resumos_vendas(conn):
+    """
+    Recalcula os resumos de vendas a partir de vendas/venda_itens.
+    Deve rodar dentro de uma transação (a migração 4 e
+    logic_analytics.reconstruir_resumos() já cuidam disso).
+    """
+    for tabela in ("vendas_resumo_dia", "vendas_resumo_pagamento_dia",
+                   "vendas_resumo_produto_dia", "vendas_resumo_produto"):
+        conn.execute(f"DELETE FROM {tabela}")
+    conn.execute("""INSERT INTO vendas_resumo_dia (dia, qtd_vendas, total)
+                 SELECT date(data_hora), COUNT(*), SUM(total_venda) FROM vendas GROUP BY 1""")
+    conn.execute("""INSERT INTO vendas_resumo_pagamento_dia (dia, metodo_pagamento, qtd_vendas, total)
+                 SELECT date(data_hora), COALESCE(metodo_pagamento, 'Dinheiro'), COUNT(*), SUM(total_venda)
+                 FROM vendas GROUP BY 1, 2""")
+    conn.execute("""INSERT INTO vendas_resumo_produto_dia (dia, produto_id, quantidade, total)
+                 SELECT date(v.data_hora), vi.produto_id, SUM(vi.quantidade), SUM(vi.quantidade * vi.preco_unitario)
+                 FROM venda_itens vi JOIN vendas v ON v.id = vi.venda_id GROUP BY 1, 2""")
+    conn.execute("""INSERT INTO vendas_resumo_produto (produto_id, quantidade, total)
+                 SELECT produto_id, SUM(quantidade), SUM(quantidade * preco_unitario)
+                 FROM venda_itens GROUP BY produto_id""")
+
+def _m005_saldos_financeiro(conn):
+    """Totais do caixa (geral e por dia), mantidos por triggers em financeiro_movimentacoes."""
+    conn.execute("""CREATE TABLE IF NOT EXISTS financeiro_saldo (
+                 id INTEGER PRIMARY KEY CHECK (id = 1),
+                 entradas REAL NOT NULL DEFAULT 0,
+                 saidas REAL NOT NULL DEFAULT 0,
+                 qtd_movimentacoes INTEGER NOT NULL DEFAULT 0
+                 );""")
+    conn.execute("""CREATE TABLE IF NOT EXISTS financeiro_saldo_dia (
+                 dia TEXT PRIMARY KEY,
+                 entradas REAL NOT NULL DEFAULT 0,
+                 saidas REAL NOT NULL DEFAULT 0,
+                 qtd_movimentacoes INTEGER NOT NULL DEFAULT 0
+                 ) WITHOUT ROWID;""")
+
+    for sql in _TRIGGERS_SALDOS_FINANCEIRO:
+        conn.execute(sql)
+    reconstruir_saldos_financeiro(conn)
+
+
+# --- SALDOS DO FINANCEIRO ---
+
+def _sql_saldo_movimentacao(ref, sinal):
+    entrada = f"CASE WHEN {ref}.tipo = 'entrada' THEN {sinal} * {ref}.valor ELSE 0 END"
+    saida = f"CASE WHEN {ref}.tipo = 'saida' THEN {sinal} * {ref}.valor ELSE 0 END"
+    return f"""
+        UPDATE financeiro_saldo SET entradas = entradas + {entrada}, saidas = saidas + {saida},
+                                    qtd_movimentacoes = qtd_movimentacoes + {sinal}
+        WHERE id = 1;
+        INSERT INTO financeiro_saldo_dia (dia, entradas, saidas, qtd_movimentacoes)
+        VALUES (date({ref}.data_lancamento), {entrada}, {saida}, {sinal})
+        ON CONFLICT(dia) DO UPDATE SET entradas = entradas + excluded.entradas,
+                                       saidas = saidas + excluded.saidas,
+                                       qtd_movimentacoes = qtd_movimentacoes + excluded.qtd_movimentacoes;"""
+
+_TRIGGERS_SALDOS_FINANCEIRO = [
+    f"CREATE TRIGGER IF NOT EXISTS fin_saldo_ai AFTER INSERT ON financeiro_movimentacoes BEGIN {_sql_saldo_movimentacao('new', 1)} END;",
+    f"CREATE TRIGGER IF NOT EXISTS fin_saldo_ad AFTER DELETE ON financeiro_movimentacoes BEGIN {_sql_saldo_movimentacao('old', -1)} END;",
+    f"""CREATE TRIGGER IF NOT EXISTS fin_saldo_au AFTER UPDATE OF valor, tipo, data_lancamento ON financeiro_movimentacoes
+        BEGIN {_sql_saldo_movimentacao('old', -1)} {_sql_saldo_movimentacao('new', 1)} END;""",
+]
+
+SQL_SALDOS_RECALCULADOS_DIA = """
+    SELECT date(data_lancamento),
+           SUM(CASE WHEN tipo = 'entrada' THEN valor ELSE 0 END),
+           SUM(CASE WHEN tipo = 'saida' THEN valor ELSE 0 END),
+           COUNT(*)
+    FROM financeiro_movimentacoes GROUP BY 1
+"""
+
+def reconstruir_saldos_financeiro(conn):
+    """Recalcula financeiro_saldo e financeiro_saldo_dia do zero (dentro de uma transação)."""
+    conn.execute("DELETE FROM financeiro_saldo_dia")
+    conn.execute(f"INSERT INTO financeiro_saldo_dia (dia, entradas, saidas, qtd_movimentacoes) {SQL_SALDOS_RECALCULADOS_DIA}")
+    conn.execute("DELETE FROM financeiro_saldo")
+    conn.execute("""INSERT INTO financeiro_saldo (id, entradas, saidas, qtd_movimentacoes)
+                 SELECT 1, COALESCE(SUM(entradas), 0), COALESCE(SUM(saidas), 0), COALESCE(SUM(qtd_movimentacoes), 0)
+                 FROM financeiro_saldo_dia""")
+
+# --- DINHEIRO EM CENTAVOS ---
+# Schema das tabelas com valores em dinheiro depois da migração 6 (INTEGER, centavos).
+_TABELAS_EM_CENTAVOS = {
+    'produtos': ("""(
+                 id INTEGER PRIMARY KEY AUTOINCREMENT,
+                 nome TEXT NOT NULL,
+                 quantidade INTEGER NOT NULL,
+                 preco INTEGER NOT NULL,
+                 preco_venda INTEGER,
+                 preco_custo INTEGER DEFAULT 0,
+                 categoria TEXT,
+                 fornecedor TEXT
+                 )""", ('preco', 'preco_venda', 'preco_custo')),
+    'vendas': ("""(
+                 id INTEGER PRIMARY KEY AUTOINCREMENT,
+                 data_hora TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                 usuario_id INTEGER NOT NULL,
+                 total_venda INTEGER NOT NULL,
+                 cliente_id INTEGER,
+                 valor_frete INTEGER DEFAULT 0,
+                 status_entrega TEXT DEFAULT 'n/a',
+                 veiculo_id INTEGER,
+                 endereco_entrega TEXT,
+                 metodo_pagamento TEXT DEFAULT 'Dinheiro',
+                 valor_pago INTEGER DEFAULT 0,
+                 troco INTEGER DEFAULT 0,
+                 FOREIGN KEY (usuario_id) REFERENCES usuarios(id)
+                 )""", ('total_venda', 'valor_frete', 'valor_pago', 'troco')),
+    'venda_itens': ("""(
+                 id INTEGER PRIMARY KEY AUTOINCREMENT,
+                 venda_id INTEGER NOT NULL,
+                 produto_id INTEGER NOT NULL,
+                 quantidade INTEGER NOT NULL,
+                 preco_unitario INTEGER NOT NULL,
+                 FOREIGN KEY (venda_id) REFERENCES vendas(id),
+                 FOREIGN KEY (produto_id) REFERENCES produtos(id)
+                 )""", ('preco_unitario',)),
+    'financeiro_movimentacoes': ("""(
+                 id INTEGER PRIMARY KEY AUTOINCREMENT,
+                 data_lancamento TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                 descricao TEXT NOT NULL,
+                 valor INTEGER NOT NULL,
+                 tipo TEXT NOT NULL CHECK(tipo IN ('entrada', 'saida')),
+                 categoria_id INTEGER,
+                 venda_id INTEGER,
+                 usuario_id INTEGER,
+                 FOREIGN KEY (categoria_id) REFERENCES financeiro_categorias(id),
+                 FOREIGN KEY (venda_id) REFERENCES vendas(id),
+                 FOREIGN KEY (usuario_id) REFERENCES usuarios(id)
+                 )""", ('valor',)),
+    'manutencoes': ("""(
+                 id INTEGER PRIMARY KEY AUTOINCREMENT,
+                 veiculo_id INTEGER NOT NULL,
+                 data_manutencao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                 descricao TEXT NOT NULL,
+                 custo INTEGER,
+                 km_atual INTEGER,
+                 FOREIGN KEY (veiculo_id) REFERENCES veiculos(id)
+                 )""", ('custo',)),
+}
+
+# Tabelas derivadas (resumos e saldos): recriadas com INTEGER e recalculadas
+_DERIVADAS_EM_CENTAVOS = {
+    'vendas_resumo_dia': """(
+                 dia TEXT PRIMARY KEY,
+                 qtd_vendas INTEGER NOT NULL DEFAULT 0,
+                 total INTEGER NOT NULL DEFAULT 0
+                 ) WITHOUT ROWID""",
+    'vendas_resumo_pagamento_dia': """(
+                 dia TEXT NOT NULL,
+                 metodo_pagamento TEXT NOT NULL,
+                 qtd_vendas INTEGER NOT NULL DEFAULT 0,
+                 total INTEGER NOT NULL DEFAULT 0,
+                 PRIMARY KEY (dia, metodo_pagamento)
+                 ) WITHOUT ROWID""",
+    'vendas_resumo_produto_dia': """(
+                 dia TEXT NOT NULL,
+                 produto_id INTEGER NOT NULL,
+                 quantidade INTEGER NOT NULL DEFAULT 0,
+                 total INTEGER NOT NULL DEFAULT 0,
+                 PRIMARY KEY (dia, produto_id)
+                 ) WITHOUT ROWID""",
+    'vendas_resumo_produto': """(
+                 produto_id INTEGER PRIMARY KEY,
+                 quantidade INTEGER NOT NULL DEFAULT 0,
+                 total INTEGER NOT NULL DEFAULT 0
+                 )""",
+    'financeiro_saldo': """(
+                 id INTEGER PRIMARY KEY CHECK (id = 1),
+                 entradas INTEGER NOT NULL DEFAULT 0,
+                 saidas INTEGER NOT NULL DEFAULT 0,
+                 qtd_movimentacoes INTEGER NOT NULL DEFAULT 0
+                 )""",
+    'financeiro_saldo_dia': """(
+                 dia TEXT PRIMARY KEY,
+                 entradas INTEGER NOT NULL DEFAULT 0,
+                 saidas INTEGER NOT NULL DEFAULT 0,
+                 qtd_movimentacoes INTEGER NOT NULL DEFAULT 0
+                 ) WITHOUT ROWID""",
+}
+
+def _recriar_em_centavos(conn, tabela, definicao, colunas_dinheiro):
+    """Recria a tabela com o novo schema, copiando os valores em reais como centavos."""
+    colunas = [linha[1] for linha in conn.execute(f"PRAGMA table_info({tabela})")]
+    expressoes = [f"CAST(ROUND({c} * 100) AS INTEGER)" if c in colunas_dinheiro else c for c in colunas]
+    sequencia = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (tabela,)).fetchone()
+
+    conn.execute(f"CREATE TABLE {tabela}_centavos {definicao}")
+    conn.execute(f"INSERT INTO {tabela}_centavos ({', '.join(colunas)}) SELECT {', '.join(expressoes)} FROM {tabela}")
+    conn.execute(f"DROP TABLE {tabela}")
+    conn.execute(f"ALTER TABLE {tabela}_centavos RENAME TO {tabela}")
+    # AUTOINCREMENT: não reaproveita IDs de registros já excluídos
+    if sequencia:
+        conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?", (sequencia[0], tabela))
+
+def _m006_valores_em_centavos(conn):
+    """Dinheiro passa de REAL (reais) para INTEGER (centavos), sem erro de arredondamento."""
+    # Triggers antes de tudo: um trigger de venda_itens cita 'vendas', e o
+    # RENAME falha se a tabela citada estiver momentaneamente ausente
+    marcadores = ', '.join('?' * len(_TABELAS_EM_CENTAVOS))
+    triggers = conn.execute(f"SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name IN ({marcadores})",
+                            tuple(_TABELAS_EM_CENTAVOS)).fetchall()
+    for (nome,) in triggers:
+        conn.execute(f"DROP TRIGGER {nome}")
+
+    for tabela, (definicao, colunas_dinheiro) in _TABELAS_EM_CENTAVOS.items():
+        _recriar_em_centavos(conn, tabela, definicao, colunas_dinheiro)
+
+    for tabela, definicao in _DERIVADAS_EM_CENTAVOS.items():
+        conn.execute(f"DROP TABLE IF EXISTS {tabela}")
+        conn.execute(f"CREATE TABLE {tabela} {definicao}")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_resumo_produto_qtd ON vendas_resumo_produto(quantidade)")
+
+    # DROP TABLE levou junto os índices das tabelas recriadas
+    for sql in _INDICES_CONSULTAS + _TRIGGERS_RESUMOS_VENDAS + _TRIGGERS_SALDOS_FINANCEIRO:
+        conn.execute(sql)
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'produtos_fts'").fetchone():
+        for sql in _TRIGGERS_BUSCA_PRODUTOS:
+            conn.execute(sql)
+
+    reconstruir_resumos_vendas(conn)
+    reconstruir_saldos_financeiro(conn)
+    conn.execute("ANALYZE")
+
+def _m007_fila_comprovantes(conn):
+    """Fila persistente de comprovantes: a venda entra aqui e o PDF é gerado em segundo plano."""
+    conn.execute("""CREATE TABLE IF NOT EXISTS fila_comprovantes (
+                 venda_id INTEGER PRIMARY KEY,
+                 status TEXT NOT NULL DEFAULT 'pendente'
+                     CHECK(status IN ('pendente', 'processando', 'concluido', 'erro')),
+                 tentativas INTEGER NOT NULL DEFAULT 0,
+                 proxima_tentativa TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                 caminho TEXT,
+                 ultimo_erro TEXT,
+                 criado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                 atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                 FOREIGN KEY (venda_id) REFERENCES vendas(id)
+                 );""")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_fila_comprovantes_status ON fila_comprovantes(status, proxima_tentativa)")
+
+def _m008_codigo_barras(conn):
+    """Código de barras (EAN) / SKU do produto: único quando preenchido, busca por índice no PDV."""
+    conn.execute("ALTER TABLE produtos ADD COLUMN codigo_barras TEXT")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_produtos_codigo_barras ON produtos(codigo_barras) "
+                 "WHERE codigo_barras IS NOT NULL")
+
+_TRIGGERS_BUSCA_CLIENTES = [
+    """CREATE TRIGGER IF NOT EXISTS clientes_fts_ai AFTER INSERT ON clientes BEGIN
+       INSERT INTO clientes_fts(rowid, nome_completo) VALUES (new.id, new.nome_completo);
+       END;""",
+    """CREATE TRIGGER IF NOT EXISTS clientes_fts_ad AFTER DELETE ON clientes BEGIN
+       INSERT INTO clientes_fts(clientes_fts, rowid, nome_completo) VALUES ('delete', old.id, old.nome_completo);
+       END;""",
+    """CREATE TRIGGER IF NOT EXISTS clientes_fts_au AFTER UPDATE OF nome_completo ON clientes BEGIN
+       INSERT INTO clientes_fts(clientes_fts, rowid, nome_completo) VALUES ('delete', old.id, old.nome_completo);
+       INSERT INTO clientes_fts(rowid, nome_completo) VALUES (new.id, new.nome_completo);
+       END;""",
+]
+
+def _m009_busca_clientes(conn):
+    """Busca de clientes por prefixo: CPF/CNPJ só com dígitos (coluna gerada + índice) e FTS5 do nome."""
+    conn.execute("""ALTER TABLE clientes ADD COLUMN cpf_cnpj_digitos TEXT GENERATED ALWAYS AS (
+                 replace(replace(replace(replace(cpf_cnpj, '.', ''), '-', ''), '/', ''), ' ', '')
+                 ) VIRTUAL""")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_clientes_cpf_digitos ON clientes(cpf_cnpj_digitos)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_clientes_nome ON clientes(nome_completo COLLATE NOCASE)")
+    try:
+        conn.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS clientes_fts USING fts5(
+                     nome_completo,
+                     content='clientes', content_rowid='id',
+                     tokenize='unicode61 remove_diacritics 2',
+                     prefix='2 3'
+                     );""")
+    except sqlite3.OperationalError as e:
+        # Sem FTS5 a busca por nome usa o índice NOCASE (prefixo do nome completo)
+        logging.warning(f"FTS5 indisponível, busca de clientes ficará só por prefixo do nome: {e}")
+        return
+
+    for sql in _TRIGGERS_BUSCA_CLIENTES:
+        conn.execute(sql)
+    conn.execute("INSERT INTO clientes_fts(clientes_fts) VALUES ('rebuild')")
+
+def _m010_indice_estoque_baixo(conn):
+    """Alerta de estoque baixo do Dashboard: quantidade < limite pelo índice, sem varrer o catálogo."""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_produtos_quantidade ON produtos(quantidade)")
+
+def _m011_indices_historico(conn):
+    """
+    Histórico paginado por (data_hora, id) decrescente: o id (rowid) já vem
+    no fim de cada índice, então a ordem sai do índice mesmo com filtro de
+    vendedor, cliente ou forma de pagamento.
+    """
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_vendas_historico ON vendas(data_hora)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_vendas_usuario_data ON vendas(usuario_id, data_hora)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_vendas_cliente_data ON vendas(cliente_id, data_hora)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_vendas_pagamento_data ON vendas(metodo_pagamento, data_hora)")
+    conn.execute("ANALYZE vendas")
+
+# --- RAZÃO DE ESTOQUE ---
+# produtos.quantidade é uma projeção: só muda por um movimento inserido aqui.
+TIPOS_MOVIMENTO_ESTOQUE = ('inicial', 'venda', 'ajuste', 'entrada', 'devolucao')
+
+_TRIGGERS_ESTOQUE_MOVIMENTOS = [
+    """CREATE TRIGGER IF NOT EXISTS estoque_mov_projecao AFTER INSERT ON estoque_movimentos BEGIN
+       UPDATE produtos SET quantidade = quantidade + new.quantidade WHERE id = new.produto_id;
+       END;""",
+    # Somente inclusão: correção é um novo movimento (ajuste), nunca edição
+    """CREATE TRIGGER IF NOT EXISTS estoque_mov_sem_update BEFORE UPDATE ON estoque_movimentos BEGIN
+       SELECT RAISE(ABORT, 'estoque_movimentos é somente inclusão');
+       END;""",
+    """CREATE TRIGGER IF NOT EXISTS estoque_mov_sem_delete BEFORE DELETE ON estoque_movimentos BEGIN
+       SELECT RAISE(ABORT, 'estoque_movimentos é somente inclusão');
+       END;""",
+]
+
+def _m012_razao_estoque(conn):
+    """
+    Movimentos de estoque (somente inclusão) e fotos periódicas do saldo.
+    O estoque atual vira o saldo de abertura ('inicial') de cada produto.
+    """
+    tipos = ', '.join(f"'{t}'" for t in TIPOS_MOVIMENTO_ESTOQUE)
+    conn.execute(f"""CREATE TABLE IF NOT EXISTS estoque_movimentos (
+                 id INTEGER PRIMARY KEY AUTOINCREMENT,
+                 produto_id INTEGER NOT NULL,
+                 data_hora TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                 tipo TEXT NOT NULL CHECK(tipo IN ({tipos})),
+                 quantidade INTEGER NOT NULL,
+                 venda_id INTEGER,
+                 usuario_id INTEGER,
+                 observacao TEXT
+                 );""")
+    # Saldo na data: movimentos do produto depois da foto (id > ultimo_movimento_id)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_estoque_mov_produto ON estoque_movimentos(produto_id, id, data_hora, quantidade)")
+
+    conn.execute("""CREATE TABLE IF NOT EXISTS estoque_fotos (
+                 id INTEGER PRIMARY KEY AUTOINCREMENT,
+                 data_hora TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                 ultimo_movimento_id INTEGER NOT NULL
+                 );""")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_estoque_fotos_data ON estoque_fotos(data_hora)")
+    conn.execute("""CREATE TABLE IF NOT EXISTS estoque_fotos_itens (
+                 foto_id INTEGER NOT NULL,
+                 produto_id INTEGER NOT NULL,
+                 quantidade INTEGER NOT NULL,
+                 PRIMARY KEY (foto_id, produto_id)
+                 ) WITHOUT ROWID;""")
+
+    # Saldo de abertura antes dos triggers (o estoque já está em produtos.quantidade).
+    # Fica com a data da migração: estoque_na_data recusa dias anteriores a ele.
+    conn.execute("""INSERT INTO estoque_movimentos (produto_id, tipo, quantidade, observacao)
+                    SELECT id, 'inicial', quantidade, 'Saldo na criação do razão de estoque'
+                    FROM produtos WHERE quantidade != 0""")
+    for sql in _TRIGGERS_ESTOQUE_MOVIMENTOS:
+        conn.execute(sql)
+
+def _m013_ajustes_em_lote(conn):
+    """
+    Ajustes de preço/estoque em lote: cada aplicação guarda os valores de antes
+    e depois de cada produto alterado, para poder ser desfeita.
+    """
+    conn.execute("""CREATE TABLE IF NOT EXISTS ajustes_lote (
+                 id INTEGER PRIMARY KEY AUTOINCREMENT,
+                 data_hora TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                 usuario_id INTEGER,
+                 descricao TEXT NOT NULL,
+                 itens INTEGER NOT NULL DEFAULT 0,
+                 desfeito_em TIMESTAMP,
+                 desfeito_por INTEGER
+                 );""")
+    conn.execute("""CREATE TABLE IF NOT EXISTS ajustes_lote_itens (
+                 ajuste_id INTEGER NOT NULL,
+                 produto_id INTEGER NOT NULL,
+                 preco_venda_antes INTEGER,
+                 preco_venda_depois INTEGER,
+                 preco_custo_antes INTEGER,
+                 preco_custo_depois INTEGER,
+                 quantidade_delta INTEGER NOT NULL DEFAULT 0,
+                 PRIMARY KEY (ajuste_id, produto_id)
+                 ) WITHOUT ROWID;""")
+    # Filtros do ajuste (a tela compara sem diferenciar maiúsculas)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_produtos_categoria ON produtos(categoria COLLATE NOCASE)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_produtos_fornecedor ON produtos(fornecedor COLLATE NOCASE)")
+
+def _m014_terminal_comprovantes(conn):
+    """
+    Terminal de origem do comprovante: cada terminal só gera (e imprime na
+    própria impressora) os comprovantes das vendas feitas nele.
+    """
+    conn.execute("ALTER TABLE fila_comprovantes ADD COLUMN terminal TEXT")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_fila_comprovantes_terminal "
+                 "ON fila_comprovantes(terminal, status, proxima_tentativa)")
+
+
+# (versão, descrição, função) — sempre em ordem crescente
+MIGRACOES = [
+    (1, "Schema base", _m001_schema_base),
+    (2, "Índices das consultas principais", _m002_indices_consultas),
+    (3, "Busca textual de produtos (FTS5)", _m003_busca_textual_produtos),
+    (4, "Resumos diários de vendas (analytics)", _m004_resumos_vendas),
+    (5, "Saldos do financeiro (geral e por dia)", _m005_saldos_financeiro),
+    (6, "Valores em dinheiro como centavos (INTEGER)", _m006_valores_em_centavos),
+    (7, "Fila de geração de comprovantes", _m007_fila_comprovantes),
+    (8, "Código de barras dos produtos", _m008_codigo_barras),
+    (9, "Busca de clientes por nome e CPF/CNPJ", _m009_busca_clientes),
+    (10, "Índice de quantidade em estoque", _m010_indice_estoque_baixo),
+    (11, "Índices do histórico de vendas", _m011_indices_historico),
+    (12, "Razão de movimentos de estoque", _m012_razao_estoque),
+    (13, "Ajustes de preço e estoque em lote", _m013_ajustes_em_lote),
+    (14, "Terminal de origem dos comprovantes", _m014_terminal_comprovantes),
+]
+
+VERSAO_ATUAL = MIGRACOES[-1][0]
+
+
+def versao_schema(conn):
+    """Retorna a versão do schema gravada no banco (0 = banco novo/legado)."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def aplicar_migracoes(conn):
+    """
+    Aplica, em uma única transação, as migrações ainda não registradas no banco.
+    Retorna a versão final do schema.
+    """
+    versao = versao_schema(conn)
+    if versao >= VERSAO_ATUAL:
+        if versao > VERSAO_ATUAL:
+            logging.warning(f"Banco na versão {versao}, mais nova que a do sistema ({VERSAO_ATUAL}).")
+        return versao
+
+    # IMMEDIATE: outro terminal não começa a migrar ao mesmo tempo
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Relê dentro do lock: outro terminal pode ter acabado de migrar
+        versao = versao_schema(conn)
+        for numero, descricao, migracao in MIGRACOES:
+            if numero <= versao:
+                continue
+            logging.info(f"Aplicando migração {numero}: {descricao}")
+            migracao(conn)
+            conn.execute(f"PRAGMA user_version = {numero}")
+            versao = numero
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return versao
@@ -1,32 +1,16 @@
 import tkinter as tk
 from tkinter import messagebox, ttk
 import os
+import queue
+from core import servico_comprovantes
+from gui import executor_tarefas
 
-# Telas
-from gui.screen_dashboard import Dashboard
-from gui.screen_estoque import TelaEstoque  # <--- Importamos a nova tela
-from gui.screen_vendas import TelaVendas
-from gui.screen_financeiro import TelaFinanceiro
-from gui.screen_clientes import TelaGerenciarClientes
-from gui.screen_frota import ScreenFrota
-from gui.screen_historico import TelaHistoricoVendas
-from gui.screen_analytics import TelaAnalytics
-from gui.screen_config import TelaConfiguracao
-from gui.screen_admin import TelaGerenciarUsuarios
-
-try:
-    from ttkthemes import ThemedTk
-    JanelaPai = ThemedTk
-except ImportError:
-    JanelaPai = tk.Tk
-
-class App(JanelaPai):
+# Telas: cada uma é importada só quando abre pela primeira vez (ver métodos de
+# navegação). Assim matplotlib, reportlab etc. não atrasam a tela de login.
+
+class App(tk.Tk):
     def __init__(self):
         super().__init__()
-        
-        # Tema Moderno
-        if JanelaPai == ThemedTk:
-            self.set_theme("arc") # Um tema clean, azulado e moderno
 
         self.title("Sys360 ERP - Gestão Integrada")
         self.geometry("1200x700")
@@ -40,7 +24,21 @@ class App(JanelaPai):
 
         self.usuario_logado = None
         
-        # --- ESTILOS CUSTOMIZADOS (Menu Lateral) ---
+        self._configurar_estilos()
+
+        # Layout Principal (Sidebar + Conteúdo)
+        self.main_container = tk.Frame(self)
+        self.main_container.pack(fill='both', expand=True)
+
+        self._criar_sidebar()
+        self._criar_area_conteudo()
+        self._acompanhar_comprovantes()
+        
+        # Inicia no Dashboard (se logado) ou Login
+        # Nota: A lógica de login chama self.mostrar_dashboard() depois
+    
+    def _configurar_estilos(self):
+        """Estilos customizados (Menu Lateral). Valem para o tema atual."""
         style = ttk.Style()
         style.configure("Sidebar.TFrame", background="#2c3e50") # Azul escuro
         style.configure("Sidebar.TLabel", background="#2c3e50", foreground="white", font=("Segoe UI", 12))
@@ -51,18 +49,8 @@ class App(JanelaPai):
                         padding=10, 
                         anchor="w",
                         background="#2c3e50",
-                        foreground="black") 
-        
-        # Layout Principal (Sidebar + Conteúdo)
-        self.main_container = tk.Frame(self)
-        self.main_container.pack(fill='both', expand=True)
+                        foreground="black")
 
-        self._criar_sidebar()
-        self._criar_area_conteudo()
-        
-        # Inicia no Dashboard (se logado) ou Login
-        # Nota: A lógica de login chama self.mostrar_dashboard() depois
-    
     def _criar_sidebar(self):
         """Cria o menu lateral moderno."""
         self.sidebar = ttk.Frame(self.main_container, style="Sidebar.TFrame", width=250)
@@ -94,6 +82,10 @@ class App(JanelaPai):
         self.lbl_usuario = ttk.Label(self.sidebar, text="...", style="Sidebar.TLabel", font=("Arial", 9))
         self.lbl_usuario.pack(side='bottom', pady=20)
 
+        # Andamento da fila de comprovantes (vazio quando não há nada pendente)
+        self.lbl_comprovantes = ttk.Label(self.sidebar, text="", style="Sidebar.TLabel", font=("Arial", 9))
+        self.lbl_comprovantes.pack(side='bottom')
+
     def _criar_botao_menu(self, texto, comando):
         """Helper para criar botões padronizados."""
         btn = ttk.Button(self.sidebar, text=texto, command=comando, style="Menu.TButton")
@@ -104,6 +96,69 @@ class App(JanelaPai):
         self.content_area = tk.Frame(self.main_container, bg="#ecf0f1") # Cinza bem claro
         self.content_area.pack(side='right', fill='both', expand=True)
 
+    def aplicar_tema(self):
+        """Tema Moderno (ttkthemes), carregado só depois do login."""
+        try:
+            from ttkthemes import ThemedStyle
+        except ImportError:
+            return
+        ThemedStyle(self).set_theme("arc") # Um tema clean, azulado e moderno
+        self._configurar_estilos() # Trocar de tema descarta os estilos do anterior
+
+    # --- Comprovantes (gerados em segundo plano) ---
+    INTERVALO_COMPROVANTES_MS = 250
+
+    def _acompanhar_comprovantes(self):
+        """Eventos do serviço chegam na thread dele; a fila os traz para a thread do Tk."""
+        self._eventos_comprovantes = queue.Queue()
+        self._abrir_ao_concluir = set()
+        ouvinte = lambda *evento: self._eventos_comprovantes.put(evento)
+        servico_comprovantes.adicionar_ouvinte(ouvinte)
+        self.bind('<Destroy>', lambda e: servico_comprovantes.remover_ouvinte(ouvinte) if e.widget is self else None, add='+')
+        self.after(self.INTERVALO_COMPROVANTES_MS, self._ler_eventos_comprovantes)
+
+    def abrir_comprovante_quando_pronto(self, venda_id):
+        """Abre o comprovante da venda (PDF ou texto) assim que o serviço terminar de gerá-lo."""
+        self._abrir_ao_concluir.add(venda_id)
+        self._atualizar_andamento_comprovantes()
+
+    def _ler_eventos_comprovantes(self):
+        houve_evento = False
+        while True:
+            try:
+                evento, venda_id, detalhe = self._eventos_comprovantes.get_nowait()
+            except queue.Empty:
+                break
+            houve_evento = True
+            if venda_id not in self._abrir_ao_concluir:
+                continue
+            if evento == 'concluido':
+                self._abrir_ao_concluir.discard(venda_id)
+                if os.path.splitext(detalhe)[1] not in ('.pdf', '.txt'):
+                    continue # Enviado direto para a impressora térmica
+                try:
+                    import webbrowser
+                    webbrowser.open(os.path.abspath(detalhe))
+                except: pass
+            elif evento == 'erro':
+                self._abrir_ao_concluir.discard(venda_id)
+                messagebox.showwarning("Comprovante", f"Não foi possível gerar o comprovante da venda {venda_id}:\n{detalhe}\n\n"
+                                                      "Use 'Reimprimir' no histórico para tentar de novo.")
+        if houve_evento:
+            self._atualizar_andamento_comprovantes()
+        self.after(self.INTERVALO_COMPROVANTES_MS, self._ler_eventos_comprovantes)
+
+    def _atualizar_andamento_comprovantes(self):
+        executor_tarefas.executar(self, servico_comprovantes.progresso, ao_concluir=self._exibir_andamento_comprovantes,
+                                  nome="comprovantes.progresso")
+
+    def _exibir_andamento_comprovantes(self, progresso):
+        na_fila = progresso['pendente'] + progresso['processando']
+        partes = []
+        if na_fila: partes.append(f"🧾 {na_fila} comprovante(s) na fila")
+        if progresso['erro']: partes.append(f"⚠ {progresso['erro']} com erro")
+        self.lbl_comprovantes.config(text=" | ".join(partes))
+
     # --- Navegação ---
     def limpar_conteudo(self):
         """Remove a tela atual para mostrar a próxima."""
@@ -111,28 +166,35 @@ class App(JanelaPai):
             widget.destroy()
 
     def mostrar_dashboard(self):
+        from gui.screen_dashboard import Dashboard
         self.limpar_conteudo()
         Dashboard(self.content_area, self)
 
     def abrir_tela_estoque(self):
+        from gui.screen_estoque import TelaEstoque
         self.limpar_conteudo()
         TelaEstoque(self.content_area) # Instancia a classe que criamos no outro arquivo
 
     def abrir_tela_vendas(self):
+        from gui.screen_vendas import TelaVendas
         TelaVendas(self) # Vendas é Toplevel (abre por cima) ou você pode adaptar para Frame
 
     def abrir_tela_financeiro(self):
         if self.check_permissao(['admin', 'gestor']):
+            from gui.screen_financeiro import TelaFinanceiro
             self.limpar_conteudo()
             TelaFinanceiro(self.content_area) # Se Financeiro for Frame. Se for Toplevel, chame direto.
 
     def abrir_tela_gerenciar_clientes(self):
+        from gui.screen_clientes import TelaGerenciarClientes
         TelaGerenciarClientes(self) # Mantivemos como Janela Separada
 
     def abrir_tela_frota(self):
+        from gui.screen_frota import ScreenFrota
         ScreenFrota(self) # Mantivemos como Janela Separada
 
     def abrir_tela_config(self):
+        from gui.screen_config import TelaConfiguracao
         TelaConfiguracao(self)
 
     # --- Autenticação e Utilitários ---
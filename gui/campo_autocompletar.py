@@ -0,0 +1,139 @@
+import tkinter as tk
+from tkinter import ttk
+
+from gui import executor_tarefas
+
+class CampoAutocompletar(ttk.Entry):
+    """
+    Campo de texto com sugestões: depois que o operador para de digitar,
+    buscar(texto, limite) roda em segundo plano (gui.executor_tarefas) e as
+    primeiras 'limite' linhas aparecem numa lista logo abaixo do campo.
+
+    buscar(texto, limite) -> linhas (a primeira coluna é o id).
+    formatar(linha)       -> texto exibido na lista e no campo.
+
+    Setas navegam, Enter/duplo clique escolhe, Esc fecha. selecionado()
+    devolve a linha escolhida, ou None se o texto foi alterado depois.
+    """
+
+    ATRASO_MS = 250 # Espera o operador parar de digitar antes de consultar
+    LIMITE = 10
+    MIN_CARACTERES = 2
+
+    def __init__(self, parent, buscar, formatar, limite=None, **entry_kw):
+        super().__init__(parent, **entry_kw)
+        self.buscar = buscar
+        self.formatar = formatar
+        self.limite = limite or self.LIMITE
+        self._linhas = []
+        self._selecionado = None
+        self._agendado = None
+        self._geracao = 0
+        self._popup = None
+        self._lista = None
+
+        self.bind('<KeyRelease>', self._ao_digitar)
+        self.bind('<Down>', lambda e: self._mover(1))
+        self.bind('<Up>', lambda e: self._mover(-1))
+        self.bind('<Return>', self._escolher)
+        self.bind('<Escape>', lambda e: self._fechar())
+        self.bind('<FocusOut>', lambda e: self.after(150, self._fechar_sem_foco))
+        self.bind('<Destroy>', lambda e: self._fechar(), add='+')
+
+    # --- API ---
+    def selecionado(self):
+        return self._selecionado
+
+    def id_selecionado(self):
+        return self._selecionado[0] if self._selecionado else None
+
+    def limpar(self):
+        self._geracao += 1
+        self._selecionado = None
+        self.delete(0, 'end')
+        self._fechar()
+
+    # --- Busca ---
+    def _ao_digitar(self, event):
+        if event.keysym in ('Down', 'Up', 'Return', 'Escape', 'Tab', 'Shift_L', 'Shift_R'):
+            return
+        self._selecionado = None # Texto mudou: a escolha anterior não vale mais
+        if self._agendado:
+            self.after_cancel(self._agendado)
+        self._agendado = self.after(self.ATRASO_MS, self._consultar)
+
+    def _consultar(self):
+        self._agendado = None
+        self._geracao += 1
+        texto = self.get().strip()
+        if len(texto) < self.MIN_CARACTERES:
+            self._fechar()
+            return
+        geracao = self._geracao
+        executor_tarefas.executar(
+            self, self.buscar, texto, self.limite,
+            ao_concluir=lambda linhas: self._exibir(geracao, linhas),
+            nome="autocompletar")
+
+    def _exibir(self, geracao, linhas):
+        if geracao != self._geracao or self.focus_get() is not self:
+            return # Já digitaram outra coisa (ou saíram do campo)
+        self._linhas = list(linhas)
+        if not self._linhas:
+            self._fechar()
+            return
+        self._abrir()
+        self._lista.delete(0, 'end')
+        for linha in self._linhas:
+            self._lista.insert('end', self.formatar(linha))
+        self._lista.config(height=len(self._linhas))
+
+    # --- Lista de sugestões ---
+    def _abrir(self):
+        if self._popup is None:
+            self._popup = tk.Toplevel(self)
+            self._popup.wm_overrideredirect(True)
+            self._lista = tk.Listbox(self._popup, exportselection=False, activestyle='dotbox')
+            self._lista.pack(fill='both', expand=True)
+            self._lista.bind('<ButtonRelease-1>', self._escolher)
+            self._lista.bind('<Double-Button-1>', self._escolher)
+        self.update_idletasks()
+        self._popup.wm_geometry(f"+{self.winfo_rootx()}+{self.winfo_rooty() + self.winfo_height()}")
+        self._lista.config(width=max(20, self.winfo_width() // 7))
+        self._popup.deiconify()
+        self._popup.lift()
+
+    def _fechar(self):
+        if self._popup is not None:
+            self._popup.destroy()
+            self._popup = self._lista = None
+
+    def _fechar_sem_foco(self):
+        if self.winfo_exists() and self.focus_get() is not self:
+            self._fechar()
+
+    def _mover(self, passo):
+        if self._lista is None:
+            return 'break'
+        atual = self._lista.curselection()
+        indice = min(max((atual[0] + passo) if atual else 0, 0), self._lista.size() - 1)
+        self._lista.selection_clear(0, 'end')
+        self._lista.selection_set(indice)
+        self._lista.see(indice)
+        return 'break'
+
+    def _escolher(self, event=None):
+        if self._lista is None:
+            return None
+        atual = self._lista.curselection()
+        if not atual:
+            if len(self._linhas) != 1:
+                return 'break'
+            atual = (0,) # Uma sugestão só: Enter escolhe ela
+        self._selecionado = self._linhas[atual[0]]
+        self.delete(0, 'end')
+        self.insert(0, self.formatar(self._selecionado))
+        self._fechar()
+        self.icursor('end')
+        self.focus_set()
+        return 'break'
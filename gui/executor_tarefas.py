@@ -0,0 +1,135 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+class Tarefa:
+    """Uma execução em segundo plano. cancelar() descarta o resultado."""
+
+    def __init__(self, nome, ao_concluir, ao_falhar, dono):
+        self.nome = nome
+        self.ao_concluir = ao_concluir
+        self.ao_falhar = ao_falhar
+        self.dono = dono
+        self.cancelada = False
+        self.future = None
+
+    def cancelar(self):
+        self.cancelada = True
+        if self.future is not None:
+            self.future.cancel() # Só tem efeito se ainda não começou
+
+class ExecutorTarefas:
+    """
+    Roda consultas fora da thread do Tk para as telas não travarem.
+
+    O trabalho pesado vai para um pool de threads; o resultado volta por uma
+    fila que a thread do Tk lê com after(), e só então os callbacks
+    (ao_concluir / ao_falhar) rodam, já na thread da interface.
+    Se o widget 'dono' for destruído (ex.: App.limpar_conteudo), as tarefas
+    dele são canceladas e os resultados descartados.
+    """
+
+    INTERVALO_MS = 30
+    MAX_THREADS = 4
+
+    _instancia = None
+    _lock = threading.Lock()
+
+    def __init__(self, raiz):
+        self.raiz = raiz
+        self._pool = ThreadPoolExecutor(max_workers=self.MAX_THREADS, thread_name_prefix="sys360")
+        self._resultados = queue.Queue()
+        self._pendentes = 0
+        self._lendo_fila = False
+        self._por_dono = {} # id(dono) -> lista de tarefas
+
+    @classmethod
+    def obter(cls, widget):
+        """Instância única, ligada à janela raiz do Tk."""
+        with cls._lock:
+            if cls._instancia is None:
+                cls._instancia = cls(widget._root())
+            return cls._instancia
+
+    @classmethod
+    def encerrar(cls):
+        with cls._lock:
+            if cls._instancia is not None:
+                cls._instancia._pool.shutdown(wait=False, cancel_futures=True)
+                cls._instancia = None
+
+    def executar(self, func, *args, ao_concluir=None, ao_falhar=None, dono=None, nome=None, **kwargs):
+        tarefa = Tarefa(nome or getattr(func, '__name__', 'tarefa'), ao_concluir, ao_falhar, dono)
+        if dono is not None:
+            self._vincular_dono(dono, tarefa)
+        self._pendentes += 1
+        tarefa.future = self._pool.submit(self._rodar, tarefa, func, args, kwargs)
+        if not self._lendo_fila:
+            self._lendo_fila = True
+            self.raiz.after(self.INTERVALO_MS, self._ler_fila)
+        return tarefa
+
+    def _vincular_dono(self, dono, tarefa):
+        chave = id(dono)
+        if chave not in self._por_dono:
+            self._por_dono[chave] = []
+            def _ao_destruir(event, chave=chave):
+                if event.widget is dono:
+                    for t in self._por_dono.pop(chave, []):
+                        t.cancelar()
+            dono.bind('<Destroy>', _ao_destruir, add='+')
+        tarefas = self._por_dono[chave]
+        tarefas[:] = [t for t in tarefas if not t.future or not t.future.done()]
+        tarefas.append(tarefa)
+
+    def _rodar(self, tarefa, func, args, kwargs):
+        # Thread do pool: não toca em widgets, só devolve o resultado pela fila
+        if tarefa.cancelada:
+            self._resultados.put((tarefa, False, None, 0.0))
+            return
+        inicio = time.perf_counter()
+        try:
+            resultado = func(*args, **kwargs)
+            ok = True
+        except Exception as e:
+            resultado = e
+            ok = False
+        decorrido = (time.perf_counter() - inicio) * 1000
+        if ok:
+            logging.info(f"Tarefa '{tarefa.nome}' concluída em {decorrido:.0f} ms")
+        else:
+            logging.error(f"Tarefa '{tarefa.nome}' falhou em {decorrido:.0f} ms: {resultado}")
+        self._resultados.put((tarefa, ok, resultado, decorrido))
+
+    def _ler_fila(self):
+        while True:
+            try:
+                tarefa, ok, resultado, _ = self._resultados.get_nowait()
+            except queue.Empty:
+                break
+            self._pendentes -= 1
+            if tarefa.cancelada:
+                continue
+            if tarefa.dono is not None and not tarefa.dono.winfo_exists():
+                continue
+            try:
+                if ok and tarefa.ao_concluir:
+                    tarefa.ao_concluir(resultado)
+                elif not ok and tarefa.ao_falhar:
+                    tarefa.ao_falhar(resultado)
+            except Exception as e:
+                logging.error(f"Erro no retorno da tarefa '{tarefa.nome}': {e}", exc_info=True)
+
+        if self._pendentes > 0:
+            self.raiz.after(self.INTERVALO_MS, self._ler_fila)
+        else:
+            self._lendo_fila = False
+
+def executar(dono, func, *args, **kwargs):
+    """
+    Atalho: roda func(*args) em segundo plano em nome do widget 'dono'.
+    Aceita ao_concluir, ao_falhar e nome (ver ExecutorTarefas.executar).
+    """
+    return ExecutorTarefas.obter(dono).executar(func, *args, dono=dono, **kwargs)
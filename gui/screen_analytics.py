@@ -2,7 +2,8 @@ import tkinter as tk
 from tkinter import ttk
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from core import logic_analytics
+from core import logic_analytics, dinheiro
+from gui import executor_tarefas
 import os
 
 class TelaAnalytics(tk.Toplevel):
@@ -39,13 +40,33 @@ class TelaAnalytics(tk.Toplevel):
 
         self._plotar_graficos()
 
+    @staticmethod
+    def _buscar_dados():
+        return (logic_analytics.obter_vendas_ultimos_7_dias(),
+                logic_analytics.obter_top_5_produtos(),
+                logic_analytics.obter_balanco_financeiro())
+
     def _plotar_graficos(self):
         # Limpa gráficos anteriores se houver (para atualizar)
         for widget in self.frame_graficos.winfo_children():
             widget.destroy()
+        ttk.Label(self.frame_graficos, text="Carregando dados...", foreground="gray").grid(row=0, column=0, columnspan=2)
+
+        # Consultas em segundo plano; os gráficos são desenhados na thread da interface
+        executor_tarefas.executar(self, self._buscar_dados, ao_concluir=self._desenhar_graficos,
+                                  nome="analytics.dados")
+
+    def _desenhar_graficos(self, dados):
+        for widget in self.frame_graficos.winfo_children():
+            widget.destroy()
+        dados_vendas, top_prods, (entradas, saidas) = dados
+        # Gráficos trabalham com reais (float); as contas vêm exatas em centavos
+        total_7d = sum(d[1] for d in dados_vendas)
+        dados_vendas = [(dia, dinheiro.em_reais(total)) for dia, total in dados_vendas]
+        lucro = entradas - saidas
+        entradas, saidas = dinheiro.em_reais(entradas), dinheiro.em_reais(saidas)
 
         # --- GRÁFICO 1: VENDAS SEMANAIS (LINHA) ---
-        dados_vendas = logic_analytics.obter_vendas_ultimos_7_dias()
         fig1 = Figure(figsize=(5, 4), dpi=100)
         ax1 = fig1.add_subplot(111)
         
@@ -65,7 +86,6 @@ class TelaAnalytics(tk.Toplevel):
         canvas1.get_tk_widget().grid(row=0, column=0, sticky='nsew', padx=5, pady=5)
 
         # --- GRÁFICO 2: TOP 5 PRODUTOS (BARRAS HORIZONTAIS) ---
-        top_prods = logic_analytics.obter_top_5_produtos()
         fig2 = Figure(figsize=(5, 4), dpi=100)
         ax2 = fig2.add_subplot(111)
 
@@ -83,7 +103,6 @@ class TelaAnalytics(tk.Toplevel):
         canvas2.get_tk_widget().grid(row=0, column=1, sticky='nsew', padx=5, pady=5)
 
         # --- GRÁFICO 3: FINANCEIRO (PIZZA) ---
-        entradas, saidas = logic_analytics.obter_balanco_financeiro()
         fig3 = Figure(figsize=(5, 4), dpi=100)
         ax3 = fig3.add_subplot(111)
 
@@ -92,7 +111,7 @@ class TelaAnalytics(tk.Toplevel):
             sizes = [entradas, saidas]
             colors = ['#4ade80', '#f87171'] # Verde e Vermelho
             ax3.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=90, colors=colors)
-            ax3.set_title(f"Balanço Financeiro (Saldo: R${entradas-saidas:.2f})")
+            ax3.set_title(f"Balanço Financeiro (Saldo: {dinheiro.formatar(lucro)})")
         else:
             ax3.text(0.5, 0.5, "Sem movimentação", ha='center')
 
@@ -105,9 +124,8 @@ class TelaAnalytics(tk.Toplevel):
         frame_info.grid(row=1, column=1, sticky='nsew', padx=5, pady=5)
         
         tk.Label(frame_info, text="Resumo Geral", font=("Arial", 14, "bold"), bg="white").pack(pady=20)
-        tk.Label(frame_info, text=f"Total Vendas (7d): R$ {sum([d[1] for d in dados_vendas]):.2f}", font=("Arial", 12), bg="white").pack(anchor='w', padx=20)
+        tk.Label(frame_info, text=f"Total Vendas (7d): {dinheiro.formatar(total_7d)}", font=("Arial", 12), bg="white").pack(anchor='w', padx=20)
         tk.Label(frame_info, text=f"Produto Campeão: {top_prods[0][0] if top_prods else '---'}", font=("Arial", 12), bg="white").pack(anchor='w', padx=20)
         
-        lucro = entradas - saidas
         cor_lucro = "green" if lucro >= 0 else "red"
-        tk.Label(frame_info, text=f"Resultado Líquido: R$ {lucro:.2f}", font=("Arial", 16, "bold"), fg=cor_lucro, bg="white").pack(pady=30)
\ No newline at end of file
+        tk.Label(frame_info, text=f"Resultado Líquido: {dinheiro.formatar(lucro)}", font=("Arial", 16, "bold"), fg=cor_lucro, bg="white").pack(pady=30)
\ No newline at end of file
@@ -2,6 +2,8 @@ import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import os
 from database import db_manager
+from core import logic_usuarios, servico_comprovantes, cache_produtos, indicadores
+from gui import executor_tarefas
 
 class TelaConfiguracao(tk.Toplevel):
     def __init__(self, parent):
@@ -48,6 +50,13 @@ class TelaConfiguracao(tk.Toplevel):
         
         ttk.Button(tab_empresa, text="💾 Salvar Dados da Empresa", command=self.salvar_empresa).pack(pady=10)
 
+        frame_alerta = ttk.LabelFrame(tab_empresa, text="Alerta de Estoque (Dashboard)", padding=15)
+        frame_alerta.pack(fill='x', padx=10, pady=10)
+        ttk.Label(frame_alerta, text="Avisar quando a quantidade for menor que:").grid(row=0, column=0, sticky='w', pady=5)
+        self.entry_estoque_minimo = ttk.Entry(frame_alerta, width=10)
+        self.entry_estoque_minimo.grid(row=0, column=1, sticky='w', padx=5, pady=5)
+        ttk.Button(frame_alerta, text="💾 Salvar", command=self.salvar_estoque_minimo).grid(row=0, column=2, padx=10)
+
         # --- ABA 2: Banco de Dados (Rede) ---
         tab_rede = ttk.Frame(notebook)
         notebook.add(tab_rede, text="🌐 Rede & Banco")
@@ -69,13 +78,80 @@ class TelaConfiguracao(tk.Toplevel):
         ttk.Label(frame_db, text="Dica: Para usar em rede, selecione um arquivo em uma pasta compartilhada (ex: Z:\\Sistema\\estoque.db)", 
                   font=("Arial", 8), foreground="gray").pack(anchor='w', pady=5)
 
+        # Situação da conexão (modo de journal e disputa por lock entre terminais)
+        self.lbl_status_db = ttk.Label(frame_db, text="", font=("Arial", 8), foreground="gray")
+        self.lbl_status_db.pack(anchor='w', pady=5)
+
         ttk.Button(tab_rede, text="💾 Salvar Configuração de Rede", command=self.salvar_rede).pack(pady=10)
 
+        # --- ABA 3: Segurança (custo do hash das senhas) ---
+        tab_seg = ttk.Frame(notebook)
+        notebook.add(tab_seg, text="🔒 Segurança")
+
+        frame_seg = ttk.LabelFrame(tab_seg, text="Senhas (bcrypt)", padding=15)
+        frame_seg.pack(fill='x', padx=10, pady=10)
+
+        self.lbl_custo = ttk.Label(frame_seg, text="")
+        self.lbl_custo.pack(anchor='w')
+        ttk.Label(frame_seg, text=(f"A calibração escolhe o maior custo que verifica uma senha em até "
+                                   f"{logic_usuarios.ALVO_HASH_MS} ms nesta máquina.\n"
+                                   "As senhas existentes são regravadas no próximo login de cada usuário."),
+                  font=("Arial", 8), foreground="gray").pack(anchor='w', pady=5)
+
+        self.btn_calibrar = ttk.Button(tab_seg, text="⏱️ Calibrar Custo", command=self.calibrar_custo)
+        self.btn_calibrar.pack(pady=10)
+
+        # --- ABA 4: Comprovantes (PDF ou impressora térmica) ---
+        tab_comp = ttk.Frame(notebook)
+        notebook.add(tab_comp, text="🧾 Comprovantes")
+
+        frame_comp = ttk.LabelFrame(tab_comp, text="Saída do Comprovante de Venda (este terminal)", padding=15)
+        frame_comp.pack(fill='x', padx=10, pady=10)
+
+        ttk.Label(frame_comp, text="Formato:").grid(row=0, column=0, sticky='w', pady=5)
+        self.combo_modo_comp = ttk.Combobox(frame_comp, values=list(servico_comprovantes.MODOS.values()), state="readonly", width=35)
+        self.combo_modo_comp.grid(row=0, column=1, sticky='w', pady=5)
+
+        ttk.Label(frame_comp, text="Impressora (arquivo/dispositivo):").grid(row=1, column=0, sticky='w', pady=5)
+        self.entry_impressora = ttk.Entry(frame_comp, width=45)
+        self.entry_impressora.grid(row=1, column=1, sticky='w', pady=5)
+
+        ttk.Label(frame_comp, text="Colunas:").grid(row=2, column=0, sticky='w', pady=5)
+        self.entry_colunas = ttk.Entry(frame_comp, width=6)
+        self.entry_colunas.grid(row=2, column=1, sticky='w', pady=5)
+
+        ttk.Label(frame_comp, text=("Texto e ESC/POS geram o cupom de 80 mm em milissegundos (sem PDF).\n"
+                                    "Impressora em branco grava em comprovantes/. Ex.: /dev/usb/lp0, LPT1, \\\\PC\\Termica\n"
+                                    "Colunas: 48 na maioria das térmicas de 80 mm (42 em algumas, 32 nas de 58 mm).\n"
+                                    "Vale só para este computador: cada terminal imprime as vendas feitas nele."),
+                  font=("Arial", 8), foreground="gray").grid(row=3, column=0, columnspan=2, sticky='w', pady=5)
+
+        ttk.Button(tab_comp, text="💾 Salvar Comprovantes", command=self.salvar_comprovantes).pack(pady=10)
+
     def _carregar_dados(self):
         # Carrega Rede
         caminho_atual = db_manager.carregar_caminho_db()
         self.entry_path.insert(0, caminho_atual)
-        
+
+        modo = db_manager.modo_journal() or '---'
+        stats = db_manager.estatisticas_lock()
+        cache = cache_produtos.estatisticas()
+        self.lbl_status_db.config(text=(
+            f"Modo do banco: {modo.upper()} | Esperas por lock: {stats['esperas']} "
+            f"({stats['tempo_espera_ms']:.0f} ms) | Retentativas: {stats['retentativas']} | Falhas: {stats['falhas']}\n"
+            f"Cache de produtos (PDV): {cache['acertos']} acertos, {cache['faltas']} faltas "
+            f"({cache['taxa_acerto']:.0%}) | {cache['invalidacoes']} invalidações | {cache['itens']} em memória"
+        ))
+        
+        self.lbl_custo.config(text=f"Custo atual: {logic_usuarios.obter_custo_bcrypt()}")
+
+        # Carrega Comprovantes
+        self.combo_modo_comp.set(servico_comprovantes.MODOS[servico_comprovantes.obter_modo()])
+        self.entry_impressora.insert(0, servico_comprovantes.obter_caminho_impressora())
+        self.entry_colunas.insert(0, str(servico_comprovantes.obter_colunas()))
+
+        self.entry_estoque_minimo.insert(0, str(indicadores.obter_limite_estoque()))
+
         # Carrega Empresa
         dados = db_manager.obter_dados_empresa()
         if dados:
@@ -84,6 +160,23 @@ class TelaConfiguracao(tk.Toplevel):
             if dados[1]: self.entry_emp_end.insert(0, dados[1])
             if dados[2]: self.entry_emp_tel.insert(0, dados[2])
 
+    def calibrar_custo(self):
+        self.btn_calibrar.config(state='disabled')
+        self.lbl_custo.config(text="Medindo... (pode levar alguns segundos)")
+        executor_tarefas.executar(self, logic_usuarios.calibrar_custo_bcrypt,
+                                  ao_concluir=self._custo_calibrado, ao_falhar=self._falha_calibracao,
+                                  nome="usuarios.calibrar_bcrypt")
+
+    def _custo_calibrado(self, resultado):
+        custo, ms = resultado
+        self.btn_calibrar.config(state='normal')
+        self.lbl_custo.config(text=f"Custo atual: {custo} ({ms:.0f} ms por verificação)")
+
+    def _falha_calibracao(self, erro):
+        self.btn_calibrar.config(state='normal')
+        self.lbl_custo.config(text=f"Custo atual: {logic_usuarios.obter_custo_bcrypt()}")
+        messagebox.showerror("Erro", f"Falha na calibração: {erro}")
+
     def buscar_arquivo(self):
         filename = filedialog.askopenfilename(title="Selecione o Banco", filetypes=[("SQLite DB", "*.db"), ("Todos", "*.*")])
         if filename:
@@ -96,6 +189,21 @@ class TelaConfiguracao(tk.Toplevel):
             db_manager.salvar_caminho_db(novo)
             messagebox.showinfo("Sucesso", "Caminho de rede salvo!")
 
+    def salvar_comprovantes(self):
+        modo = next(m for m, nome in servico_comprovantes.MODOS.items() if nome == self.combo_modo_comp.get())
+        try:
+            servico_comprovantes.salvar_configuracao(modo, self.entry_impressora.get(), self.entry_colunas.get())
+            messagebox.showinfo("Sucesso", "Configuração de comprovantes salva!")
+        except ValueError as e:
+            messagebox.showerror("Erro", str(e))
+
+    def salvar_estoque_minimo(self):
+        try:
+            indicadores.salvar_limite_estoque(self.entry_estoque_minimo.get())
+            messagebox.showinfo("Sucesso", "Limite do alerta de estoque salvo!")
+        except ValueError as e:
+            messagebox.showerror("Erro", str(e))
+
     def salvar_empresa(self):
         try:
             db_manager.salvar_dados_empresa(
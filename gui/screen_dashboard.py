@@ -4,7 +4,8 @@ from datetime import datetime
 import os
 
 # Imports da Lógica para buscar os dados dos cards
-from core import logic_produtos, logic_financeiro, logic_vendas
+from core import indicadores, dinheiro
+from gui import executor_tarefas
 
 class Dashboard(ttk.Frame):
     """
@@ -20,24 +21,22 @@ class Dashboard(ttk.Frame):
         self._criar_cards_topo()
         self._criar_atalhos_centro()
         self._criar_lista_alertas()
+        self._carregar_dados()
 
     def _criar_cards_topo(self):
         # Frame para os cartões de informação
         frame_cards = ttk.Frame(self)
         frame_cards.pack(fill='x', padx=20, pady=20)
 
+        # Valores chegam depois, de _carregar_dados (em segundo plano)
         # -- Card 1: Total Produtos --
-        qtd_produtos = len(logic_produtos.listar_todos_produtos())
-        self._criar_card(frame_cards, "Produtos Cadastrados", str(qtd_produtos), 0, 'blue')
+        self.lbl_produtos = self._criar_card(frame_cards, "Produtos Cadastrados", "...", 0, 'blue')
 
         # -- Card 2: Saldo Atual --
-        saldo = logic_financeiro.obter_saldo_atual()
-        cor_saldo = 'green' if saldo >=0 else 'red'
-        self._criar_card(frame_cards, 'Saldo em Caixa', f'R${saldo:.2f}', 1, cor_saldo)
+        self.lbl_saldo = self._criar_card(frame_cards, 'Saldo em Caixa', "...", 1, 'gray')
 
-        # -- Card 3: Vendas Hoje (Simulação - precisaria de query específica) --
-        # Por enquanto vamos deixar estático ou criar uma função futura
-        self._criar_card(frame_cards, "Status do Sistema", 'Online', 2, 'gray')
+        # -- Card 3: Vendas Hoje --
+        self.lbl_vendas_hoje = self._criar_card(frame_cards, "Vendas Hoje", "...", 2, 'gray')
     
     def _criar_card(self, parent, titulo, valor, col, cor_texto):
         frame = ttk.LabelFrame(parent, text=titulo)
@@ -47,6 +46,7 @@ class Dashboard(ttk.Frame):
         lbl.pack(padx=20, pady=10)
 
         parent.grid_columnconfigure(col, weight=1)
+        return lbl
     
     def _criar_atalhos_centro(self):
         frame_atalhos = ttk.LabelFrame(self, text='Acesso Rapido')
@@ -67,12 +67,12 @@ class Dashboard(ttk.Frame):
         frame_atalhos.grid_columnconfigure(2, weight=1)
     
     def _criar_lista_alertas(self):
-        frame_alertas = ttk.LabelFrame(self, text="⚠️ Alerta de Estoque Baixo (Menos de 5 un.)")
+        self.frame_alertas = frame_alertas = ttk.LabelFrame(self, text="⚠️ Alerta de Estoque Baixo")
         frame_alertas.pack(fill='both', expand=True, padx=20, pady=10)
 
         cols = ('id', 'nome', 'qtd')
 
-        tree = ttk.Treeview(frame_alertas, columns=cols, show='headings', height=5)
+        self.tree_alertas = tree = ttk.Treeview(frame_alertas, columns=cols, show='headings', height=5)
         tree.heading('id', text='ID')
         tree.heading('nome', text='Produto')
         tree.heading('qtd', text='Qtd')
@@ -82,11 +82,31 @@ class Dashboard(ttk.Frame):
         tree.column('qtd', width=50)
 
         tree.pack(side='left', fill='both', expand=True)
-
-        # Lógica simples para pegar produtos com pouco estoque
-        todos = logic_produtos.listar_todos_produtos()
-
-        for produtos in todos:
-            # produtos = (id, nome, qtd, ...)
-            if produtos[2] < 5:
-                tree.insert('', 'end', values=(produtos[0], produtos[1], produtos[2]))
\ No newline at end of file
+        tree.insert('', 'end', iid='carregando', values=('', 'Carregando...', ''))
+
+    # --- Dados (fora da thread da interface) ---
+    def _carregar_dados(self):
+        # Contagens e alertas vêm de consultas agregadas (com cache): ver core/indicadores
+        executor_tarefas.executar(self, indicadores.resumo, ao_concluir=self._exibir_dados,
+                                  ao_falhar=self._falha_dados, nome="dashboard.dados")
+
+    def _exibir_dados(self, dados):
+        self.lbl_produtos.config(text=str(dados['qtd_produtos']))
+        saldo = dados['saldo']
+        self.lbl_saldo.config(text=dinheiro.formatar(saldo), foreground='green' if saldo >= 0 else 'red')
+        self.lbl_vendas_hoje.config(text=f"{dados['vendas_hoje']} | {dinheiro.formatar(dados['total_hoje'])}")
+
+        alertas, qtd = dados['alertas'], dados['qtd_alertas']
+        titulo = f"⚠️ Alerta de Estoque Baixo (Menos de {dados['limite_estoque']} un.): {qtd} produto(s)"
+        if qtd > len(alertas):
+            titulo += f", exibindo os {len(alertas)} com menor estoque"
+        self.frame_alertas.config(text=titulo)
+        self.tree_alertas.delete(*self.tree_alertas.get_children())
+        for produtos in alertas:
+            self.tree_alertas.insert('', 'end', values=(produtos[0], produtos[1], produtos[2]))
+
+    def _falha_dados(self, erro):
+        self.lbl_produtos.config(text="--")
+        self.lbl_saldo.config(text="--")
+        self.lbl_vendas_hoje.config(text="--")
+        self.tree_alertas.delete(*self.tree_alertas.get_children())
\ No newline at end of file
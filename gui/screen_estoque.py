@@ -1,11 +1,18 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
-from core import logic_produtos
+from tkinter import ttk, messagebox, filedialog
+from core import logic_produtos, logic_estoque, carga_produtos, ajustes_lote, dinheiro
+from gui.tabela_paginada import TabelaPaginada
+from gui import executor_tarefas
 
 class TelaEstoque(ttk.Frame):
+    ATRASO_BUSCA_MS = 250 # Espera o operador parar de digitar antes de consultar
+
     def __init__(self, parent):
         super().__init__(parent)
         self.pack(fill='both', expand=True)
+        self._busca_agendada = None
+        self._geracao_busca = 0
+        self._qtd_exibida = None # Quantidade do produto quando foi selecionado
         self._criar_interface()
         self.popular_tabela()
 
@@ -48,6 +55,11 @@ class TelaEstoque(ttk.Frame):
         self.entry_venda = ttk.Entry(grid_frame, width=15)
         self.entry_venda.grid(row=2, column=3, padx=5, pady=5, sticky="w")
 
+        # Linha 4
+        ttk.Label(grid_frame, text="Cód. Barras / SKU:").grid(row=3, column=0, padx=5, pady=5, sticky='w')
+        self.entry_codigo = ttk.Entry(grid_frame, width=25)
+        self.entry_codigo.grid(row=3, column=1, padx=5, pady=5, sticky="w")
+
         grid_frame.columnconfigure(1, weight=1)
         grid_frame.columnconfigure(3, weight=1)
 
@@ -60,54 +72,67 @@ class TelaEstoque(ttk.Frame):
         frame_busca.pack(side='left')
         self.entry_busca = ttk.Entry(frame_busca, width=25)
         self.entry_busca.pack(side='left', padx=5)
+        self.entry_busca.bind('<KeyRelease>', self._agendar_busca)
+        self.entry_busca.bind('<Return>', lambda e: self.buscar())
         ttk.Button(frame_busca, text="🔍 Buscar", command=self.buscar).pack(side='left')
+        self.lbl_busca = ttk.Label(frame_busca, text="", foreground="gray")
+        self.lbl_busca.pack(side='left', padx=10)
 
         # CRUD (Direita)
         ttk.Button(frame_acoes, text="🗑️ Remover", command=self.remover).pack(side='right', padx=5)
         ttk.Button(frame_acoes, text="✏️ Atualizar", command=self.atualizar).pack(side='right', padx=5)
         ttk.Button(frame_acoes, text="➕ Adicionar", command=self.adicionar).pack(side='right', padx=5)
         ttk.Button(frame_acoes, text="🧹 Limpar", command=self.limpar_campos).pack(side='right', padx=5)
+        btn_arquivo = ttk.Menubutton(frame_acoes, text="📁 Arquivo")
+        menu_arquivo = tk.Menu(btn_arquivo, tearoff=0)
+        menu_arquivo.add_command(label="📥 Importar Produtos (CSV/JSONL)", command=self.importar_produtos)
+        menu_arquivo.add_command(label="📥 Importar Códigos (CSV)", command=self.importar_codigos)
+        menu_arquivo.add_separator()
+        menu_arquivo.add_command(label="📤 Exportar Produtos (CSV)", command=lambda: self.exportar_produtos('csv'))
+        menu_arquivo.add_command(label="📤 Exportar Produtos (JSONL)", command=lambda: self.exportar_produtos('jsonl'))
+        btn_arquivo['menu'] = menu_arquivo
+        btn_arquivo.pack(side='right', padx=5)
+        ttk.Button(frame_acoes, text="📜 Movimentos", command=self.abrir_movimentos).pack(side='right', padx=5)
+        ttk.Button(frame_acoes, text="⚖️ Ajuste em Lote", command=self.abrir_ajuste_lote).pack(side='right', padx=5)
 
-        # --- Tabela ---
-        frame_tabela = ttk.Frame(self)
-        frame_tabela.pack(fill='both', expand=True, padx=20, pady=10)
+        # --- Tabela (carrega por páginas conforme a rolagem) ---
+        cols = ("id", "nome", "qtd", "venda", "custo", "cat", "forn", "codigo")
+        headers = {"id": "ID", "nome": "Produto", "qtd": "Qtd", "venda": "Venda (R$)", "custo": "Custo (R$)", "cat": "Categoria", "forn": "Fornecedor", "codigo": "Cód. Barras"}
+        widths = {"id": 40, "nome": 250, "qtd": 50, "venda": 80, "custo": 80, "cat": 100, "forn": 100, "codigo": 120}
 
-        cols = ("id", "nome", "qtd", "venda", "custo", "cat", "forn")
-        self.tree = ttk.Treeview(frame_tabela, columns=cols, show='headings', selectmode='browse')
-        
-        # Cabeçalhos
-        headers = {"id": "ID", "nome": "Produto", "qtd": "Qtd", "venda": "Venda (R$)", "custo": "Custo (R$)", "cat": "Categoria", "forn": "Fornecedor"}
-        widths = {"id": 40, "nome": 250, "qtd": 50, "venda": 80, "custo": 80, "cat": 100, "forn": 100}
-
-        for c in cols:
-            self.tree.heading(c, text=headers[c])
-            self.tree.column(c, width=widths[c])
-            if c in ['qtd', 'id', 'venda', 'custo']:
-                self.tree.column(c, anchor='center')
-
-        # Scrollbar
-        scrolly = ttk.Scrollbar(frame_tabela, orient='vertical', command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrolly.set)
-        
-        self.tree.pack(side='left', fill='both', expand=True)
-        scrolly.pack(side='right', fill='y')
+        self.tabela = TabelaPaginada(
+            self, cols, headers, widths,
+            buscar_pagina=logic_produtos.listar_produtos_pagina,
+            chave=lambda p: (p[1], p[0]), # Mesma ordem do banco: nome, id
+            formatar=self._formatar_linha,
+            centralizar=('qtd', 'id', 'venda', 'custo'),
+            selectmode='browse'
+        )
+        self.tabela.pack(fill='both', expand=True, padx=20, pady=10)
+        self.tree = self.tabela.tree
 
         self.tree.bind('<<TreeviewSelect>>', self.ao_selecionar)
 
     # --- Lógica ---
+    @staticmethod
+    def _formatar_linha(p):
+        # p = (id, nome, qtd, preco(legacy), venda, custo, cat, forn, codigo_barras)
+        return (p[0], p[1], p[2], dinheiro.formatar_valor(p[4]), dinheiro.formatar_valor(p[5]), p[6], p[7], p[8] or '')
+
     def popular_tabela(self, lista=None):
-        for i in self.tree.get_children(): self.tree.delete(i)
-        
+        """Sem lista: recarrega paginado. Com lista (ex.: busca): mostra só ela."""
         if lista is None:
-            lista = logic_produtos.listar_todos_produtos()
-            
-        for p in lista:
-            # p = (id, nome, qtd, preco(legacy), venda, custo, cat, forn)
-            # Ajuste os índices conforme seu banco
-            try:
-                self.tree.insert('', 'end', text=p[0], values=(p[0], p[1], p[2], f"{p[4]:.2f}", f"{p[5]:.2f}", p[6], p[7]))
-            except IndexError:
-                pass
+            self.tabela.recarregar()
+        else:
+            self.tabela.mostrar_linhas(lista)
+
+    def _refletir_produto(self, id_prod):
+        """Atualiza apenas a linha do produto (nova, alterada ou removida)."""
+        produto = logic_produtos.obter_produto_por_id(id_prod)
+        if produto is None:
+            self.tabela.remover_linha(id_prod)
+        else:
+            self.tabela.atualizar_linha(produto)
 
     def ao_selecionar(self, event):
         sel = self.tree.selection()
@@ -122,21 +147,32 @@ class TelaEstoque(ttk.Frame):
         self.entry_custo.insert(0, item[4])
         self.entry_cat.insert(0, item[5])
         self.entry_forn.insert(0, item[6])
+        # A Treeview converte '0789...' em número: o código vem da linha original do banco
+        produto = self.tabela.linha(sel[0])
+        if produto and produto[8]:
+            self.entry_codigo.insert(0, produto[8])
+        self._qtd_exibida = produto[2] if produto else None
 
     def limpar_campos(self):
-        for e in [self.entry_nome, self.entry_qtd, self.entry_venda, self.entry_custo, self.entry_cat, self.entry_forn]:
+        for e in [self.entry_nome, self.entry_qtd, self.entry_venda, self.entry_custo, self.entry_cat, self.entry_forn, self.entry_codigo]:
             e.delete(0, 'end')
+        self._qtd_exibida = None
         self.tree.selection_remove(self.tree.selection())
 
+    def _usuario_id(self):
+        usuario = getattr(self._root(), 'usuario_logado', None)
+        return usuario[0] if usuario else None
+
     def adicionar(self):
         try:
-            logic_produtos.adicionar_produto(
+            id_novo = logic_produtos.adicionar_produto(
                 self.entry_nome.get(), self.entry_qtd.get(), self.entry_venda.get(),
-                self.entry_custo.get(), self.entry_cat.get(), self.entry_forn.get()
+                self.entry_custo.get(), self.entry_cat.get(), self.entry_forn.get(), self.entry_codigo.get(),
+                usuario_id=self._usuario_id()
             )
             messagebox.showinfo("Sucesso", "Produto adicionado!")
             self.limpar_campos()
-            self.popular_tabela()
+            if id_novo: self._refletir_produto(id_novo)
         except Exception as e:
             messagebox.showerror("Erro", str(e))
 
@@ -147,11 +183,12 @@ class TelaEstoque(ttk.Frame):
         try:
             logic_produtos.atualizar_produto(
                 id_prod, self.entry_nome.get(), self.entry_qtd.get(), self.entry_venda.get(),
-                self.entry_custo.get(), self.entry_cat.get(), self.entry_forn.get()
+                self.entry_custo.get(), self.entry_cat.get(), self.entry_forn.get(), self.entry_codigo.get(),
+                quantidade_anterior=self._qtd_exibida, usuario_id=self._usuario_id()
             )
             messagebox.showinfo("Sucesso", "Produto atualizado!")
             self.limpar_campos()
-            self.popular_tabela()
+            self._refletir_produto(id_prod)
         except Exception as e:
             messagebox.showerror("Erro", str(e))
 
@@ -163,14 +200,377 @@ class TelaEstoque(ttk.Frame):
             try:
                 logic_produtos.remover_produto(id_prod)
                 self.limpar_campos()
-                self.popular_tabela()
+                self.tabela.remover_linha(id_prod)
             except Exception as e:
                 messagebox.showerror("Erro", str(e))
 
+    def abrir_movimentos(self):
+        sel = self.tree.selection()
+        produto = self.tabela.linha(sel[0]) if sel else None
+        if produto is None:
+            messagebox.showwarning("Aviso", "Selecione um produto.")
+            return
+        TelaMovimentosEstoque(self, produto, self._usuario_id(), ao_lancar=self._refletir_produto)
+
+    def abrir_ajuste_lote(self):
+        TelaAjusteLote(self, self._usuario_id(), ao_aplicar=self.popular_tabela)
+
+    def importar_codigos(self):
+        """Atribui códigos de barras em lote a partir de um CSV 'id;codigo'."""
+        caminho = filedialog.askopenfilename(title="CSV com ID e código de barras",
+                                             filetypes=[("CSV", "*.csv"), ("Texto", "*.txt"), ("Todos", "*.*")])
+        if not caminho: return
+        self.lbl_busca.config(text="Importando códigos...")
+        executor_tarefas.executar(
+            self, logic_produtos.importar_codigos_barras_csv, caminho,
+            ao_concluir=self._codigos_importados,
+            ao_falhar=lambda e: (self.lbl_busca.config(text=""), messagebox.showerror("Erro", str(e))),
+            nome="estoque.importar_codigos")
+
+    def _codigos_importados(self, resultado):
+        atualizados, rejeitados = resultado
+        self.lbl_busca.config(text="")
+        msg = f"{atualizados} produto(s) atualizado(s)."
+        if rejeitados:
+            msg += f"\n\n{len(rejeitados)} linha(s) rejeitada(s):\n"
+            msg += "\n".join(f"Linha {n}: {motivo}" for n, motivo in rejeitados[:20])
+            if len(rejeitados) > 20:
+                msg += f"\n... e mais {len(rejeitados) - 20}"
+        messagebox.showinfo("Importar Códigos", msg)
+        if atualizados:
+            self.popular_tabela()
+
+    def importar_produtos(self):
+        """Inclui/atualiza produtos a partir de um CSV ou JSON Lines (em lotes, em segundo plano)."""
+        caminho = filedialog.askopenfilename(title="Arquivo de produtos",
+                                             filetypes=[("CSV ou JSON Lines", "*.csv *.jsonl *.ndjson *.txt"), ("Todos", "*.*")])
+        if not caminho: return
+        self.lbl_busca.config(text="Importando produtos...")
+        executor_tarefas.executar(
+            self, carga_produtos.importar_produtos, caminho, usuario_id=self._usuario_id(),
+            ao_concluir=self._produtos_importados,
+            ao_falhar=lambda e: (self.lbl_busca.config(text=""), messagebox.showerror("Erro", str(e))),
+            nome="estoque.importar_produtos")
+
+    def _produtos_importados(self, r):
+        self.lbl_busca.config(text="")
+        msg = (f"{r['lidas']} linha(s) lida(s) em {r['segundos']:.1f} s.\n\n"
+               f"Incluídos: {r['inseridos']}\nAtualizados: {r['atualizados']}\nRejeitados: {r['rejeitados']}")
+        if r['arquivo_rejeitados']:
+            msg += f"\n\nAs linhas rejeitadas e o motivo estão em:\n{r['arquivo_rejeitados']}"
+        messagebox.showinfo("Importar Produtos", msg)
+        if r['inseridos'] or r['atualizados']:
+            self.popular_tabela()
+
+    def exportar_produtos(self, formato):
+        caminho = filedialog.asksaveasfilename(title="Exportar produtos", defaultextension=f".{formato}",
+                                               initialfile=f"produtos.{formato}",
+                                               filetypes=[(formato.upper(), f"*.{formato}")])
+        if not caminho: return
+        self.lbl_busca.config(text="Exportando produtos...")
+        executor_tarefas.executar(
+            self, carga_produtos.exportar_produtos, caminho, formato,
+            ao_concluir=lambda total: (self.lbl_busca.config(text=""),
+                                       messagebox.showinfo("Exportar Produtos", f"{total} produto(s) exportado(s) para:\n{caminho}")),
+            ao_falhar=lambda e: (self.lbl_busca.config(text=""), messagebox.showerror("Erro", str(e))),
+            nome="estoque.exportar_produtos")
+
+    def _agendar_busca(self, event=None):
+        """Busca enquanto digita: reinicia o contador a cada tecla (debounce)."""
+        if event is not None and event.keysym == 'Return':
+            return
+        if self._busca_agendada:
+            self.after_cancel(self._busca_agendada)
+        self._busca_agendada = self.after(self.ATRASO_BUSCA_MS, self.buscar)
+
     def buscar(self):
+        if self._busca_agendada:
+            self.after_cancel(self._busca_agendada)
+            self._busca_agendada = None
         termo = self.entry_busca.get()
+        self._geracao_busca += 1
+        if not termo.strip():
+            self.lbl_busca.config(text="")
+            self.popular_tabela()
+            return
+        geracao = self._geracao_busca
+        self.lbl_busca.config(text="Buscando...")
+        executor_tarefas.executar(
+            self, logic_produtos.buscar_produtos, termo,
+            ao_concluir=lambda res: self._exibir_busca(geracao, res),
+            ao_falhar=lambda e: self._falha_busca(geracao, e),
+            nome="estoque.buscar")
+
+    def _exibir_busca(self, geracao, res):
+        if geracao != self._geracao_busca:
+            return # Já digitaram outra coisa
+        self.popular_tabela(res)
+        self.lbl_busca.config(text=f"{len(res)} produto(s)" if res else "Nenhum produto encontrado")
+
+    def _falha_busca(self, geracao, erro):
+        if geracao != self._geracao_busca:
+            return
+        self.lbl_busca.config(text="")
+        messagebox.showerror("Erro", str(erro))
+
+
+class TelaMovimentosEstoque(tk.Toplevel):
+    """Movimentos de um produto: lançamento manual, saldo em uma data e os últimos lançamentos."""
+
+    def __init__(self, parent, produto, usuario_id, ao_lancar=None):
+        super().__init__(parent)
+        self.produto_id = produto[0]
+        self.usuario_id = usuario_id
+        self.ao_lancar = ao_lancar # Recebe o ID do produto depois de cada lançamento
+        self.title(f"Movimentos de Estoque - {produto[1]}")
+        self.geometry("820x520")
+        self.transient(parent)
+        self._criar_interface(produto)
+        self._carregar()
+
+    def _criar_interface(self, produto):
+        self.lbl_saldo = ttk.Label(self, text=f"{produto[1]} | Estoque atual: {produto[2]}", font=("Segoe UI", 12, "bold"))
+        self.lbl_saldo.pack(anchor='w', padx=15, pady=10)
+
+        frame_lancar = ttk.LabelFrame(self, text="Lançar Movimento", padding=10)
+        frame_lancar.pack(fill='x', padx=15)
+        ttk.Label(frame_lancar, text="Tipo:").grid(row=0, column=0, padx=5, sticky='w')
+        self.combo_tipo = ttk.Combobox(frame_lancar, values=list(logic_estoque.TIPOS_MANUAIS.values()), state='readonly', width=22)
+        self.combo_tipo.current(0)
+        self.combo_tipo.grid(row=0, column=1, padx=5)
+        ttk.Label(frame_lancar, text="Qtd:").grid(row=0, column=2, padx=5, sticky='w')
+        self.entry_qtd = ttk.Entry(frame_lancar, width=8)
+        self.entry_qtd.grid(row=0, column=3, padx=5)
+        ttk.Label(frame_lancar, text="Observação:").grid(row=0, column=4, padx=5, sticky='w')
+        self.entry_obs = ttk.Entry(frame_lancar, width=30)
+        self.entry_obs.grid(row=0, column=5, padx=5)
+        ttk.Button(frame_lancar, text="➕ Lançar", command=self._lancar).grid(row=0, column=6, padx=10)
+
+        frame_data = ttk.Frame(self)
+        frame_data.pack(fill='x', padx=15, pady=10)
+        ttk.Label(frame_data, text="Saldo no fim do dia (DD/MM/AAAA):").pack(side='left')
+        self.entry_dia = ttk.Entry(frame_data, width=12)
+        self.entry_dia.pack(side='left', padx=5)
+        self.entry_dia.bind('<Return>', lambda e: self._consultar_saldo())
+        ttk.Button(frame_data, text="Consultar", command=self._consultar_saldo).pack(side='left')
+        self.lbl_saldo_dia = ttk.Label(frame_data, text="", foreground="gray")
+        self.lbl_saldo_dia.pack(side='left', padx=10)
+
+        cols = ('data', 'tipo', 'qtd', 'venda', 'usuario', 'obs')
+        self.tree = ttk.Treeview(self, columns=cols, show='headings')
+        for c, titulo, largura in (('data', "Data/Hora (UTC)", 140), ('tipo', "Tipo", 130), ('qtd', "Qtd", 60),
+                                   ('venda', "Venda", 60), ('usuario', "Usuário", 140), ('obs', "Observação", 250)):
+            self.tree.heading(c, text=titulo)
+            self.tree.column(c, width=largura, anchor='center' if c in ('qtd', 'venda') else 'w')
+        self.tree.pack(fill='both', expand=True, padx=15, pady=(0, 15))
+
+    def _carregar(self):
+        executor_tarefas.executar(self, logic_estoque.listar_movimentos, self.produto_id,
+                                  ao_concluir=self._exibir, nome="estoque.movimentos")
+
+    def _exibir(self, movimentos):
+        self.tree.delete(*self.tree.get_children())
+        for m in movimentos:
+            # m = (id, data_hora, tipo, qtd, venda_id, usuario, observacao)
+            self.tree.insert('', 'end', values=(m[1], logic_estoque.NOMES_TIPOS.get(m[2], m[2]), f"{m[3]:+d}",
+                                                m[4] or '', m[5] or '', m[6] or ''))
+
+    def _lancar(self):
+        tipo = next(t for t, nome in logic_estoque.TIPOS_MANUAIS.items() if nome == self.combo_tipo.get())
         try:
-            res = logic_produtos.buscar_produtos(termo)
-            self.popular_tabela(res)
-        except Exception as e:
-            messagebox.showerror("Erro", str(e))
\ No newline at end of file
+            logic_estoque.registrar_movimento(self.produto_id, tipo, self.entry_qtd.get(), self.usuario_id, self.entry_obs.get())
+        except ValueError as e:
+            messagebox.showwarning("Atenção", str(e), parent=self)
+            return
+        self.entry_qtd.delete(0, 'end')
+        self.entry_obs.delete(0, 'end')
+        produto = logic_produtos.obter_produto_por_id(self.produto_id)
+        if produto:
+            self.lbl_saldo.config(text=f"{produto[1]} | Estoque atual: {produto[2]}")
+        if self.ao_lancar:
+            self.ao_lancar(self.produto_id)
+        self._carregar()
+
+    def _consultar_saldo(self):
+        try:
+            saldo = logic_estoque.estoque_na_data(self.entry_dia.get(), self.produto_id)
+        except ValueError as e:
+            messagebox.showwarning("Atenção", str(e), parent=self)
+            return
+        self.lbl_saldo_dia.config(text=f"Saldo: {saldo}")
+
+
+class TelaAjusteLote(tk.Toplevel):
+    """Ajuste de preço/estoque por categoria, fornecedor ou lista de IDs, com prévia e desfazer."""
+    MAX_LINHAS_PREVIA = 1000 # a prévia conta todos, mas a tabela mostra só estes
+    NAO_ALTERAR = "Não alterar"
+
+    def __init__(self, parent, usuario_id, ao_aplicar=None):
+        super().__init__(parent)
+        self.usuario_id = usuario_id
+        self.ao_aplicar = ao_aplicar # Chamado sem argumentos depois de aplicar ou desfazer
+        self._previa_de = None       # (filtros, operacao) da prévia exibida
+        self.title("Ajuste em Lote")
+        self.geometry("900x640")
+        self.transient(parent)
+        self._criar_interface()
+        executor_tarefas.executar(self, ajustes_lote.opcoes_filtro, ao_concluir=self._exibir_opcoes,
+                                  nome="estoque.ajuste_opcoes")
+        self._carregar_ajustes()
+
+    def _criar_interface(self):
+        frame_filtros = ttk.LabelFrame(self, text="Produtos", padding=10)
+        frame_filtros.pack(fill='x', padx=15, pady=(10, 5))
+        ttk.Label(frame_filtros, text="Categoria:").grid(row=0, column=0, padx=5, sticky='w')
+        self.combo_categoria = ttk.Combobox(frame_filtros, width=20)
+        self.combo_categoria.grid(row=0, column=1, padx=5)
+        ttk.Label(frame_filtros, text="Fornecedor:").grid(row=0, column=2, padx=5, sticky='w')
+        self.combo_fornecedor = ttk.Combobox(frame_filtros, width=20)
+        self.combo_fornecedor.grid(row=0, column=3, padx=5)
+        ttk.Label(frame_filtros, text="IDs (ex.: 1, 5, 10-20):").grid(row=0, column=4, padx=5, sticky='w')
+        self.entry_ids = ttk.Entry(frame_filtros, width=22)
+        self.entry_ids.grid(row=0, column=5, padx=5)
+
+        frame_operacoes = ttk.LabelFrame(self, text="Alterações", padding=10)
+        frame_operacoes.pack(fill='x', padx=15, pady=5)
+        self.operacoes = {} # campo -> (combo do modo, entry do valor)
+        for linha, (campo, nome) in enumerate(ajustes_lote.CAMPOS.items()):
+            modos = ajustes_lote.MODOS_QUANTIDADE if campo == 'quantidade' else ajustes_lote.MODOS
+            ttk.Label(frame_operacoes, text=f"{nome}:").grid(row=linha, column=0, padx=5, pady=2, sticky='w')
+            combo = ttk.Combobox(frame_operacoes, values=[self.NAO_ALTERAR] + [ajustes_lote.MODOS[m] for m in modos],
+                                 state='readonly', width=18)
+            combo.current(0)
+            combo.grid(row=linha, column=1, padx=5, pady=2)
+            entry = ttk.Entry(frame_operacoes, width=12)
+            entry.grid(row=linha, column=2, padx=5, pady=2)
+            self.operacoes[campo] = (combo, entry)
+        ttk.Button(frame_operacoes, text="🔍 Pré-visualizar", command=self._previsualizar).grid(row=0, column=3, padx=20)
+        ttk.Button(frame_operacoes, text="✅ Aplicar", command=self._aplicar).grid(row=1, column=3, padx=20)
+
+        self.lbl_resumo = ttk.Label(self, text="", foreground="gray")
+        self.lbl_resumo.pack(anchor='w', padx=15)
+
+        cols = ('id', 'nome', 'venda', 'custo', 'qtd')
+        self.tree_previa = ttk.Treeview(self, columns=cols, show='headings', height=10)
+        for c, titulo, largura in (('id', "ID", 50), ('nome', "Produto", 250), ('venda', "Venda (R$)", 160),
+                                   ('custo', "Custo (R$)", 160), ('qtd', "Estoque", 110)):
+            self.tree_previa.heading(c, text=titulo)
+            self.tree_previa.column(c, width=largura, anchor='w' if c == 'nome' else 'center')
+        self.tree_previa.pack(fill='both', expand=True, padx=15, pady=5)
+
+        frame_ajustes = ttk.LabelFrame(self, text="Ajustes Recentes", padding=10)
+        frame_ajustes.pack(fill='x', padx=15, pady=(5, 15))
+        cols = ('id', 'data', 'usuario', 'descricao', 'itens', 'situacao')
+        self.tree_ajustes = ttk.Treeview(frame_ajustes, columns=cols, show='headings', height=5, selectmode='browse')
+        for c, titulo, largura in (('id', "Nº", 40), ('data', "Data", 110), ('usuario', "Usuário", 120),
+                                   ('descricao', "Ajuste", 330), ('itens', "Produtos", 70), ('situacao', "Situação", 130)):
+            self.tree_ajustes.heading(c, text=titulo)
+            self.tree_ajustes.column(c, width=largura, anchor='w' if c in ('descricao', 'usuario') else 'center')
+        self.tree_ajustes.pack(side='left', fill='x', expand=True)
+        ttk.Button(frame_ajustes, text="↩️ Desfazer", command=self._desfazer).pack(side='left', padx=10)
+
+    def _exibir_opcoes(self, opcoes):
+        categorias, fornecedores = opcoes
+        self.combo_categoria['values'] = categorias
+        self.combo_fornecedor['values'] = fornecedores
+
+    def _preparar(self):
+        operacoes = {}
+        for campo, (combo, entry) in self.operacoes.items():
+            modo = next((m for m, nome in ajustes_lote.MODOS.items() if nome == combo.get()), '')
+            operacoes[campo] = (modo, entry.get())
+        try:
+            return ajustes_lote.preparar(self.combo_categoria.get(), self.combo_fornecedor.get(),
+                                         self.entry_ids.get(), operacoes)
+        except ValueError as e:
+            messagebox.showwarning("Atenção", str(e), parent=self)
+            return None
+
+    def _previsualizar(self):
+        preparado = self._preparar()
+        if preparado is None: return
+        filtros, operacao, _ = preparado
+        self.lbl_resumo.config(text="Calculando prévia...")
+        executor_tarefas.executar(
+            self, ajustes_lote.previa, filtros, operacao,
+            ao_concluir=lambda res: self._exibir_previa(filtros, operacao, res),
+            ao_falhar=lambda e: (self.lbl_resumo.config(text=""), messagebox.showerror("Erro", str(e), parent=self)),
+            nome="estoque.ajuste_previa")
+
+    def _exibir_previa(self, filtros, operacao, res):
+        self._previa_de = (filtros, operacao)
+        self.tree_previa.delete(*self.tree_previa.get_children())
+
+        def _antes_depois(antes, depois, formatar=str):
+            return formatar(antes) if antes == depois else f"{formatar(antes)} → {formatar(depois)}"
+
+        for l in res['linhas'][:self.MAX_LINHAS_PREVIA]:
+            # l = (id, nome, venda, nova_venda, custo, novo_custo, qtd, nova_qtd)
+            self.tree_previa.insert('', 'end', values=(
+                l[0], l[1], _antes_depois(l[2], l[3], dinheiro.formatar_valor),
+                _antes_depois(l[4], l[5], dinheiro.formatar_valor), _antes_depois(l[6], l[7])))
+        texto = (f"{res['produtos']} produto(s) serão alterados | Estoque a preço de venda: "
+                 f"{dinheiro.formatar(res['valor_antes'])} → {dinheiro.formatar(res['valor_depois'])}")
+        if res['produtos'] > self.MAX_LINHAS_PREVIA:
+            texto += f" (mostrando {self.MAX_LINHAS_PREVIA})"
+        self.lbl_resumo.config(text=texto)
+
+    def _aplicar(self):
+        preparado = self._preparar()
+        if preparado is None: return
+        filtros, operacao, descricao = preparado
+        if self._previa_de != (filtros, operacao):
+            # Nunca aplica sem o operador ver a prévia dos valores atuais da tela
+            self._previsualizar()
+            messagebox.showinfo("Ajuste em Lote", "Confira a prévia e clique em Aplicar novamente.", parent=self)
+            return
+        if not messagebox.askyesno("Confirmar", f"Aplicar o ajuste?\n\n{descricao}\n\n{self.lbl_resumo.cget('text')}",
+                                   parent=self):
+            return
+        executor_tarefas.executar(
+            self, ajustes_lote.aplicar, filtros, operacao, descricao, self.usuario_id,
+            ao_concluir=self._aplicado,
+            ao_falhar=lambda e: messagebox.showerror("Erro", str(e), parent=self),
+            nome="estoque.ajuste_aplicar")
+
+    def _aplicado(self, resultado):
+        ajuste_id, itens = resultado
+        self._previa_de = None
+        self.tree_previa.delete(*self.tree_previa.get_children())
+        self.lbl_resumo.config(text="")
+        messagebox.showinfo("Ajuste em Lote", f"Ajuste nº {ajuste_id} aplicado em {itens} produto(s).", parent=self)
+        self._concluido()
+
+    def _desfazer(self):
+        sel = self.tree_ajustes.selection()
+        if not sel: return
+        ajuste_id = int(sel[0])
+        if not messagebox.askyesno("Confirmar", f"Desfazer o ajuste nº {ajuste_id}?", parent=self):
+            return
+        executor_tarefas.executar(
+            self, ajustes_lote.desfazer, ajuste_id, self.usuario_id,
+            ao_concluir=lambda r: self._desfeito(ajuste_id, r),
+            ao_falhar=lambda e: messagebox.showerror("Erro", str(e), parent=self),
+            nome="estoque.ajuste_desfazer")
+
+    def _desfeito(self, ajuste_id, r):
+        msg = f"Ajuste nº {ajuste_id} desfeito.\n\nPreços restaurados: {r['restaurados']}\nEstoques revertidos: {r['estoques']}"
+        if r['mantidos']:
+            msg += f"\n\n{r['mantidos']} preço(s) foram alterados depois do ajuste e ficaram como estão."
+        messagebox.showinfo("Ajuste em Lote", msg, parent=self)
+        self._concluido()
+
+    def _concluido(self):
+        self._carregar_ajustes()
+        if self.ao_aplicar:
+            self.ao_aplicar()
+
+    def _carregar_ajustes(self):
+        executor_tarefas.executar(self, ajustes_lote.listar, ao_concluir=self._exibir_ajustes, nome="estoque.ajustes")
+
+    def _exibir_ajustes(self, ajustes):
+        self.tree_ajustes.delete(*self.tree_ajustes.get_children())
+        for a in ajustes:
+            # a = (id, data_hora, usuario, descricao, itens, desfeito_em)
+            situacao = f"Desfeito {a[5]}" if a[5] else "Aplicado"
+            self.tree_ajustes.insert('', 'end', iid=str(a[0]), values=(a[0], a[1], a[2] or '-', a[3], a[4], situacao))
\ No newline at end of file
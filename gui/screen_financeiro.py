@@ -1,12 +1,8 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from core import logic_financeiro
-# Se você usa matplotlib para gráficos, mantenha os imports
-try:
-    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-    from matplotlib.figure import Figure
-except ImportError:
-    pass
+from core import logic_financeiro, dinheiro
+from gui import executor_tarefas
+# matplotlib é importado em _desenhar_grafico, só quando o gráfico é desenhado
 
 class TelaFinanceiro(ttk.Frame):
     def __init__(self, parent):
@@ -118,39 +114,43 @@ class TelaFinanceiro(ttk.Frame):
         except Exception as e:
             messagebox.showerror("Erro", str(e))
 
+    @staticmethod
+    def _buscar_dados():
+        # Totais vêm prontos do banco; a lista é só para exibição
+        return logic_financeiro.listar_movimentacoes(), logic_financeiro.obter_totais()
+
     def carregar_dados(self):
         # Limpa tabela
         for i in self.tree.get_children(): self.tree.delete(i)
-        
+        self.tree.insert('', 'end', iid='carregando', values=('', '', 'Carregando...', '', ''))
+
+        executor_tarefas.executar(self, self._buscar_dados, ao_concluir=self._exibir_dados,
+                                  ao_falhar=self._falha_dados, nome="financeiro.movimentacoes")
+
+    def _falha_dados(self, erro):
+        self.tree.delete(*self.tree.get_children())
+        print(f"Erro ao carregar financeiro: {erro}")
+
+    def _exibir_dados(self, dados):
+        movs, (total_rec, total_desp, saldo) = dados
+        self.tree.delete(*self.tree.get_children())
         try:
-            # Carrega lista (Adapte conforme retorno do seu logic)
-            movs = logic_financeiro.listar_movimentacoes()
-            total_rec = 0
-            total_desp = 0
-            
             for m in movs:
-                # m = (id, data, desc, valor, tipo, ...)
-                valor = float(m[3])
+                # m = (id, data, desc, valor (centavos), tipo, ...)
                 tipo = m[4] # 'entrada' ou 'saida' / 'receita' ou 'despesa'
                 
                 # Formata valor
-                val_str = f"R$ {valor:.2f}"
+                val_str = dinheiro.formatar(m[3])
                 
                 self.tree.insert('', 'end', values=(m[0], m[1], m[2], val_str, tipo))
-                
-                if tipo in ['receita', 'entrada']:
-                    total_rec += valor
-                else:
-                    total_desp += valor
             
             # Atualiza Cards
-            saldo = total_rec - total_desp
-            self.lbl_receita.config(text=f"R$ {total_rec:.2f}")
-            self.lbl_despesa.config(text=f"R$ {total_desp:.2f}")
-            self.lbl_saldo.config(text=f"R$ {saldo:.2f}", foreground="#27ae60" if saldo >= 0 else "#c0392b")
+            self.lbl_receita.config(text=dinheiro.formatar(total_rec))
+            self.lbl_despesa.config(text=dinheiro.formatar(total_desp))
+            self.lbl_saldo.config(text=dinheiro.formatar(saldo), foreground="#27ae60" if saldo >= 0 else "#c0392b")
             
             # Se quiser, chame a função de desenhar gráfico aqui
-            self._desenhar_grafico(total_rec, total_desp)
+            self._desenhar_grafico(dinheiro.em_reais(total_rec), dinheiro.em_reais(total_desp))
             
         except Exception as e:
             print(f"Erro ao carregar financeiro: {e}")
@@ -3,8 +3,9 @@ from tkinter import ttk, messagebox
 import webbrowser
 import urllib.parse
 import os
-from core import logic_frota
+from core import logic_frota, servico_comprovantes
 from database import db_manager  # Importação correta do banco
+from gui import executor_tarefas
 
 class ScreenFrota(tk.Toplevel):
     def __init__(self, parent):
@@ -82,20 +83,36 @@ class ScreenFrota(tk.Toplevel):
         ttk.Button(frame_bot, text="🔄 Atualizar Listas", command=self.carregar_dados).pack(side='left')
         # O botão agora chama a nova função inteligente
         ttk.Button(frame_bot, text="🗺️ Gerar Rota (Google Maps)", command=self.gerar_rota_inteligente).pack(side='right')
+        self.btn_romaneio = ttk.Button(frame_bot, text="🖨️ Romaneio (PDF)", command=self.gerar_romaneio)
+        self.btn_romaneio.pack(side='right', padx=5)
 
         self.carregar_dados()
 
+    @staticmethod
+    def _buscar_dados():
+        return logic_frota.listar_veiculos_disponiveis(), logic_frota.listar_entregas_pendentes()
+
     def carregar_dados(self):
         # Limpa tudo
         for i in self.tree_v.get_children(): self.tree_v.delete(i)
         for i in self.tree_e.get_children(): self.tree_e.delete(i)
-        
+        self.tree_v.insert('', 'end', iid='carregando', values=('', 'Carregando...', '', ''))
+        self.tree_e.insert('', 'end', iid='carregando', values=('', 'Carregando...', '', ''))
+
+        executor_tarefas.executar(self, self._buscar_dados, ao_concluir=self._exibir_dados,
+                                  ao_falhar=lambda e: self._exibir_dados(([], [])), nome="frota.dados")
+
+    def _exibir_dados(self, dados):
+        veiculos, entregas = dados
+        self.tree_v.delete(*self.tree_v.get_children())
+        self.tree_e.delete(*self.tree_e.get_children())
+
         # Preenche Veículos
-        for v in logic_frota.listar_veiculos_disponiveis():
+        for v in veiculos:
             self.tree_v.insert('', 'end', values=v)
             
         # Preenche Entregas
-        for e in logic_frota.listar_entregas_pendentes():
+        for e in entregas:
             # Trata endereço vazio
             end = e[2] if e[2] else "---"
             self.tree_e.insert('', 'end', values=(e[0], e[1], end, e[3]))
@@ -109,6 +126,26 @@ class ScreenFrota(tk.Toplevel):
         except Exception as e:
             messagebox.showerror("Erro", str(e))
 
+    def gerar_romaneio(self):
+        """PDF com a lista das entregas selecionadas e o cupom de cada uma."""
+        sel_e = self.tree_e.selection()
+        if not sel_e:
+            messagebox.showwarning("Aviso", "Selecione pelo menos uma entrega na lista da direita.")
+            return
+        entregas = [tuple(self.tree_e.item(item)['values']) for item in sel_e]
+        self.btn_romaneio.config(state='disabled')
+        executor_tarefas.executar(self, servico_comprovantes.gerar_romaneio, entregas,
+                                  ao_concluir=self._romaneio_pronto, ao_falhar=self._falha_romaneio,
+                                  nome="frota.romaneio")
+
+    def _romaneio_pronto(self, caminho):
+        self.btn_romaneio.config(state='normal')
+        webbrowser.open(os.path.abspath(caminho))
+
+    def _falha_romaneio(self, erro):
+        self.btn_romaneio.config(state='normal')
+        messagebox.showerror("Erro", str(erro))
+
     def gerar_rota_inteligente(self):
         """
         Função unificada que gera a rota considerando a Origem da Empresa
@@ -1,10 +1,18 @@
 # gui/screen_historico.py
 import tkinter as tk
-from tkinter import ttk
+from tkinter import ttk, messagebox
 import os
-from database import db_manager as db
+from core import dinheiro, servico_comprovantes, logic_usuarios
+from core import logic_vendas as lg_vendas
+from core import logic_clientes as lg_clientes
+from gui import executor_tarefas
+from gui.campo_autocompletar import CampoAutocompletar
+from gui.tabela_paginada import TabelaPaginada
 
 class TelaHistoricoVendas(tk.Toplevel):
+    TAMANHO_PAGINA = 100
+    TODOS = "Todos"
+
     def __init__(self, parent):
         super().__init__(parent)
         self.title("Sys360 - Histórico de Vendas e Auditoria")
@@ -15,34 +23,73 @@ class TelaHistoricoVendas(tk.Toplevel):
         if os.path.exists(caminho_icone):
             self.iconbitmap(caminho_icone)
 
+        self._venda_exibida = None
+        self._filtros = {}
         self._criar_layout()
         self._carregar_vendas()
 
     def _criar_layout(self):
-        # === PARTE SUPERIOR: LISTA DE VENDAS ===
-        frame_vendas = ttk.LabelFrame(self, text="Registro de Vendas (Clique para ver detalhes)")
+        # === FILTROS (aplicados no banco) ===
+        frame_filtros = ttk.LabelFrame(self, text="Filtros", padding=5)
+        frame_filtros.pack(fill="x", padx=10, pady=(10, 0))
+
+        ttk.Label(frame_filtros, text="De:").grid(row=0, column=0, padx=5, pady=3, sticky='w')
+        self.entry_de = ttk.Entry(frame_filtros, width=12)
+        self.entry_de.grid(row=0, column=1, padx=5, pady=3, sticky='w')
+        ttk.Label(frame_filtros, text="Até:").grid(row=0, column=2, padx=5, pady=3, sticky='w')
+        self.entry_ate = ttk.Entry(frame_filtros, width=12)
+        self.entry_ate.grid(row=0, column=3, padx=5, pady=3, sticky='w')
+        ttk.Label(frame_filtros, text="(DD/MM/AAAA)", font=("Arial", 8), foreground="gray").grid(row=0, column=4, sticky='w')
+
+        ttk.Label(frame_filtros, text="Vendedor:").grid(row=0, column=5, padx=5, pady=3, sticky='w')
+        self._vendedores = {u[1]: u[0] for u in logic_usuarios.listar_todos_usuarios()} # nome -> id
+        self.combo_vendedor = ttk.Combobox(frame_filtros, values=[self.TODOS] + list(self._vendedores), state='readonly', width=22)
+        self.combo_vendedor.set(self.TODOS)
+        self.combo_vendedor.grid(row=0, column=6, padx=5, pady=3, sticky='w')
+
+        ttk.Label(frame_filtros, text="Cliente:").grid(row=1, column=0, padx=5, pady=3, sticky='w')
+        self.campo_cliente = CampoAutocompletar(frame_filtros, buscar=lg_clientes.buscar_clientes,
+                                                formatar=lambda c: f"{c[1]} - {c[2]}" if c[2] else c[1], width=30)
+        self.campo_cliente.grid(row=1, column=1, columnspan=3, padx=5, pady=3, sticky='ew')
+
+        ttk.Label(frame_filtros, text="Pagamento:").grid(row=1, column=5, padx=5, pady=3, sticky='w')
+        self.combo_pagamento = ttk.Combobox(frame_filtros, values=(self.TODOS,) + lg_vendas.METODOS_PAGAMENTO, state='readonly', width=22)
+        self.combo_pagamento.set(self.TODOS)
+        self.combo_pagamento.grid(row=1, column=6, padx=5, pady=3, sticky='w')
+
+        ttk.Label(frame_filtros, text="Total (R$) de:").grid(row=0, column=7, padx=5, pady=3, sticky='w')
+        self.entry_total_min = ttk.Entry(frame_filtros, width=10)
+        self.entry_total_min.grid(row=0, column=8, padx=5, pady=3, sticky='w')
+        ttk.Label(frame_filtros, text="a:").grid(row=1, column=7, padx=5, pady=3, sticky='e')
+        self.entry_total_max = ttk.Entry(frame_filtros, width=10)
+        self.entry_total_max.grid(row=1, column=8, padx=5, pady=3, sticky='w')
+
+        ttk.Button(frame_filtros, text="🔍 Filtrar", command=self._filtrar).grid(row=0, column=9, padx=10, pady=3)
+        ttk.Button(frame_filtros, text="🧹 Limpar", command=self._limpar_filtros).grid(row=1, column=9, padx=10, pady=3)
+        for entry in (self.entry_de, self.entry_ate, self.entry_total_min, self.entry_total_max):
+            entry.bind('<Return>', lambda e: self._filtrar())
+
+        # === PARTE SUPERIOR: LISTA DE VENDAS (carrega por páginas conforme a rolagem) ===
+        self.frame_vendas = frame_vendas = ttk.LabelFrame(self, text="Registro de Vendas (Clique para ver detalhes)")
         frame_vendas.pack(fill="both", expand=True, padx=10, pady=5)
 
-        cols = ('id', 'data', 'vendedor', 'cliente', 'total')
-        self.tree_vendas = ttk.Treeview(frame_vendas, columns=cols, show='headings', selectmode="browse")
-        
-        self.tree_vendas.heading('id', text="ID")
-        self.tree_vendas.heading('data', text="Data/Hora")
-        self.tree_vendas.heading('vendedor', text="Vendedor")
-        self.tree_vendas.heading('cliente', text="Cliente")
-        self.tree_vendas.heading('total', text="Total (R$)")
-
-        self.tree_vendas.column('id', width=50, anchor='center')
-        self.tree_vendas.column('data', width=150, anchor='center')
-        self.tree_vendas.column('vendedor', width=200)
-        self.tree_vendas.column('cliente', width=200)
-        self.tree_vendas.column('total', width=100, anchor='e')
-
-        self.tree_vendas.pack(side="left", fill="both", expand=True)
-        
-        sb_v = ttk.Scrollbar(frame_vendas, orient="vertical", command=self.tree_vendas.yview)
-        sb_v.pack(side="right", fill="y")
-        self.tree_vendas.configure(yscrollcommand=sb_v.set)
+        cols = ('id', 'data', 'vendedor', 'cliente', 'total', 'pagto')
+        headers = {'id': "ID", 'data': "Data/Hora", 'vendedor': "Vendedor", 'cliente': "Cliente", 'total': "Total (R$)", 'pagto': "Pagamento"}
+        widths = {'id': 50, 'data': 150, 'vendedor': 200, 'cliente': 200, 'total': 100, 'pagto': 90}
+
+        self.tabela = TabelaPaginada(
+            frame_vendas, cols, headers, widths,
+            buscar_pagina=self._buscar_pagina,
+            chave=lambda v: (v[1], v[0]), # Mesma ordem do banco: data_hora, id (decrescente)
+            formatar=self._formatar_venda,
+            tamanho_pagina=self.TAMANHO_PAGINA,
+            centralizar=('id', 'data', 'pagto'),
+            selectmode="browse"
+        )
+        self.tabela.pack(fill="both", expand=True)
+        self.tabela.ao_carregar = self._atualizar_contagem
+        self.tree_vendas = self.tabela.tree
+        self.tree_vendas.column('total', anchor='e')
 
         # Evento de clique
         self.tree_vendas.bind("<<TreeviewSelect>>", self._carregar_itens)
@@ -61,30 +108,106 @@ class TelaHistoricoVendas(tk.Toplevel):
 
         self.tree_itens.pack(fill="both", expand=True)
 
+        frame_botoes = ttk.Frame(frame_detalhes)
+        frame_botoes.pack(fill='x', pady=(5, 0))
+        self.btn_reimprimir = ttk.Button(frame_botoes, text="🧾 Reimprimir Comprovante", command=self._reimprimir)
+        self.btn_reimprimir.pack(side='right')
+        self.btn_lote_dia = ttk.Button(frame_botoes, text="📄 Comprovantes do Dia (PDF)", command=self._comprovantes_do_dia)
+        self.btn_lote_dia.pack(side='right', padx=5)
+
     def _carregar_vendas(self):
-        # Limpa tabela
-        for i in self.tree_vendas.get_children():
-            self.tree_vendas.delete(i)
-            
-        vendas = db.listar_vendas_detalhadas()
-        for v in vendas:
-            # v = (id, data, vendedor, cliente, total)
-            cliente_nome = v[3] if v[3] else "Consumidor Final"
-            self.tree_vendas.insert('', 'end', values=(v[0], v[1], v[2], cliente_nome, f"R$ {v[4]:.2f}"), text=v[0])
+        self.tree_itens.delete(*self.tree_itens.get_children())
+        self._venda_exibida = None
+        self.tabela.recarregar()
+
+    def _buscar_pagina(self, apos, limite):
+        # Roda fora da thread do Tk: vendas da página + itens de todas elas
+        return lg_vendas.historico_pagina(self._filtros, apos, limite)
+
+    @staticmethod
+    def _formatar_venda(v):
+        # v = (id, data, vendedor, cliente, total, metodo_pagamento, itens)
+        return (v[0], v[1], v[2], v[3] if v[3] else "Consumidor Final", dinheiro.formatar(v[4]), v[5])
+
+    def _atualizar_contagem(self):
+        qtd = len(self.tree_vendas.get_children())
+        texto = f"Registro de Vendas: {qtd} carregada(s)"
+        if self._filtros:
+            texto += " (filtrado)"
+        self.frame_vendas.config(text=texto + " - clique para ver detalhes")
+
+    def _filtrar(self):
+        vendedor = self.combo_vendedor.get()
+        pagamento = self.combo_pagamento.get()
+        if self.campo_cliente.get().strip() and self.campo_cliente.id_selecionado() is None:
+            messagebox.showwarning("Cliente", "Escolha o cliente na lista de sugestões (ou deixe em branco).", parent=self)
+            return
+        try:
+            self._filtros = lg_vendas.validar_filtros_historico(
+                self.entry_de.get(), self.entry_ate.get(),
+                self._vendedores.get(vendedor) if vendedor != self.TODOS else None,
+                self.campo_cliente.id_selecionado(),
+                pagamento if pagamento != self.TODOS else None,
+                self.entry_total_min.get(), self.entry_total_max.get())
+        except ValueError as e:
+            messagebox.showwarning("Filtros", str(e), parent=self)
+            return
+        self._carregar_vendas()
+
+    def _limpar_filtros(self):
+        for entry in (self.entry_de, self.entry_ate, self.entry_total_min, self.entry_total_max):
+            entry.delete(0, 'end')
+        self.campo_cliente.limpar()
+        self.combo_vendedor.set(self.TODOS)
+        self.combo_pagamento.set(self.TODOS)
+        self._filtros = {}
+        self._carregar_vendas()
 
     def _carregar_itens(self, event):
         selection = self.tree_vendas.selection()
         if not selection: return
+        venda = self.tabela.linha(selection[0])
+        if venda is None: return # Linha "Carregando..."
+
+        # Itens vieram junto com a página: nenhuma consulta por clique
+        self.tree_itens.delete(*self.tree_itens.get_children())
+        self._venda_exibida = venda[0]
+        self._exibir_itens(venda[0], venda[6])
+
+    def _reimprimir(self):
+        venda_id = self._venda_exibida
+        if venda_id is None:
+            messagebox.showwarning("Aviso", "Selecione uma venda.")
+            return
+        # Registra antes de enfileirar: o PDF pode ficar pronto antes do retorno da tarefa
+        self._root().abrir_comprovante_quando_pronto(venda_id)
+        executor_tarefas.executar(self, servico_comprovantes.reimprimir, venda_id,
+                                  ao_falhar=lambda e: messagebox.showerror("Erro", str(e)),
+                                  nome="historico.reimprimir")
+
+    def _comprovantes_do_dia(self):
+        self.btn_lote_dia.config(state='disabled', text="Gerando...")
+        executor_tarefas.executar(self, servico_comprovantes.gerar_comprovantes_do_dia,
+                                  ao_concluir=self._lote_pronto, ao_falhar=self._falha_lote,
+                                  nome="historico.comprovantes_do_dia")
 
-        # Limpa itens antigos
-        for i in self.tree_itens.get_children():
-            self.tree_itens.delete(i)
+    def _lote_pronto(self, resultado):
+        caminhos, paginas, por_segundo = resultado
+        self.btn_lote_dia.config(state='normal', text="📄 Comprovantes do Dia (PDF)")
+        messagebox.showinfo("Comprovantes do Dia", f"{paginas} página(s) geradas ({por_segundo:.0f} páginas/s).\n"
+                                                   + "\n".join(caminhos))
+        try:
+            import webbrowser
+            webbrowser.open(os.path.abspath(caminhos[0]))
+        except: pass
 
-        # Pega ID da venda (salvo na propriedade text ou values)
-        item = self.tree_vendas.item(selection[0])
-        venda_id = item['values'][0] # ID é a primeira coluna
+    def _falha_lote(self, erro):
+        self.btn_lote_dia.config(state='normal', text="📄 Comprovantes do Dia (PDF)")
+        messagebox.showerror("Erro", str(erro))
 
-        itens = db.listar_itens_da_venda(venda_id)
+    def _exibir_itens(self, venda_id, itens):
+        if venda_id != self._venda_exibida:
+            return # Outra venda foi selecionada enquanto carregava
         for i in itens:
             # i = (nome, qtd, unit, subtotal)
-            self.tree_itens.insert('', 'end', values=(i[0], i[1], f"R$ {i[2]:.2f}", f"R$ {i[3]:.2f}"))
\ No newline at end of file
+            self.tree_itens.insert('', 'end', values=(i[0], i[1], dinheiro.formatar(i[2]), dinheiro.formatar(i[3])))
\ No newline at end of file
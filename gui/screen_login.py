@@ -1,7 +1,8 @@
 import tkinter as tk
 from tkinter import messagebox, ttk
-from database import db_manager
-import bcrypt
+from core import metricas_inicio
+from core import logic_usuarios as lg_usuarios
+from gui import executor_tarefas
 import os
 
 class TelaLogin(tk.Toplevel):
@@ -14,6 +15,7 @@ class TelaLogin(tk.Toplevel):
         # Variável de retorno
         self.usuario_logado = None
         self.parent = parent
+        self._verificando = False
 
         # Carregar Ícone da Janela
         try:
@@ -23,12 +25,23 @@ class TelaLogin(tk.Toplevel):
 
         self._criar_interface_moderna()
         self._centralizar_janela()
+        self.bind('<Map>', self._ao_exibir)
+
+        # Primeira execução: cria o admin padrão sem travar a tela (o hash é lento)
+        executor_tarefas.ExecutorTarefas.obter(self).executar(
+            lg_usuarios.criar_primeiro_admin, nome="usuarios.admin_padrao")
 
         # Torna Modal
         self.transient(parent)
         self.grab_set()
         self.wait_window(self)
 
+    def _ao_exibir(self, event):
+        # Primeira pintura do login (o after_idle roda depois do redesenho)
+        if event.widget is self:
+            self.unbind('<Map>')
+            self.after_idle(metricas_inicio.marcar, "Tela de login exibida")
+
     def _centralizar_janela(self):
         self.update_idletasks()
         width = self.winfo_width()
@@ -100,6 +113,8 @@ class TelaLogin(tk.Toplevel):
         self.btn_entrar.bind("<Leave>", lambda e: self.btn_entrar.config(bg="#2980b9"))
 
     def verificar_login(self):
+        if self._verificando:
+            return
         login = self.entry_user.get()
         senha = self.entry_pass.get()
 
@@ -113,20 +128,23 @@ class TelaLogin(tk.Toplevel):
             self.destroy()
             return
 
-        try:
-            usuario_banco = db_manager.buscar_usuario_por_login(login)
-            if usuario_banco:
-                senha_hash = usuario_banco[3]
-                # Verifica hash ou senha simples (para compatibilidade com admin antigo)
-                if senha_hash == "admin" and senha == "admin": # Caso o hash no banco seja texto plano
-                     self.usuario_logado = usuario_banco
-                     self.destroy()
-                elif bcrypt.checkpw(senha.encode('utf-8'), senha_hash.encode('utf-8')):
-                    self.usuario_logado = usuario_banco
-                    self.destroy()
-                else:
-                    messagebox.showerror("Erro", "Senha incorreta.")
-            else:
-                messagebox.showerror("Erro", "Usuário não encontrado.")
-        except Exception as e:
-            messagebox.showerror("Erro Crítico", f"Falha no login: {e}")
\ No newline at end of file
+        # bcrypt é lento de propósito: verifica em segundo plano e mantém a tela viva
+        self._verificando = True
+        self.btn_entrar.config(text="VERIFICANDO...", state='disabled', cursor="watch")
+        executor_tarefas.executar(self, lg_usuarios.verificar_login, login, senha,
+                                  ao_concluir=self._login_ok, ao_falhar=self._login_falhou,
+                                  nome="usuarios.login")
+
+    def _login_ok(self, usuario):
+        self.usuario_logado = usuario
+        self.destroy()
+
+    def _login_falhou(self, erro):
+        self._verificando = False
+        self.btn_entrar.config(text="ACESSAR SISTEMA", state='normal', cursor="hand2")
+        if isinstance(erro, ValueError):
+            messagebox.showerror("Erro", str(erro))
+        else:
+            messagebox.showerror("Erro Crítico", f"Falha no login: {erro}")
+        self.entry_pass.delete(0, 'end')
+        self.entry_pass.focus()
\ No newline at end of file
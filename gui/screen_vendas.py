@@ -4,10 +4,12 @@ import os
 from core import logic_vendas as lg_vendas
 from core import logic_produtos as lg_produtos
 from core import logic_clientes as lg_clientes
-from core import gerador_pdf
+from core import dinheiro, servico_comprovantes
+from core.carrinho import Carrinho
+from gui.campo_autocompletar import CampoAutocompletar
 
 class TelaPagamento(tk.Toplevel):
-    """Janela popup para escolher forma de pagamento e calcular troco."""
+    """Janela popup para escolher forma de pagamento e calcular troco (valores em centavos)."""
     def __init__(self, parent, total_venda, on_confirmar):
         super().__init__(parent)
         self.title("Finalizar Pagamento")
@@ -21,7 +23,7 @@ class TelaPagamento(tk.Toplevel):
         
     def _criar_widgets(self):
         ttk.Label(self, text="Total a Pagar", font=("Arial", 10)).pack(pady=(20,5))
-        lbl_total = ttk.Label(self, text=f"R$ {self.total_venda:.2f}", font=("Arial", 22, "bold"), foreground="blue")
+        lbl_total = ttk.Label(self, text=dinheiro.formatar(self.total_venda), font=("Arial", 22, "bold"), foreground="blue")
         lbl_total.pack(pady=(0, 20))
         
         # Forma de Pagamento
@@ -40,7 +42,7 @@ class TelaPagamento(tk.Toplevel):
         ttk.Label(self, text="Valor Recebido (R$):").pack(anchor='w', padx=40, pady=(20,5))
         self.entry_pago = ttk.Entry(self, font=("Arial", 12))
         self.entry_pago.pack(ipadx=10, ipady=5)
-        self.entry_pago.insert(0, f"{self.total_venda:.2f}") # Sugere o valor total
+        self.entry_pago.insert(0, dinheiro.formatar_valor(self.total_venda)) # Sugere o valor total
         self.entry_pago.bind('<KeyRelease>', lambda e: self._atualizar_troco())
         self.entry_pago.bind('<FocusOut>', lambda e: self._atualizar_troco())
         
@@ -57,9 +59,9 @@ class TelaPagamento(tk.Toplevel):
 
     def _atualizar_troco(self):
         try:
-            pago = float(self.entry_pago.get().replace(',', '.'))
-        except:
-            pago = 0.0
+            pago = dinheiro.para_centavos(self.entry_pago.get())
+        except ValueError:
+            pago = 0
             
         # Se não for dinheiro, não tem troco (teoricamente)
         if self.metodo_var.get() != "Dinheiro":
@@ -70,12 +72,12 @@ class TelaPagamento(tk.Toplevel):
         if troco < 0:
             self.lbl_troco.config(text="Falta R$", foreground="red")
         else:
-            self.lbl_troco.config(text=f"R$ {troco:.2f}", foreground="green")
+            self.lbl_troco.config(text=dinheiro.formatar(troco), foreground="green")
 
     def _confirmar(self):
         try:
-            pago = float(self.entry_pago.get().replace(',', '.'))
-        except:
+            pago = dinheiro.para_centavos(self.entry_pago.get())
+        except ValueError:
             messagebox.showerror("Erro", "Valor pago inválido.")
             return
 
@@ -85,7 +87,7 @@ class TelaPagamento(tk.Toplevel):
             messagebox.showwarning("Atenção", "Valor recebido menor que o total!")
             return
             
-        troco = pago - self.total_venda if metodo == "Dinheiro" else 0.0
+        troco = pago - self.total_venda if metodo == "Dinheiro" else 0
         
         # Retorna os dados para a tela principal
         self.on_confirmar(metodo, pago, troco)
@@ -100,8 +102,8 @@ class TelaVendas(tk.Toplevel):
         self.parent = parent
         self.usuario_atual = parent.usuario_logado
         
-        self.carrinho = []
-        self.valor_total_venda = 0.0
+        self.carrinho = Carrinho()
+        self.valor_total_venda = 0 # Centavos
 
         try:
             caminho_icone = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "assets", "Estoque360.ico"))
@@ -123,11 +125,12 @@ class TelaVendas(tk.Toplevel):
         painel_direito.pack(side='right', fill='y')
         
         # Cliente
-        ttk.Label(painel_direito, text="Selecione o Cliente:").pack(anchor="w")
-        clientes_db = lg_clientes.listar_todos_clientes()
-        lista_clientes = [f"{c[0]} - {c[1]}" for c in clientes_db]
-        self.combo_cliente = ttk.Combobox(painel_direito, values=lista_clientes)
-        self.combo_cliente.pack(fill='x', pady=(0, 20))
+        # Cliente: sugestões por nome ou CPF/CNPJ enquanto digita (vazio = Consumidor Final)
+        ttk.Label(painel_direito, text="Cliente (nome ou CPF/CNPJ):").pack(anchor="w")
+        self.campo_cliente = CampoAutocompletar(
+            painel_direito, buscar=lg_clientes.buscar_clientes,
+            formatar=lambda c: f"{c[1]} - {c[2]}" if c[2] else c[1])
+        self.campo_cliente.pack(fill='x', pady=(0, 20))
 
         # Frete
         frame_frete = ttk.LabelFrame(painel_direito, text="Entrega / Frete")
@@ -149,10 +152,12 @@ class TelaVendas(tk.Toplevel):
         frame_topo = ttk.LabelFrame(painel_esquerdo, text="Adicionar Produto")
         frame_topo.pack(fill='x', pady=(0, 10))
 
-        ttk.Label(frame_topo, text='ID:').grid(row=0, column=0, padx=5, pady=10)
-        self.entry_id_produto = ttk.Entry(frame_topo, width=15)
+        ttk.Label(frame_topo, text='Código / ID:').grid(row=0, column=0, padx=5, pady=10)
+        self.entry_id_produto = ttk.Entry(frame_topo, width=18)
         self.entry_id_produto.grid(row=0, column=1, padx=5)
-        self.entry_id_produto.bind('<Return>', lambda e: self.entry_qtd.focus())
+        # Leitor de código de barras termina com Enter: inclui direto com a Qtd atual (padrão 1)
+        self.entry_id_produto.bind('<Return>', lambda e: self._adicionar_item())
+        self.entry_id_produto.focus()
 
         ttk.Button(frame_topo, text='?', width=3, command=self._mostrar_ajuda_ids).grid(row=0, column=2, padx=2)
 
@@ -211,9 +216,14 @@ class TelaVendas(tk.Toplevel):
         qtd_str = self.entry_qtd.get()
         try:
             prod_tupla, qtd_int = lg_vendas.validar_produto_para_venda(id_str, qtd_str)
-            subtotal = prod_tupla[3] * qtd_int
-            self.carrinho.append((prod_tupla[0], prod_tupla[1], qtd_int, prod_tupla[3], subtotal))
-            self.tree_carrinho.insert('', 'end', values=(prod_tupla[0], prod_tupla[1], qtd_int, f"R${prod_tupla[3]:.2f}", f"R${subtotal:.2f}"))
+            # Mesmo produto de novo: soma na linha que já existe
+            item, nova_linha = self.carrinho.adicionar(prod_tupla, qtd_int)
+            valores = (item.produto_id, item.nome, item.quantidade, dinheiro.formatar(item.preco_unitario), dinheiro.formatar(item.subtotal))
+            if nova_linha:
+                self.tree_carrinho.insert('', 'end', iid=item.iid, values=valores)
+            else:
+                self.tree_carrinho.item(item.iid, values=valores)
+            self.tree_carrinho.see(item.iid)
             self._atualizar_total()
             self.entry_id_produto.delete(0, 'end'); self.entry_qtd.delete(0, 'end'); self.entry_qtd.insert(0, "1")
             self.entry_id_produto.focus()
@@ -223,28 +233,37 @@ class TelaVendas(tk.Toplevel):
     def _remover_item_carrinho(self):
         sel = self.tree_carrinho.selection()
         if not sel: return
-        idx = self.tree_carrinho.index(sel[0])
+        item = self.carrinho.por_iid(sel[0])
+        if item: self.carrinho.remover(item.produto_id)
         self.tree_carrinho.delete(sel[0])
-        if idx < len(self.carrinho): del self.carrinho[idx]
         self._atualizar_total()
 
+    def _valor_frete(self):
+        """Frete digitado, em centavos (0 se vazio ou inválido)."""
+        try: return max(0, dinheiro.para_centavos(self.entry_frete.get()))
+        except ValueError: return 0
+
     def _atualizar_total(self):
-        total_prods = sum(item[4] for item in self.carrinho)
-        try: val_frete = float(self.entry_frete.get().replace(',', '.'))
-        except: val_frete = 0.0
-        self.valor_total_venda = total_prods + val_frete
-        self.lbl_total_grande.config(text=f"TOTAL: R${self.valor_total_venda:.2f}")
+        # O carrinho mantém o total dos produtos a cada inclusão/remoção
+        self.valor_total_venda = self.carrinho.total + self._valor_frete()
+        self.lbl_total_grande.config(text=f"TOTAL: {dinheiro.formatar(self.valor_total_venda)}")
 
     def _mostrar_ajuda_ids(self):
-        prods = lg_produtos.listar_todos_produtos()
-        msg = "\n".join([f"{p[0]} - {p[1]} (Est: {p[2]})" for p in prods[:15]])
-        messagebox.showinfo("Produtos (Top 15)", msg)
+        # Com texto no campo, busca por nome/código; senão, os 15 primeiros por nome
+        termo = self.entry_id_produto.get().strip()
+        prods = lg_produtos.buscar_produtos(termo)[:15] if termo else lg_produtos.listar_produtos_pagina(limite=15)
+        msg = "\n".join([f"{p[0]} - {p[1]}{f' [{p[8]}]' if p[8] else ''} (Est: {p[2]})" for p in prods])
+        messagebox.showinfo(f"Produtos: {termo}" if termo else "Produtos (Top 15)", msg or "Nenhum produto encontrado.", parent=self)
 
     # --- NOVA LÓGICA DE PAGAMENTO ---
     def _abrir_tela_pagamento(self):
         if not self.carrinho:
             messagebox.showinfo("Vazio", "Carrinho vazio!", parent=self)
             return
+        if self.campo_cliente.id_selecionado() is None and self.campo_cliente.get().strip():
+            messagebox.showwarning("Cliente", "Escolha o cliente na lista de sugestões (ou deixe em branco para Consumidor Final).", parent=self)
+            self.campo_cliente.focus()
+            return
         
         # Abre o popup e passa a função _processar_venda_final como callback
         TelaPagamento(self, self.valor_total_venda, self._processar_venda_final)
@@ -253,32 +272,21 @@ class TelaVendas(tk.Toplevel):
         try:
             # Pega dados básicos
             usuario_id = self.usuario_atual[0]
-            cli_sel = self.combo_cliente.get()
-            cli_id = int(cli_sel.split(' - ')[0]) if cli_sel and ' - ' in cli_sel else None
-            try: val_frete = float(self.entry_frete.get().replace(',', '.'))
-            except: val_frete = 0.0
+            cli_id = self.campo_cliente.id_selecionado()
+            val_frete = self._valor_frete()
 
             # Chama Lógica (Agora com dados de Pagto)
             venda_id = lg_vendas.processar_venda_completa(
-                usuario_id, self.carrinho, cli_id, val_frete,
+                usuario_id, self.carrinho.como_lista(), cli_id, val_frete,
                 metodo_pagto, valor_pago, troco
             )
             
-            # Gera PDF (Agora com dados de Pagto)
-            nome_cli = cli_sel.split(' - ')[1] if cli_id else "Consumidor Final"
-            nome_vend = self.usuario_atual[1]
-            
-            path_pdf = gerador_pdf.gerar_cupom_pdf(
-                venda_id, self.carrinho, self.valor_total_venda, nome_cli, val_frete, 
-                nome_vend, metodo_pagto, valor_pago, troco
-            )
+            # O comprovante entrou na fila junto com a venda: o serviço gera o PDF
+            # em segundo plano e a App abre quando ficar pronto
+            servico_comprovantes.acordar()
+            self.parent.abrir_comprovante_quando_pronto(venda_id)
 
-            messagebox.showinfo("Sucesso", f"Venda {venda_id} realizada!\nPDF: {path_pdf}")
-            
-            try:
-                import webbrowser
-                webbrowser.open(os.path.abspath(path_pdf))
-            except: pass
+            messagebox.showinfo("Sucesso", f"Venda {venda_id} realizada!\nO comprovante sai assim que estiver pronto.")
             
             self.destroy()
 
@@ -0,0 +1,195 @@
+import logging
+import tkinter as tk
+from tkinter import ttk
+from bisect import bisect_left
+
+from gui import executor_tarefas
+
+class TabelaPaginada(ttk.Frame):
+    """
+    Treeview com rolagem que carrega os dados sob demanda, uma página por vez
+    (paginação por chave / keyset), em vez de inserir a tabela inteira.
+
+    buscar_pagina(apos, limite) -> linhas ordenadas, começando depois da chave
+        'apos' (None na primeira página). Deve usar a mesma ordem de chave().
+    chave(linha)    -> chave de ordenação da linha (ex.: (nome, id)).
+    formatar(linha) -> tupla de valores exibidos nas colunas.
+    id_linha(linha) -> identificador único da linha (vira o iid do Treeview).
+
+    As páginas são buscadas em segundo plano (gui.executor_tarefas); enquanto
+    isso uma linha "Carregando..." fica no fim da tabela. Se a busca falhar
+    (ex.: banco travado), uma linha de erro toma o lugar dela e a página é
+    pedida de novo quando o usuário rolar, clicar nessa linha ou recarregar.
+
+    Depois de um cadastro/edição/exclusão use inserir_linha / atualizar_linha /
+    remover_linha: só a linha afetada é mexida, sem recarregar a tabela.
+    """
+
+    TAMANHO_PAGINA = 200
+    LIMIAR_ROLAGEM = 0.9 # Fração rolada que dispara a próxima página
+    IID_CARREGANDO = '__carregando__'
+    IID_ERRO = '__erro__'
+
+    def __init__(self, parent, colunas, cabecalhos, larguras, buscar_pagina, chave, formatar,
+                 id_linha=lambda linha: linha[0], tamanho_pagina=None, centralizar=(), **tree_kw):
+        super().__init__(parent)
+        self.buscar_pagina = buscar_pagina
+        self.chave = chave
+        self.formatar = formatar
+        self.id_linha = id_linha
+        self.tamanho_pagina = tamanho_pagina or self.TAMANHO_PAGINA
+
+        self._chaves = [] # Chaves das linhas carregadas, na ordem exibida
+        self._linhas = {} # iid -> linha original
+        self._fim = False
+        self._ordenada = True # False quando exibe lista fixa (ex.: busca por relevância)
+        self._carregando = False
+        self._erro = False # Última página falhou: espera o usuário pedir de novo
+        self._geracao = 0 # Descarta páginas pedidas antes de um recarregar()
+        self.ao_carregar = None # Callback opcional após cada página
+
+        self.tree = ttk.Treeview(self, columns=colunas, show='headings', **tree_kw)
+        for c in colunas:
+            self.tree.heading(c, text=cabecalhos[c])
+            self.tree.column(c, width=larguras[c], anchor='center' if c in centralizar else 'w')
+
+        self.scrolly = ttk.Scrollbar(self, orient='vertical', command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._ao_rolar)
+
+        self.tree.pack(side='left', fill='both', expand=True)
+        self.scrolly.pack(side='right', fill='y')
+
+        # Rolar de propósito (roda do mouse, barra) ou clicar na linha de erro tenta de novo
+        for evento in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            self.tree.bind(evento, self._tentar_de_novo, add='+')
+        self.scrolly.bind('<Button-1>', self._tentar_de_novo, add='+')
+        self.tree.tag_configure('erro', foreground='red')
+        self.tree.tag_bind('erro', '<Button-1>', self._tentar_de_novo)
+
+    # --- Carga ---
+    def recarregar(self, buscar_pagina=None):
+        """Limpa e carrega a primeira página (opcionalmente trocando a fonte de dados)."""
+        if buscar_pagina is not None:
+            self.buscar_pagina = buscar_pagina
+        self._limpar()
+        self._carregar_proxima_pagina()
+
+    def mostrar_linhas(self, linhas):
+        """Exibe uma lista fixa (ex.: resultado de busca), sem paginação."""
+        self._limpar()
+        self._ordenada = False
+        for linha in linhas:
+            self._anexar(linha)
+        self._fim = True
+
+    def _limpar(self):
+        self._geracao += 1
+        self._carregando = False
+        self.tree.delete(*self.tree.get_children())
+        self._chaves.clear()
+        self._linhas.clear()
+        self._fim = False
+        self._erro = False
+        self._ordenada = True
+
+    def _carregar_proxima_pagina(self):
+        if self._fim or self._carregando:
+            return
+        self._carregando = True
+        geracao = self._geracao
+        apos = self._chaves[-1] if self._chaves else None
+        self.tree.insert('', 'end', iid=self.IID_CARREGANDO,
+                         values=("Carregando...",) + ("",) * (len(self.tree['columns']) - 1))
+        executor_tarefas.executar(
+            self, self.buscar_pagina, apos, self.tamanho_pagina,
+            ao_concluir=lambda linhas: self._pagina_carregada(geracao, linhas),
+            ao_falhar=lambda e: self._pagina_falhou(geracao, e),
+            nome="tabela.pagina")
+
+    def _pagina_carregada(self, geracao, linhas):
+        if geracao != self._geracao:
+            return # Tabela foi recarregada/trocada enquanto a página vinha
+        self._carregando = False
+        if self.tree.exists(self.IID_CARREGANDO):
+            self.tree.delete(self.IID_CARREGANDO)
+        for linha in linhas:
+            if str(self.id_linha(linha)) not in self._linhas:
+                self._anexar(linha)
+        if len(linhas) < self.tamanho_pagina:
+            self._fim = True
+        if self.ao_carregar:
+            self.ao_carregar()
+
+    def _pagina_falhou(self, geracao, erro):
+        # Não marca o fim: a tabela continua paginável depois de uma nova tentativa
+        if geracao != self._geracao:
+            return
+        logging.warning(f"Falha ao carregar página da tabela: {erro}")
+        self._carregando = False
+        self._erro = True
+        if self.tree.exists(self.IID_CARREGANDO):
+            self.tree.delete(self.IID_CARREGANDO)
+        texto = f"⚠️ Erro ao carregar: {erro} (role ou clique aqui para tentar de novo)"
+        self.tree.insert('', 'end', iid=self.IID_ERRO, tags=('erro',),
+                         values=(texto,) + ("",) * (len(self.tree['columns']) - 1))
+
+    def _tentar_de_novo(self, event=None):
+        if not self._erro:
+            return
+        self._erro = False
+        if self.tree.exists(self.IID_ERRO):
+            self.tree.delete(self.IID_ERRO)
+        self.after_idle(self._carregar_proxima_pagina)
+
+    def _anexar(self, linha):
+        iid = str(self.id_linha(linha))
+        self._linhas[iid] = linha
+        self._chaves.append(self.chave(linha))
+        self.tree.insert('', 'end', iid=iid, values=self.formatar(linha))
+
+    def _ao_rolar(self, primeiro, ultimo):
+        self.scrolly.set(primeiro, ultimo)
+        if not self._fim and not self._erro and float(ultimo) >= self.LIMIAR_ROLAGEM:
+            # after_idle: não carrega dentro do callback de rolagem do Tk
+            self.after_idle(self._carregar_proxima_pagina)
+
+    # --- Atualização pontual ---
+    def linha(self, iid):
+        """Linha original (tupla do banco) de um iid exibido."""
+        return self._linhas.get(str(iid))
+
+    def inserir_linha(self, linha):
+        """Insere na posição ordenada, se ela estiver dentro do trecho já carregado."""
+        k = self.chave(linha)
+        if not self._fim and (not self._chaves or k > self._chaves[-1]):
+            return # Aparece quando a página dela for carregada
+        pos = bisect_left(self._chaves, k) if self._ordenada else len(self._chaves)
+        iid = str(self.id_linha(linha))
+        self._chaves.insert(pos, k)
+        self._linhas[iid] = linha
+        self.tree.insert('', pos, iid=iid, values=self.formatar(linha))
+
+    def atualizar_linha(self, linha):
+        """Atualiza a linha no lugar (reposiciona se a chave de ordenação mudou)."""
+        iid = str(self.id_linha(linha))
+        antiga = self._linhas.get(iid)
+        if antiga is not None and (not self._ordenada or self.chave(antiga) == self.chave(linha)):
+            self._linhas[iid] = linha
+            self.tree.item(iid, values=self.formatar(linha))
+            return
+        selecionada = iid in self.tree.selection()
+        self.remover_linha(iid)
+        self.inserir_linha(linha)
+        if selecionada and self.tree.exists(iid):
+            self.tree.selection_set(iid)
+
+    def remover_linha(self, iid):
+        iid = str(iid)
+        linha = self._linhas.pop(iid, None)
+        if linha is None:
+            return
+        k = self.chave(linha)
+        pos = bisect_left(self._chaves, k) if self._ordenada else self._chaves.index(k)
+        if pos < len(self._chaves) and self._chaves[pos] == k:
+            del self._chaves[pos]
+        self.tree.delete(iid)
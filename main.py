@@ -1,3 +1,4 @@
+from core import metricas_inicio # Primeiro import: marca o início da linha do tempo
 import sys
 import os
 import logging
@@ -11,18 +12,33 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from gui.app_main import App
 from gui.screen_login import TelaLogin
+from gui.executor_tarefas import ExecutorTarefas
 from database import db_manager
+from core import servico_comprovantes, logic_estoque
+
+ATRASO_FOTO_ESTOQUE_MS = 500 # depois que a janela de login aparece
 
 def main():
+    logger_config.configurar_logger()
+    metricas_inicio.marcar("Imports concluídos")
     try:
         # 1. Inicializa Banco
         db_manager.inicializar_db()
         logger.info("Banco de dados inicializado.")
+        metricas_inicio.marcar("Banco inicializado")
+
+        # Comprovantes pendentes (inclusive de sessões anteriores) saem em segundo plano
+        servico_comprovantes.iniciar()
 
         # 2. Cria a App Principal (mas deixa invisível)
         app = App()
         app.withdraw() 
 
+        # Foto do saldo de estoque se a última ficou velha (saldo em data = foto + movimentos).
+        # Em segundo plano, com o login já na tela; o executor registra o tempo gasto.
+        app.after(ATRASO_FOTO_ESTOQUE_MS, lambda: ExecutorTarefas.obter(app).executar(
+            logic_estoque.fotografar_se_necessario, nome="Foto do estoque"))
+
         # 3. Abre Login como janela modal (bloqueia o resto até fechar)
         # Passamos 'app' como pai para que o Toplevel saiba a quem pertence
         login_window = TelaLogin(app) 
@@ -42,10 +58,15 @@ def main():
             if hasattr(app, 'lbl_usuario'):
                 app.lbl_usuario.config(text=f"Usuário: {app.usuario_logado[1]}")
 
+            # Tema só agora: não atrasa a abertura do login
+            app.aplicar_tema()
+
             # MÁGICA AQUI: Mostra a janela principal e maximiza
             app.deiconify() 
             app.state('zoomed') 
             
+            app.after_idle(metricas_inicio.marcar, "Janela principal exibida")
+
             # Inicia o sistema
             app.mainloop()
         else:
@@ -55,6 +76,10 @@ def main():
 
     except Exception as e:
         logger.critical(f"Erro fatal no main: {e}", exc_info=True)
+    finally:
+        servico_comprovantes.parar()
+        ExecutorTarefas.encerrar()
+        db_manager.fechar_conexoes()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
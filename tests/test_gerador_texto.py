@@ -0,0 +1,31 @@
+"""Cupom de texto / ESC/POS nas larguras aceitas pela tela de configuração."""
+import unittest
+
+from core import gerador_texto, servico_comprovantes
+
+VENDA = (7, '18/10/2026 12:00', 'Cliente de Teste', 'Vendedor', 12550, 500, 'Dinheiro', 20000, 7450)
+ITENS = [(1, 'Produto com um nome bem comprido para o cupom', 2, 3025, 6050),
+         (2, 'Outro', 10, 600, 6000)]
+
+
+class TestLarguraCupom(unittest.TestCase):
+    def test_largura_minima(self):
+        colunas = gerador_texto.COLUNAS_MINIMO
+        texto = gerador_texto.cupom_texto(VENDA, ITENS, colunas)
+        self.assertTrue(all(len(l) <= colunas for l in texto.splitlines()))
+        self.assertIn("TOTAL A PAGAR:", texto)
+        self.assertTrue(gerador_texto.cupom_escpos(VENDA, ITENS, colunas).endswith(gerador_texto.GS_CORTE_PARCIAL))
+
+    def test_largura_abaixo_do_minimo_nao_quebra(self):
+        # config.json editado à mão: o nome some, mas o cupom sai
+        for colunas in (20, 22, 25):
+            linhas = gerador_texto.linhas_cupom(VENDA, ITENS, colunas)
+            self.assertTrue(any("TOTAL A PAGAR:" in t for _, t in linhas))
+
+    def test_configuracao_recusa_largura_abaixo_do_minimo(self):
+        with self.assertRaises(ValueError):
+            servico_comprovantes.salvar_configuracao('escpos', '', gerador_texto.COLUNAS_MINIMO - 1)
+
+
+if __name__ == '__main__':
+    unittest.main()